@@ -0,0 +1,174 @@
+"""Retry storm benchmark: many concurrent ``AsyncFireworks`` calls against a throttling server.
+
+A local HTTP server admits ``--rate`` requests per second in ``--window``
+second windows and answers the rest with a 429, with a ``retry-after-ms``
+hint unless ``--no-hint`` is given.  ``--requests`` calls are started at
+once and each retries up to ``--max-retries`` times.  The client's retry coordinator
+(shared throttle window, decorrelated jitter) is compared with the previous
+behaviour, where every request backs off on its own.
+
+Usage::
+
+    python scripts/benchmarks/bench_retry_storm.py [--requests 1000] [--rate 200] [--no-hint]
+
+Reported per mode: wall time, 429s received per successful call, calls
+that ran out of retries and p50 / p99 call latency.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import asyncio
+import argparse
+from typing import Any
+from typing_extensions import override
+
+import httpx
+
+from fireworks import AsyncFireworks, RateLimitError, DefaultAsyncHttpxClient
+from fireworks._base_client import _RetryCoordinator
+
+
+class _Uncoordinated(_RetryCoordinator):
+    """The behaviour before the coordinator: per-request backoff only."""
+
+    @override
+    async def wait(self) -> None:
+        return None
+
+    @override
+    def observe(
+        self,
+        response: httpx.Response,  # noqa: ARG002
+        retry_after: float | None,  # noqa: ARG002
+    ) -> None:
+        return None
+
+    @override
+    def retry_delay(self, timeout: float, previous: float | None) -> float:  # noqa: ARG002
+        return timeout
+
+
+class ThrottlingServer:
+    """HTTP/1.1 server admitting ``rate`` requests per second, 429 for the rest."""
+
+    def __init__(self, rate: float, window_s: float, hint: bool):
+        self.window_s = window_s
+        self.per_window = max(1, int(rate * window_s))
+        self.hint = hint
+        self.window = -1
+        self.admitted = 0
+        self.hits = 0
+        self.throttled = 0
+
+    def _status(self) -> tuple[int, bytes]:
+        now = time.monotonic()
+        window = int(now / self.window_s)
+        if window != self.window:
+            self.window, self.admitted = window, 0
+        self.hits += 1
+        if self.admitted < self.per_window:
+            self.admitted += 1
+            return 200, b""
+        self.throttled += 1
+        if not self.hint:
+            return 429, b""
+        reset_ms = int(((window + 1) * self.window_s - now) * 1000) + 1
+        return 429, f"retry-after-ms: {reset_ms}\r\n".encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                status, headers = self._status()
+                body = b"{}"
+                reason = b"OK" if status == 200 else b"Too Many Requests"
+                writer.write(
+                    b"HTTP/1.1 %d %s\r\ncontent-type: application/json\r\ncontent-length: %d\r\n%s\r\n%s"
+                    % (status, reason, len(body), headers, body)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _call(client: AsyncFireworks) -> tuple[float, bool]:
+    t0 = time.monotonic()
+    try:
+        await client.post("/v1/ping", cast_to=httpx.Response, body={})
+    except RateLimitError:
+        return time.monotonic() - t0, False
+    return time.monotonic() - t0, True
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(coordinated: bool, args: argparse.Namespace) -> dict[str, Any]:
+    server = ThrottlingServer(args.rate, args.window, hint=not args.no_hint)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    client = AsyncFireworks(
+        api_key="bench",
+        base_url=f"http://127.0.0.1:{port}",
+        max_retries=args.max_retries,
+        http_client=DefaultAsyncHttpxClient(limits=limits),
+    )
+    if not coordinated:
+        client._retry_coordinator = _Uncoordinated()
+    try:
+        # The first call resolves the platform headers, which a cold burst would do once per call.
+        await client.get("/v1/ping", cast_to=httpx.Response)
+        server.hits = server.throttled = 0
+        t0 = time.monotonic()
+        results = await asyncio.gather(*(_call(client) for _ in range(args.requests)))
+        wall = time.monotonic() - t0
+    finally:
+        await client.close()
+        listener.close()
+        await listener.wait_closed()
+    latencies = [latency for latency, _ in results]
+    succeeded = sum(ok for _, ok in results)
+    return {
+        "wall_s": wall,
+        "429_per_success": server.throttled / max(1, succeeded),
+        "exhausted": args.requests - succeeded,
+        "p50_s": _percentile(latencies, 0.5),
+        "p99_s": _percentile(latencies, 0.99),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200.0, help="requests per second the server admits")
+    parser.add_argument("--window", type=float, default=1.0, help="seconds per rate limit window")
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--max-retries", type=int, default=8)
+    parser.add_argument("--no-hint", action="store_true", help="send 429s without retry-after-ms")
+    args = parser.parse_args(argv)
+
+    hint = "without" if args.no_hint else "with"
+    print(f"{args.requests} concurrent calls, server admits {args.rate:.0f}/s, 429s {hint} retry-after-ms")
+    for label, coordinated in (("per-request backoff", False), ("retry coordinator", True)):
+        stats = asyncio.run(run(coordinated, args))
+        print(
+            f"  {label:<20} wall {stats['wall_s']:6.2f}s  429/success {stats['429_per_success']:6.2f}  "
+            f"exhausted {stats['exhausted']:4d}  p50 {stats['p50_s']:5.2f}s  p99 {stats['p99_s']:5.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
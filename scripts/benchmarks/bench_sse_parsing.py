@@ -0,0 +1,115 @@
+"""Throughput benchmark: SSE line splitting in ``Stream`` / ``AsyncStream`` / ``DeploymentSampler``.
+
+Compares the shared :class:`fireworks._streaming.SSELineDecoder` with the
+previous chunk reassembly (``data += line`` per line, then ``splitlines`` and
+a UTF-8 decode per line again).  The old approach is quadratic in the length
+of an event, which shows on large events (tool-call arguments, echoed
+logprobs) delivered in small network reads.
+
+Usage::
+
+    python scripts/benchmarks/bench_sse_parsing.py [--event-kb 1024] [--read-size 1024]
+
+Two synthetic streams are parsed: many small token events, and a few large
+events.  Both are fed in ``--read-size`` byte reads.
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import argparse
+from typing import Callable, Iterator
+
+from fireworks._streaming import SSEDecoder, SSELineDecoder
+
+
+def token_stream(tokens: int) -> bytes:
+    """A completions body with one small event per token."""
+    events = [json.dumps({"choices": [{"index": 0, "text": f" tok{i}", "token_ids": [i]}]}) for i in range(tokens)]
+    return b"".join(f"data: {e}\n\n".encode() for e in events) + b"data: [DONE]\n\n"
+
+
+def large_event_stream(events: int, event_kb: int) -> bytes:
+    """A body of ``events`` events, each with an ``event_kb`` KiB string field."""
+    arguments = "x" * (event_kb * 1024)
+    body = [json.dumps({"choices": [{"index": 0, "delta": {"arguments": arguments}}]}) for _ in range(events)]
+    return b"".join(f"data: {e}\n\n".encode() for e in body) + b"data: [DONE]\n\n"
+
+
+def reads(body: bytes, read_size: int) -> list[bytes]:
+    return [body[i : i + read_size] for i in range(0, len(body), read_size)]
+
+
+def legacy_lines(chunks: list[bytes]) -> Iterator[str]:
+    """The reassembly ``SSEDecoder`` used before ``SSELineDecoder``."""
+    data = b""
+    for chunk in chunks:
+        for line in chunk.splitlines(keepends=True):
+            data += line
+            if data.endswith((b"\r\r", b"\n\n", b"\r\n\r\n")):
+                for raw_line in data.splitlines():
+                    yield raw_line.decode("utf-8")
+                data = b""
+    if data:
+        for raw_line in data.splitlines():
+            yield raw_line.decode("utf-8")
+
+
+def linear_lines(chunks: list[bytes]) -> Iterator[str]:
+    lines = SSELineDecoder()
+    for chunk in chunks:
+        yield from lines.decode(chunk)
+    yield from lines.flush()
+
+
+def _parse(chunks: list[bytes], split: Callable[[list[bytes]], Iterator[str]]) -> int:
+    decoder = SSEDecoder()
+    events = 0
+    for line in split(chunks):
+        if decoder.decode(line) is not None:
+            events += 1
+    return events
+
+
+def run(chunks: list[bytes], repeat: int) -> dict[str, float]:
+    """Best-of-``repeat`` MB/s for each splitter."""
+    size = sum(len(c) for c in chunks)
+    splitters = {"legacy reassembly": legacy_lines, "SSELineDecoder": linear_lines}
+    counts = {name: _parse(chunks, split) for name, split in splitters.items()}
+    assert len(set(counts.values())) == 1, counts
+    results: dict[str, float] = {}
+    for name, split in splitters.items():
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            _parse(chunks, split)
+            best = min(best, time.perf_counter() - t0)
+        results[name] = size / best / 1e6
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--event-kb", type=int, default=1024)
+    parser.add_argument("--read-size", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    streams = {
+        f"{args.tokens} token events": token_stream(args.tokens),
+        f"{args.events} x {args.event_kb} KiB events": large_event_stream(args.events, args.event_kb),
+    }
+    for label, body in streams.items():
+        results = run(reads(body, args.read_size), args.repeat)
+        baseline = results["legacy reassembly"]
+        print(f"{label} ({len(body) / 1e6:.1f} MB, {args.read_size} B reads)")
+        for name, mbps in results.items():
+            print(f"  {name:<18} {mbps:9.1f} MB/s  {mbps / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
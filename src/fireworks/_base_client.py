@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 import sys
 import json
 import time
@@ -86,6 +87,7 @@ from ._exceptions import (
     APIConnectionError,
     APIResponseValidationError,
 )
+from ._rate_limit import RateLimiter
 from ._utils._json import openapi_dumps
 
 log: logging.Logger = logging.getLogger(__name__)
@@ -369,6 +371,7 @@ class BaseClient(Generic[_HttpxClientT, _DefaultStreamT]):
     _strict_response_validation: bool
     _idempotency_header: str | None
     _default_stream_cls: type[_DefaultStreamT] | None = None
+    _rate_limiter: RateLimiter | None = None
 
     def __init__(
         self,
@@ -983,6 +986,8 @@ class SyncAPIClient(BaseClient[httpx.Client, Stream[Any]]):
 
         response: httpx.Response | None = None
         max_retries = input_options.get_max_retries(self.max_retries)
+        rate_limiter = self._rate_limiter
+        rate_limit_tokens = rate_limiter.estimate_tokens(input_options) if rate_limiter is not None else None
 
         retries_taken = 0
         for retries_taken in range(max_retries + 1):
@@ -1000,6 +1005,9 @@ class SyncAPIClient(BaseClient[httpx.Client, Stream[Any]]):
             if options.follow_redirects is not None:
                 kwargs["follow_redirects"] = options.follow_redirects
 
+            if rate_limiter is not None and rate_limit_tokens is not None:
+                rate_limiter.acquire(rate_limit_tokens)
+
             log.debug("Sending HTTP Request: %s %s", request.method, request.url)
 
             response = None
@@ -1047,6 +1055,9 @@ class SyncAPIClient(BaseClient[httpx.Client, Stream[Any]]):
                 response.headers,
             )
 
+            if rate_limiter is not None and rate_limit_tokens is not None:
+                rate_limiter.observe(response)
+
             try:
                 response.raise_for_status()
             except httpx.HTTPStatusError as err:  # thrown on 4xx and 5xx status code
@@ -1453,6 +1464,112 @@ class AsyncAioHttpClientWrapper(DefaultAioHttpClient):
             pass
 
 
+_RATE_LIMIT_KINDS = ("requests", "tokens")
+
+# Seconds over which requests held by a throttle resume, so they do not all hit the server at once.
+_THROTTLE_SPREAD = 1.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_rate_limit_reset(value: str | None) -> float | None:
+    """Parses an `x-ratelimit-reset-*` value, either seconds (`"12.5"`) or a duration (`"1m30s"`, `"250ms"`)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    seconds = 0.0
+    matched = ""
+    for match in _DURATION_PART.finditer(value):
+        amount, unit = match.groups()
+        seconds += float(amount) * _DURATION_UNITS[unit]
+        matched += match.group(0)
+    return seconds if matched and matched == value.strip() else None
+
+
+def _rate_limit_pause(headers: httpx.Headers) -> float | None:
+    """Seconds until an exhausted `x-ratelimit-remaining-{requests,tokens}` limit resets, if any"""
+    pause: float | None = None
+    for kind in _RATE_LIMIT_KINDS:
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        if remaining is None:
+            continue
+        try:
+            if float(remaining) > 0:
+                continue
+        except ValueError:
+            continue
+        reset = _parse_rate_limit_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+        if reset is not None and (pause is None or reset > pause):
+            pause = reset
+    return pause
+
+
+class _RetryCoordinator:
+    """Throttling state shared by every request of an `AsyncAPIClient`.
+
+    When a response says the server is throttling the client (a 429, a `Retry-After`
+    hint on an error, or an `x-ratelimit-remaining-*` of zero with its reset time),
+    requests of the client that have not been sent yet, new ones included, hold off
+    until the throttle ends instead of each collecting a 429 of its own. They then
+    resume at random over up to `_THROTTLE_SPREAD` seconds. Retries without a server
+    hint use decorrelated jitter, so requests that failed together do not retry in
+    lockstep.
+    """
+
+    def __init__(self) -> None:
+        self._resume_at = 0.0
+        self._spread = 0.0
+        self.throttles = 0
+        """Number of responses that paused the client"""
+
+    def paused_for(self) -> float:
+        """Seconds until requests may be sent again"""
+        return max(0.0, self._resume_at - time.monotonic())
+
+    async def wait(self) -> None:
+        delay = self.paused_for()
+        if delay <= 0:
+            return
+        delay += random() * self._spread
+        log.debug("Holding request for %f seconds while the server is throttling", delay)
+        await anyio.sleep(delay)
+
+    def observe(self, response: httpx.Response, retry_after: float | None) -> None:
+        """Updates the throttle from `response`; `retry_after` is its parsed `Retry-After` hint"""
+        pause = _rate_limit_pause(response.headers)
+        if response.status_code >= 400 and retry_after is not None and 0 < retry_after <= 60:
+            pause = retry_after
+        elif response.status_code == 429 and pause is None:
+            pause = INITIAL_RETRY_DELAY
+        if pause is None or not 0 < pause <= 60:
+            return
+        self.throttles += 1
+        resume_at = time.monotonic() + pause
+        if resume_at <= self._resume_at:
+            return
+        if self.paused_for() <= 0:
+            log.info("Server is throttling requests, pausing for %f seconds", pause)
+        self._resume_at = resume_at
+        self._spread = min(_THROTTLE_SPREAD, pause)
+
+    def retry_delay(self, timeout: float, previous: float | None) -> float:
+        """Decorrelated jitter around the backoff schedule's `timeout`.
+
+        A delay is drawn between half of `timeout` and three times the request's
+        previous delay, at most twice `timeout`. While a throttle is active the retry
+        needs no delay of its own, as `wait()` holds it.
+        """
+        if self.paused_for() > 0:
+            return 0.0
+        low = timeout / 2
+        high = min(3 * previous, 2 * timeout) if previous else 1.5 * timeout
+        return low + random() * max(0.0, high - low)
+
+
 class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
     _client: httpx.AsyncClient
     _default_stream_cls: type[AsyncStream[Any]] | None = None
@@ -1502,6 +1619,7 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
             # cast to a valid type because mypy doesn't understand our type narrowing
             timeout=cast(Timeout, timeout),
         )
+        self._retry_coordinator = _RetryCoordinator()
 
     def is_closed(self) -> bool:
         return self._client.is_closed
@@ -1596,8 +1714,11 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
 
         response: httpx.Response | None = None
         max_retries = input_options.get_max_retries(self.max_retries)
+        rate_limiter = self._rate_limiter
+        rate_limit_tokens = rate_limiter.estimate_tokens(input_options) if rate_limiter is not None else None
 
         retries_taken = 0
+        retry_delay: float | None = None
         for retries_taken in range(max_retries + 1):
             options = model_copy(input_options)
             options = await self._prepare_options(options)
@@ -1613,6 +1734,10 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
             if options.follow_redirects is not None:
                 kwargs["follow_redirects"] = options.follow_redirects
 
+            await self._retry_coordinator.wait()
+            if rate_limiter is not None and rate_limit_tokens is not None:
+                await rate_limiter.aacquire(rate_limit_tokens)
+
             log.debug("Sending HTTP Request: %s %s", request.method, request.url)
 
             response = None
@@ -1626,11 +1751,12 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
                 log.debug("Encountered httpx.TimeoutException", exc_info=True)
 
                 if remaining_retries > 0:
-                    await self._sleep_for_retry(
+                    retry_delay = await self._sleep_for_retry(
                         retries_taken=retries_taken,
                         max_retries=max_retries,
                         options=input_options,
                         response=None,
+                        previous_delay=retry_delay,
                     )
                     continue
 
@@ -1640,11 +1766,12 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
                 log.debug("Encountered Exception", exc_info=True)
 
                 if remaining_retries > 0:
-                    await self._sleep_for_retry(
+                    retry_delay = await self._sleep_for_retry(
                         retries_taken=retries_taken,
                         max_retries=max_retries,
                         options=input_options,
                         response=None,
+                        previous_delay=retry_delay,
                     )
                     continue
 
@@ -1660,6 +1787,11 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
                 response.headers,
             )
 
+            self._retry_coordinator.observe(response, self._parse_retry_after_header(response.headers))
+
+            if rate_limiter is not None and rate_limit_tokens is not None:
+                rate_limiter.observe(response)
+
             try:
                 response.raise_for_status()
             except httpx.HTTPStatusError as err:  # thrown on 4xx and 5xx status code
@@ -1667,11 +1799,12 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
 
                 if remaining_retries > 0 and self._should_retry(err.response):
                     await err.response.aclose()
-                    await self._sleep_for_retry(
+                    retry_delay = await self._sleep_for_retry(
                         retries_taken=retries_taken,
                         max_retries=max_retries,
                         options=input_options,
                         response=response,
+                        previous_delay=retry_delay,
                     )
                     continue
 
@@ -1696,8 +1829,14 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
         )
 
     async def _sleep_for_retry(
-        self, *, retries_taken: int, max_retries: int, options: FinalRequestOptions, response: httpx.Response | None
-    ) -> None:
+        self,
+        *,
+        retries_taken: int,
+        max_retries: int,
+        options: FinalRequestOptions,
+        response: httpx.Response | None,
+        previous_delay: float | None = None,
+    ) -> float:
         remaining_retries = max_retries - retries_taken
         if remaining_retries == 1:
             log.debug("1 retry left")
@@ -1705,9 +1844,13 @@ class AsyncAPIClient(BaseClient[httpx.AsyncClient, AsyncStream[Any]]):
             log.debug("%i retries left", remaining_retries)
 
         timeout = self._calculate_retry_timeout(remaining_retries, options, response.headers if response else None)
-        log.info("Retrying request to %s in %f seconds", options.url, timeout)
+        timeout = self._retry_coordinator.retry_delay(timeout, previous_delay)
+        log.info(
+            "Retrying request to %s in %f seconds", options.url, max(timeout, self._retry_coordinator.paused_for())
+        )
 
         await anyio.sleep(timeout)
+        return timeout
 
     async def _process_response(
         self,
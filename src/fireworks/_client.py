@@ -28,6 +28,7 @@ from ._compat import cached_property
 from ._version import __version__
 from ._streaming import Stream as Stream, AsyncStream as AsyncStream
 from ._exceptions import APIStatusError, FireworksError
+from ._rate_limit import RateLimiter
 from ._base_client import (
     DEFAULT_MAX_RETRIES,
     SyncAPIClient,
@@ -121,6 +122,8 @@ class Fireworks(SyncAPIClient):
         # We provide a `DefaultHttpxClient` class that you can pass to retain the default values we use for `limits`, `timeout` & `follow_redirects`.
         # See the [httpx documentation](https://www.python-httpx.org/api/#client) for more details.
         http_client: httpx.Client | None = None,
+        # Pace inference requests under requests/min and tokens/min limits, see `RateLimiter`.
+        rate_limiter: RateLimiter | None = None,
         # Enable or disable schema validation for data returned by the API.
         # When enabled an error APIResponseValidationError is raised
         # if the API responds with invalid data for the expected schema.
@@ -175,6 +178,8 @@ class Fireworks(SyncAPIClient):
             _strict_response_validation=_strict_response_validation,
         )
 
+        self._rate_limiter = rate_limiter
+
         self._default_stream_cls = Stream
 
     @cached_property
@@ -334,6 +339,7 @@ class Fireworks(SyncAPIClient):
         timeout: float | Timeout | None | NotGiven = not_given,
         http_client: httpx.Client | None = None,
         max_retries: int | NotGiven = not_given,
+        rate_limiter: RateLimiter | None = None,
         default_headers: Mapping[str, str] | None = None,
         set_default_headers: Mapping[str, str] | None = None,
         default_query: Mapping[str, object] | None = None,
@@ -369,6 +375,7 @@ class Fireworks(SyncAPIClient):
             timeout=self.timeout if isinstance(timeout, NotGiven) else timeout,
             http_client=http_client,
             max_retries=max_retries if is_given(max_retries) else self.max_retries,
+            rate_limiter=rate_limiter or self._rate_limiter,
             default_headers=headers,
             default_query=params,
             **_extra_kwargs,
@@ -442,6 +449,8 @@ class AsyncFireworks(AsyncAPIClient):
         # We provide a `DefaultAsyncHttpxClient` class that you can pass to retain the default values we use for `limits`, `timeout` & `follow_redirects`.
         # See the [httpx documentation](https://www.python-httpx.org/api/#asyncclient) for more details.
         http_client: httpx.AsyncClient | None = None,
+        # Pace inference requests under requests/min and tokens/min limits, see `RateLimiter`.
+        rate_limiter: RateLimiter | None = None,
         # Enable or disable schema validation for data returned by the API.
         # When enabled an error APIResponseValidationError is raised
         # if the API responds with invalid data for the expected schema.
@@ -496,6 +505,8 @@ class AsyncFireworks(AsyncAPIClient):
             _strict_response_validation=_strict_response_validation,
         )
 
+        self._rate_limiter = rate_limiter
+
         self._default_stream_cls = AsyncStream
 
     @cached_property
@@ -655,6 +666,7 @@ class AsyncFireworks(AsyncAPIClient):
         timeout: float | Timeout | None | NotGiven = not_given,
         http_client: httpx.AsyncClient | None = None,
         max_retries: int | NotGiven = not_given,
+        rate_limiter: RateLimiter | None = None,
         default_headers: Mapping[str, str] | None = None,
         set_default_headers: Mapping[str, str] | None = None,
         default_query: Mapping[str, object] | None = None,
@@ -690,11 +702,15 @@ class AsyncFireworks(AsyncAPIClient):
             timeout=self.timeout if isinstance(timeout, NotGiven) else timeout,
             http_client=http_client,
             max_retries=max_retries if is_given(max_retries) else self.max_retries,
+            rate_limiter=rate_limiter or self._rate_limiter,
             default_headers=headers,
             default_query=params,
             **_extra_kwargs,
         )
         client._base_url_overridden = self._base_url_overridden or base_url is not None
+        if client.api_key == self.api_key and client.base_url == self.base_url:
+            # Copies are subject to the same rate limits, so they share the throttling state.
+            client._retry_coordinator = self._retry_coordinator
         return client
 
     # Alias for `copy` for nicer inline usage, e.g.
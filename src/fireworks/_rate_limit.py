@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import time
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+import anyio
+import httpx
+
+from ._utils import is_list, is_mapping
+
+if TYPE_CHECKING:
+    from ._models import FinalRequestOptions
+
+__all__ = ["RateLimiter"]
+
+log: logging.Logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Token bucket that lends capacity: takers may drive the balance negative and wait for the refill."""
+
+    __slots__ = ("per_minute", "rate", "capacity", "balance", "updated_at")
+
+    def __init__(self, per_minute: float, utilization: float, burst_s: float) -> None:
+        self.per_minute = per_minute
+        self.rate = per_minute * utilization / 60
+        self.capacity = max(1.0, self.rate * burst_s)
+        self.balance = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.balance = min(self.capacity, self.balance + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Takes `amount` and returns the seconds until the balance is back to zero"""
+        self.refill(now)
+        self.balance -= amount
+        return -self.balance / self.rate if self.balance < 0 else 0.0
+
+    def clamp(self, remaining: float, now: float) -> None:
+        """Lowers the balance as of `now` to `remaining` if it is higher"""
+        self.refill(now)
+        self.balance = min(self.balance, remaining)
+
+    def carry_over(self, previous: _Bucket, now: float) -> None:
+        """Starts from the deficit of `previous`, which requests already sent still owe"""
+        previous.refill(now)
+        if previous.balance < 0:
+            self.balance = previous.balance
+            self.updated_at = now
+
+
+class RateLimiter:
+    """Paces the inference requests of a client to stay under requests/min and tokens/min limits.
+
+    Pass one as `Fireworks(rate_limiter=RateLimiter(...))` or to `AsyncFireworks`.
+    A request whose body has `messages` or `prompt` reserves one request and its
+    estimated tokens before each attempt is sent, and waits until both budgets cover
+    it, so a batch of calls is spread out rather than answered with 429s. Other API
+    calls are not paced.
+
+    Each budget refills at `utilization` times its per-minute limit and holds at most
+    `burst_s` seconds of refill. Limits that are not given are learned from the
+    `x-ratelimit-limit-requests` / `x-ratelimit-limit-tokens` response headers (taken
+    as per-minute limits) unless `learn_from_headers` is false, and a
+    `x-ratelimit-remaining-*` value below the local balance lowers it.
+
+    A request is estimated at its prompt length divided by `chars_per_token` (or its
+    token count for a tokenized prompt) plus `max_tokens` (`default_max_tokens` when
+    unset) for each of its `n` choices. Share one limiter between clients of the same
+    account to pace them together.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        learn_from_headers: bool = True,
+        utilization: float = 0.95,
+        burst_s: float = 1.0,
+        default_max_tokens: int = 1024,
+        chars_per_token: float = 4.0,
+    ) -> None:
+        if not 0 < utilization <= 1:
+            raise ValueError("utilization must be in (0, 1]")
+        if burst_s <= 0 or chars_per_token <= 0:
+            raise ValueError("burst_s and chars_per_token must be positive")
+        for limit in (requests_per_minute, tokens_per_minute):
+            if limit is not None and limit <= 0:
+                raise ValueError("requests_per_minute and tokens_per_minute must be positive")
+        self._utilization = utilization
+        self._burst_s = burst_s
+        self._learn = learn_from_headers
+        self._default_max_tokens = default_max_tokens
+        self._chars_per_token = chars_per_token
+        self._explicit = {"requests": requests_per_minute is not None, "tokens": tokens_per_minute is not None}
+        self._buckets: Dict[str, Optional[_Bucket]] = {
+            "requests": self._bucket(requests_per_minute),
+            "tokens": self._bucket(tokens_per_minute),
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def requests_per_minute(self) -> Optional[float]:
+        """The requests/min limit in effect, or `None` while unknown"""
+        bucket = self._buckets["requests"]
+        return bucket.per_minute if bucket is not None else None
+
+    @property
+    def tokens_per_minute(self) -> Optional[float]:
+        """The tokens/min limit in effect, or `None` while unknown"""
+        bucket = self._buckets["tokens"]
+        return bucket.per_minute if bucket is not None else None
+
+    def estimate_tokens(self, options: FinalRequestOptions) -> Optional[int]:
+        """Estimated tokens of a request, or `None` if it is not an inference request"""
+        body = options.json_data
+        if not is_mapping(body):
+            return None
+        if "messages" in body:
+            prompt_chars = _message_chars(body.get("messages")) + _message_chars(body.get("system"))
+            prompt_tokens = prompt_chars / self._chars_per_token
+        elif "prompt" in body:
+            prompt_tokens = _prompt_tokens(body.get("prompt"), self._chars_per_token)
+        else:
+            return None
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if not isinstance(max_tokens, (int, float)):
+            max_tokens = self._default_max_tokens
+        n = body.get("n")
+        choices = int(n) if isinstance(n, (int, float)) and n > 0 else 1
+        return int(prompt_tokens + int(max_tokens) * choices)
+
+    def reserve(self, tokens: int) -> float:
+        """Takes one request and `tokens` from the budgets; returns the seconds to wait before sending"""
+        now = time.monotonic()
+        delay = 0.0
+        with self._lock:
+            for bucket, amount in ((self._buckets["requests"], 1), (self._buckets["tokens"], tokens)):
+                if bucket is not None:
+                    delay = max(delay, bucket.take(amount, now))
+        return delay
+
+    def acquire(self, tokens: int) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            log.debug("Rate limiter pacing request for %f seconds", delay)
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            log.debug("Rate limiter pacing request for %f seconds", delay)
+            try:
+                await anyio.sleep(delay)
+            except BaseException:
+                self._refund(tokens)
+                raise
+
+    def observe(self, response: httpx.Response) -> None:
+        """Learns limits and remaining budgets from the rate limit headers of `response`"""
+        headers = response.headers
+        now = time.monotonic()
+        with self._lock:
+            for kind in ("requests", "tokens"):
+                limit = _header_float(headers, f"x-ratelimit-limit-{kind}")
+                bucket = self._buckets[kind]
+                learned = self._learn and not self._explicit[kind] and limit
+                if learned and (bucket is None or bucket.per_minute != limit):
+                    log.debug("Rate limiter learned a limit of %s %s per minute", limit, kind)
+                    previous, bucket = bucket, self._bucket(limit)
+                    if previous is not None and bucket is not None:
+                        bucket.carry_over(previous, now)
+                    self._buckets[kind] = bucket
+                remaining = _header_float(headers, f"x-ratelimit-remaining-{kind}")
+                if bucket is not None and remaining is not None:
+                    bucket.clamp(remaining, now)
+
+    def _bucket(self, per_minute: Optional[float]) -> Optional[_Bucket]:
+        return _Bucket(per_minute, self._utilization, self._burst_s) if per_minute else None
+
+    def _refund(self, tokens: int) -> None:
+        with self._lock:
+            for bucket, amount in ((self._buckets["requests"], 1), (self._buckets["tokens"], tokens)):
+                if bucket is not None:
+                    bucket.balance = min(bucket.capacity, bucket.balance + amount)
+
+
+def _header_float(headers: httpx.Headers, name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _message_chars(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if is_list(value):
+        return sum(_message_chars(item) for item in value)
+    if is_mapping(value):
+        return _message_chars(value.get("content")) + _message_chars(value.get("text"))
+    return 0
+
+
+def _prompt_tokens(prompt: Any, chars_per_token: float) -> float:
+    if isinstance(prompt, str):
+        return len(prompt) / chars_per_token
+    if is_list(prompt):
+        items: Iterable[Any] = prompt
+        return sum(1.0 if isinstance(item, int) else _prompt_tokens(item, chars_per_token) for item in items)
+    return 0.0
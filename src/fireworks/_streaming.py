@@ -14,6 +14,7 @@ from ._utils import extract_type_var_from_base
 if TYPE_CHECKING:
     from ._client import Fireworks, AsyncFireworks
     from ._models import FinalRequestOptions
+    from .lib.streaming._accumulator import StreamAccumulator
 
 
 _T = TypeVar("_T")
@@ -39,6 +40,9 @@ class Stream(Generic[_T]):
         self._client = client
         self._options = options
         self._decoder = client._make_sse_decoder()
+        self._accumulator: Optional[StreamAccumulator] = None
+        self._started = False
+        self._draining = False
         self._iterator = self.__stream__()
 
     def __next__(self) -> _T:
@@ -51,28 +55,66 @@ class Stream(Generic[_T]):
     def _iter_events(self) -> Iterator[ServerSentEvent]:
         yield from self._decoder.iter_bytes(self.response.iter_bytes())
 
+    def _iter_data(self) -> Iterator[Any]:
+        """Decoded JSON payloads of the stream's data events, before any model construction"""
+        for sse in self._iter_events():
+            if sse.data.startswith("[DONE]"):
+                break
+
+            if sse.event == "message_stop":
+                break
+
+            if sse.event == "ping":
+                continue
+
+            yield sse.json()
+
     def __stream__(self) -> Iterator[_T]:
         cast_to = cast(Any, self._cast_to)
         response = self.response
         process_data = self._client._process_response_data
-        iterator = self._iter_events()
-
-        try:
-            for sse in iterator:
-                if sse.data.startswith("[DONE]"):
-                    break
 
-                if sse.event == "message_stop":
-                    break
+        # The accumulator can only be created before iteration starts, see `_make_accumulator()`.
+        self._started = True
+        accumulator = self._accumulator
 
-                if sse.event == "ping":
-                    continue
-
-                yield process_data(data=sse.json(), cast_to=cast_to, response=response)
+        try:
+            if accumulator is None:
+                for data in self._iter_data():
+                    yield process_data(data=data, cast_to=cast_to, response=response)
+            else:
+                for data in self._iter_data():
+                    accumulator.add(data)
+                    if self._draining:
+                        continue
+                    yield process_data(data=data, cast_to=cast_to, response=response)
         finally:
             # Ensure the response is closed even if the consumer doesn't read all data
             response.close()
 
+    @property
+    def accumulator(self) -> StreamAccumulator:
+        """The response assembled from the events read so far, with running usage and time to first token.
+
+        It is created on first use, which must come before iterating the stream.
+        """
+        if self._accumulator is None:
+            self._accumulator = _make_accumulator(self._started)
+        return self._accumulator
+
+    def until_done(self) -> Self:
+        """Read the rest of the stream without constructing models for the remaining events."""
+        if self._accumulator is None:
+            self._accumulator = _make_accumulator(self._started)
+        self._draining = True
+        for _ in self._iterator:
+            pass
+        return self
+
+    def final(self) -> Any:
+        """Read the rest of the stream and return the complete response, see `StreamAccumulator.final()`."""
+        return self.until_done().accumulator.final()
+
     def __enter__(self) -> Self:
         return self
 
@@ -113,6 +155,9 @@ class AsyncStream(Generic[_T]):
         self._client = client
         self._options = options
         self._decoder = client._make_sse_decoder()
+        self._accumulator: Optional[StreamAccumulator] = None
+        self._started = False
+        self._draining = False
         self._iterator = self.__stream__()
 
     async def __anext__(self) -> _T:
@@ -126,28 +171,66 @@ class AsyncStream(Generic[_T]):
         async for sse in self._decoder.aiter_bytes(self.response.aiter_bytes()):
             yield sse
 
+    async def _iter_data(self) -> AsyncIterator[Any]:
+        """Decoded JSON payloads of the stream's data events, before any model construction"""
+        async for sse in self._iter_events():
+            if sse.data.startswith("[DONE]"):
+                break
+
+            if sse.event == "message_stop":
+                break
+
+            if sse.event == "ping":
+                continue
+
+            yield sse.json()
+
     async def __stream__(self) -> AsyncIterator[_T]:
         cast_to = cast(Any, self._cast_to)
         response = self.response
         process_data = self._client._process_response_data
-        iterator = self._iter_events()
-
-        try:
-            async for sse in iterator:
-                if sse.data.startswith("[DONE]"):
-                    break
 
-                if sse.event == "message_stop":
-                    break
+        # The accumulator can only be created before iteration starts, see `_make_accumulator()`.
+        self._started = True
+        accumulator = self._accumulator
 
-                if sse.event == "ping":
-                    continue
-
-                yield process_data(data=sse.json(), cast_to=cast_to, response=response)
+        try:
+            if accumulator is None:
+                async for data in self._iter_data():
+                    yield process_data(data=data, cast_to=cast_to, response=response)
+            else:
+                async for data in self._iter_data():
+                    accumulator.add(data)
+                    if self._draining:
+                        continue
+                    yield process_data(data=data, cast_to=cast_to, response=response)
         finally:
             # Ensure the response is closed even if the consumer doesn't read all data
             await response.aclose()
 
+    @property
+    def accumulator(self) -> StreamAccumulator:
+        """The response assembled from the events read so far, with running usage and time to first token.
+
+        It is created on first use, which must come before iterating the stream.
+        """
+        if self._accumulator is None:
+            self._accumulator = _make_accumulator(self._started)
+        return self._accumulator
+
+    async def until_done(self) -> Self:
+        """Read the rest of the stream without constructing models for the remaining events."""
+        if self._accumulator is None:
+            self._accumulator = _make_accumulator(self._started)
+        self._draining = True
+        async for _ in self._iterator:
+            pass
+        return self
+
+    async def final(self) -> Any:
+        """Read the rest of the stream and return the complete response, see `StreamAccumulator.final()`."""
+        return (await self.until_done()).accumulator.final()
+
     async def __aenter__(self) -> Self:
         return self
 
@@ -168,6 +251,18 @@ class AsyncStream(Generic[_T]):
         await self.response.aclose()
 
 
+def _make_accumulator(started: bool) -> StreamAccumulator:
+    if started:
+        raise RuntimeError(
+            "The stream has already been iterated; use `.accumulator` before reading events "
+            "to call `until_done()` or `final()` later"
+        )
+
+    from .lib.streaming._accumulator import StreamAccumulator
+
+    return StreamAccumulator()
+
+
 class ServerSentEvent:
     def __init__(
         self,
@@ -209,6 +304,56 @@ class ServerSentEvent:
         return f"ServerSentEvent(event={self.event}, data={self.data}, id={self.id}, retry={self.retry})"
 
 
+class SSELineDecoder:
+    """Incrementally splits a byte stream into SSE lines in linear time.
+
+    Lines end with CRLF, LF or CR (a CRLF pair may be split across
+    chunks). Only the new chunk is scanned for line endings: complete
+    lines are sliced out of it and just the unterminated tail is kept, so
+    every byte is copied and UTF-8 decoded once however long the event.
+    """
+
+    _buffer: bytearray
+    _pending_cr: bool
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._pending_cr = False
+
+    def decode(self, chunk: bytes) -> list[str]:
+        """Feed ``chunk`` and return the lines it completes, without their line endings"""
+        if not chunk:
+            return []
+        if self._pending_cr:
+            # The previous chunk ended with "\r", which already ended a line.
+            self._pending_cr = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        if b"\r" in chunk:
+            self._pending_cr = chunk.endswith(b"\r")
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        elif b"\n" not in chunk:
+            self._buffer += chunk
+            return []
+
+        parts = chunk.split(b"\n")
+        buffer = self._buffer
+        if buffer:
+            buffer += parts[0]
+            parts[0] = bytes(buffer)
+            buffer.clear()
+        buffer += parts.pop()
+        return [part.decode("utf-8") for part in parts]
+
+    def flush(self) -> list[str]:
+        """Return the unterminated last line, if any, at the end of the stream"""
+        if not self._buffer:
+            return []
+        line = self._buffer.decode("utf-8")
+        self._buffer.clear()
+        return [line]
+
+
 class SSEDecoder:
     _data: list[str]
     _event: str | None
@@ -223,47 +368,29 @@ class SSEDecoder:
 
     def iter_bytes(self, iterator: Iterator[bytes]) -> Iterator[ServerSentEvent]:
         """Given an iterator that yields raw binary data, iterate over it & yield every event encountered"""
-        for chunk in self._iter_chunks(iterator):
-            # Split before decoding so splitlines() only uses \r and \n
-            for raw_line in chunk.splitlines():
-                line = raw_line.decode("utf-8")
+        lines = SSELineDecoder()
+        for chunk in iterator:
+            for line in lines.decode(chunk):
                 sse = self.decode(line)
                 if sse:
                     yield sse
-
-    def _iter_chunks(self, iterator: Iterator[bytes]) -> Iterator[bytes]:
-        """Given an iterator that yields raw binary data, iterate over it and yield individual SSE chunks"""
-        data = b""
-        for chunk in iterator:
-            for line in chunk.splitlines(keepends=True):
-                data += line
-                if data.endswith((b"\r\r", b"\n\n", b"\r\n\r\n")):
-                    yield data
-                    data = b""
-        if data:
-            yield data
+        for line in lines.flush():
+            sse = self.decode(line)
+            if sse:
+                yield sse
 
     async def aiter_bytes(self, iterator: AsyncIterator[bytes]) -> AsyncIterator[ServerSentEvent]:
         """Given an iterator that yields raw binary data, iterate over it & yield every event encountered"""
-        async for chunk in self._aiter_chunks(iterator):
-            # Split before decoding so splitlines() only uses \r and \n
-            for raw_line in chunk.splitlines():
-                line = raw_line.decode("utf-8")
+        lines = SSELineDecoder()
+        async for chunk in iterator:
+            for line in lines.decode(chunk):
                 sse = self.decode(line)
                 if sse:
                     yield sse
-
-    async def _aiter_chunks(self, iterator: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
-        """Given an iterator that yields raw binary data, iterate over it and yield individual SSE chunks"""
-        data = b""
-        async for chunk in iterator:
-            for line in chunk.splitlines(keepends=True):
-                data += line
-                if data.endswith((b"\r\r", b"\n\n", b"\r\n\r\n")):
-                    yield data
-                    data = b""
-        if data:
-            yield data
+        for line in lines.flush():
+            sse = self.decode(line)
+            if sse:
+                yield sse
 
     def decode(self, line: str) -> ServerSentEvent | None:
         # See: https://html.spec.whatwg.org/multipage/server-sent-events.html#event-stream-interpretation  # noqa: E501
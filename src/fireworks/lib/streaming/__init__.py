@@ -0,0 +1,8 @@
+from ._chat import (
+    ChatChunk as ChatChunk,
+    ChatChunkChoice as ChatChunkChoice,
+    ChatCompletionAggregator as ChatCompletionAggregator,
+    iter_chat_chunks as iter_chat_chunks,
+    aiter_chat_chunks as aiter_chat_chunks,
+)
+from ._accumulator import StreamAccumulator as StreamAccumulator
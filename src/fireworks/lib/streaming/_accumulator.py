@@ -0,0 +1,206 @@
+"""Incremental assembly of the final response of a streamed request.
+
+:class:`StreamAccumulator` accepts the events of a chat completions, completions
+or messages stream, as decoded JSON or as models, and keeps text and tool call
+arguments as lists of fragments that are joined once. ``Stream`` and
+``AsyncStream`` create one on first use of their ``accumulator`` property or
+their ``until_done()`` / ``final()`` methods, before iteration starts; plain
+iteration does not accumulate anything.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, List, Union, Optional, cast
+from typing_extensions import Literal
+
+from ._chat import _add_choice, _ChoiceParts, _add_chat_chunk, _chat_completion
+from ..._models import BaseModel, construct_type
+from ...types.message_create_response import MessageCreateResponse
+from ...types.completion_create_response import CompletionCreateResponse
+from ...types.chat.completion_create_response import CompletionCreateResponse as ChatCompletionResponse
+
+__all__ = ["StreamAccumulator"]
+
+StreamKind = Literal["chat", "completion", "message"]
+
+_MESSAGE_DELTA_FIELDS = {
+    "text_delta": ("text", "text"),
+    "thinking_delta": ("thinking", "thinking"),
+    "signature_delta": ("signature", "signature"),
+    "input_json_delta": ("partial_json", "input"),
+}
+
+
+class _TextChoiceParts(_ChoiceParts):
+    __slots__ = ("prompt_token_ids",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompt_token_ids: Optional[List[int]] = None
+
+    def assemble_text(self, index: int) -> Dict[str, Any]:
+        choice: Dict[str, Any] = {"index": index, "text": "".join(self.content), "finish_reason": self.finish_reason}
+        logprobs = self.assemble_logprobs()
+        if logprobs is not None:
+            choice["logprobs"] = logprobs
+        for key in ("token_ids", "prompt_token_ids", "raw_output"):
+            if getattr(self, key):
+                choice[key] = getattr(self, key)
+        return choice
+
+
+class StreamAccumulator:
+    """Builds the final response of a chat completions, completions or messages stream as events arrive.
+
+    Content, reasoning, completion text and tool call arguments are kept as lists of
+    fragments and joined only by :attr:`text` and :meth:`final`, so accumulating a
+    long response costs linear time. Tool call fragments are merged by their
+    ``index``. Logprobs are kept per choice as columns, with the float values in
+    ``array('d')``, and turned back into per-token entries by :meth:`final`;
+    legacy logprobs are concatenated column by column (``tokens``,
+    ``token_logprobs``, ...).
+
+    :attr:`usage` is the latest usage seen, and :attr:`time_to_first_token` the
+    seconds from ``started_at`` (a ``time.monotonic()`` value, by default the
+    accumulator's creation) to the first event carrying generated content.
+    """
+
+    def __init__(self, *, started_at: Optional[float] = None) -> None:
+        self.started_at = time.monotonic() if started_at is None else started_at
+        self.first_token_at: Optional[float] = None
+        self.kind: Optional[StreamKind] = None
+        self.events = 0
+        self._result: Dict[str, Any] = {}
+        self._choices: Dict[int, Any] = {}
+        # Messages stream: content block index -> [content_block_start block, {field: fragments}].
+        self._blocks: Dict[int, List[Any]] = {}
+
+    @property
+    def usage(self) -> Optional[Dict[str, Any]]:
+        return self._result.get("usage")
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def text(self) -> str:
+        """Text generated so far: the first choice's content, or the text blocks of a message"""
+        if self.kind == "message":
+            return "".join("".join(fields.get("text", ())) for _, fields in self._blocks.values())
+        parts = self._choices.get(0)
+        return "".join(parts.content) if parts is not None else ""
+
+    def add(self, event: Union[BaseModel, Dict[str, Any]]) -> None:
+        # Stream passes decoded JSON, which need not be an object.
+        raw = cast(object, event.to_dict(mode="json") if isinstance(event, BaseModel) else event)
+        if not isinstance(raw, dict):
+            return
+        data = cast(Dict[str, Any], raw)
+        self.events += 1
+        if self.kind is None:
+            self.kind = _detect_kind(data)
+        if self.kind == "message":
+            self._add_message_event(data)
+        elif self.kind == "chat":
+            _add_chat_chunk(self._result, self._choices, data)
+            if self.first_token_at is None and any(_has_delta(choice) for choice in data.get("choices") or ()):
+                self.first_token_at = time.monotonic()
+        else:
+            self._add_completion_chunk(data)
+
+    def final(self) -> Union[ChatCompletionResponse, CompletionCreateResponse, MessageCreateResponse]:
+        """The response assembled from the events added so far.
+
+        A chat completions stream gives ``chat.CompletionCreateResponse``, a
+        completions stream ``CompletionCreateResponse`` and a messages stream
+        ``MessageCreateResponse``.
+        """
+        if self.kind == "message":
+            return self._message()
+        if self.kind == "completion":
+            value = {
+                **self._result,
+                "object": "text_completion",
+                "choices": [self._choices[i].assemble_text(i) for i in sorted(self._choices)],
+            }
+            return cast(CompletionCreateResponse, construct_type(type_=CompletionCreateResponse, value=value))
+        return _chat_completion(self._result, self._choices)
+
+    def _add_completion_chunk(self, data: Dict[str, Any]) -> None:
+        result = self._result
+        for key in ("id", "created", "model"):
+            if key not in result and data.get(key) is not None:
+                result[key] = data[key]
+        for key in ("usage", "perf_metrics"):
+            if data.get(key) is not None:
+                result[key] = data[key]
+        for choice in data.get("choices") or ():
+            index = choice.get("index", 0)
+            parts = self._choices.get(index)
+            if parts is None:
+                parts = self._choices[index] = _TextChoiceParts()
+            if choice.get("text"):
+                parts.content.append(choice["text"])
+                if self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+            if choice.get("prompt_token_ids"):
+                parts.prompt_token_ids = choice["prompt_token_ids"]
+            _add_choice(parts, choice)
+
+    def _add_message_event(self, data: Dict[str, Any]) -> None:
+        kind = data.get("type")
+        if kind == "message_start":
+            self._result.update(data.get("message") or {})
+        elif kind == "content_block_start":
+            self._blocks[data.get("index", len(self._blocks))] = [dict(data.get("content_block") or {}), {}]
+        elif kind == "content_block_delta":
+            delta: Dict[str, Any] = data.get("delta") or {}
+            source, target = _MESSAGE_DELTA_FIELDS.get(delta.get("type", ""), (None, None))
+            if source is None or target is None:
+                return
+            block = self._blocks.get(data.get("index", 0))
+            if block is None:
+                block = self._blocks[data.get("index", 0)] = [{}, {}]
+            block[1].setdefault(target, []).append(delta.get(source) or "")
+            if self.first_token_at is None:
+                self.first_token_at = time.monotonic()
+        elif kind == "message_delta":
+            self._result.update(data.get("delta") or {})
+            if data.get("usage"):
+                self._result["usage"] = {**(self._result.get("usage") or {}), **data["usage"]}
+
+    def _message(self) -> MessageCreateResponse:
+        content: List[Dict[str, Any]] = []
+        for index in sorted(self._blocks):
+            block, fields = self._blocks[index]
+            block = dict(block)
+            for field, fragments in fields.items():
+                joined = "".join(fragments)
+                if field == "input":
+                    block["input"] = json.loads(joined) if joined else block.get("input") or {}
+                else:
+                    block[field] = block.get(field, "") + joined
+            content.append(block)
+        value = {"type": "message", "role": "assistant", **self._result, "content": content}
+        return cast(MessageCreateResponse, construct_type(type_=MessageCreateResponse, value=value))
+
+
+def _detect_kind(data: Dict[str, Any]) -> Optional[StreamKind]:
+    if "choices" not in data and isinstance(data.get("type"), str):
+        return "message"
+    obj = data.get("object")
+    if obj == "chat.completion.chunk":
+        return "chat"
+    if obj == "text_completion":
+        return "completion"
+    for choice in data.get("choices") or ():
+        return "chat" if "delta" in choice else "completion"
+    return None
+
+
+def _has_delta(choice: Dict[str, Any]) -> bool:
+    delta: Dict[str, Any] = choice.get("delta") or {}
+    return bool(delta.get("content") or delta.get("reasoning_content") or delta.get("tool_calls"))
@@ -0,0 +1,335 @@
+"""Lightweight iteration over ``chat.completions.create(stream=True)`` responses.
+
+``Stream[ChatCompletionChunk]`` builds a pydantic ``ChatCompletionChunk`` for every
+server-sent event. At high token rates that construction dominates client CPU, so
+:func:`iter_chat_chunks` / :func:`aiter_chat_chunks` yield :class:`ChatChunk`
+objects instead: slotted views over the decoded JSON that are promoted to the
+pydantic model only when :meth:`ChatChunk.to_model` is called.
+:class:`ChatCompletionAggregator` collects the chunks and builds the final
+``CompletionCreateResponse`` once, at the end of the stream.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Dict, List, Union, Iterable, Iterator, Optional, AsyncIterator, cast
+from typing_extensions import override
+
+from ..._models import BaseModel, construct_type
+from ..._streaming import Stream, AsyncStream
+from ...types.chat.chat_completion_chunk import ChatCompletionChunk
+from ...types.chat.completion_create_response import CompletionCreateResponse
+
+__all__ = ["ChatChunk", "ChatChunkChoice", "ChatCompletionAggregator", "iter_chat_chunks", "aiter_chat_chunks"]
+
+
+class ChatChunkChoice:
+    """One streamed choice of a :class:`ChatChunk`; fields mirror ``ChoiceDelta`` plus the choice metadata."""
+
+    __slots__ = (
+        "index",
+        "role",
+        "content",
+        "reasoning_content",
+        "tool_calls",
+        "finish_reason",
+        "logprobs",
+        "token_ids",
+    )
+
+    index: int
+    role: Optional[str]
+    content: Optional[str]
+    reasoning_content: Optional[str]
+    tool_calls: Optional[List[Dict[str, Any]]]
+    """Raw tool call fragments; merge them by their ``index`` key."""
+    finish_reason: Optional[str]
+    logprobs: Optional[Dict[str, Any]]
+    token_ids: Optional[List[int]]
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        delta: Dict[str, Any] = data.get("delta") or {}
+        self.index = data.get("index", 0)
+        self.role = delta.get("role")
+        self.content = delta.get("content")
+        self.reasoning_content = delta.get("reasoning_content")
+        self.tool_calls = delta.get("tool_calls")
+        self.finish_reason = data.get("finish_reason")
+        self.logprobs = data.get("logprobs")
+        self.token_ids = data.get("token_ids")
+
+    @override
+    def __repr__(self) -> str:
+        return f"ChatChunkChoice(index={self.index}, content={self.content!r}, finish_reason={self.finish_reason})"
+
+
+class ChatChunk:
+    """A streamed chat completion chunk backed by its decoded JSON.
+
+    Reading attributes costs no model construction. :meth:`to_model` builds (and
+    caches) the equivalent ``ChatCompletionChunk`` when the full model is needed.
+    """
+
+    __slots__ = ("data", "choices", "_model")
+
+    data: Dict[str, Any]
+    """The decoded JSON payload of the event."""
+    choices: List[ChatChunkChoice]
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        self.choices = [ChatChunkChoice(choice) for choice in data.get("choices") or ()]
+        self._model: Optional[ChatCompletionChunk] = None
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.data.get("id")
+
+    @property
+    def model(self) -> Optional[str]:
+        return self.data.get("model")
+
+    @property
+    def created(self) -> Optional[int]:
+        return self.data.get("created")
+
+    @property
+    def usage(self) -> Optional[Dict[str, Any]]:
+        return self.data.get("usage")
+
+    @property
+    def content(self) -> Optional[str]:
+        """Content delta of the first choice, the common case with ``n=1``"""
+        return self.choices[0].content if self.choices else None
+
+    def to_model(self) -> ChatCompletionChunk:
+        if self._model is None:
+            self._model = cast(ChatCompletionChunk, construct_type(type_=ChatCompletionChunk, value=self.data))
+        return self._model
+
+    @override
+    def __repr__(self) -> str:
+        return f"ChatChunk(id={self.id}, choices={self.choices!r})"
+
+
+def iter_chat_chunks(stream: Stream[ChatCompletionChunk]) -> Iterator[ChatChunk]:
+    """Iterate over ``stream`` as :class:`ChatChunk` objects instead of pydantic models.
+
+    Use it in place of iterating the stream itself, not in addition to it.
+    """
+    try:
+        for data in stream._iter_data():
+            yield ChatChunk(data)
+    finally:
+        stream.response.close()
+
+
+async def aiter_chat_chunks(stream: AsyncStream[ChatCompletionChunk]) -> AsyncIterator[ChatChunk]:
+    """Async variant of :func:`iter_chat_chunks`."""
+    try:
+        async for data in stream._iter_data():
+            yield ChatChunk(data)
+    finally:
+        await stream.response.aclose()
+
+
+_MISSING: Any = object()
+
+
+class _LogprobColumns:
+    """Per-token logprob entries kept column by column until the response is assembled.
+
+    ``logprob`` values go into an ``array('d')`` (NaN where absent) and every
+    other field into one list per key, so no per-token dict outlives its chunk.
+    """
+
+    __slots__ = ("size", "logprob", "fields")
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.logprob = array("d")
+        self.fields: Dict[str, List[Any]] = {}
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> None:
+        fields = self.fields
+        for entry in entries:
+            logprob = entry.get("logprob")
+            self.logprob.append(float("nan") if logprob is None else logprob)
+            for key, value in entry.items():
+                if key == "logprob":
+                    continue
+                column = fields.get(key)
+                if column is None:
+                    column = fields[key] = [_MISSING] * self.size
+                column.append(value)
+            self.size += 1
+            for column in fields.values():
+                if len(column) < self.size:
+                    column.append(_MISSING)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        columns = list(self.fields.items())
+        result: List[Dict[str, Any]] = []
+        for i, logprob in enumerate(self.logprob):
+            entry = {key: column[i] for key, column in columns if column[i] is not _MISSING}
+            if logprob == logprob:  # not NaN
+                entry["logprob"] = logprob
+            result.append(entry)
+        return result
+
+
+class _ChoiceParts:
+    __slots__ = (
+        "role",
+        "content",
+        "reasoning",
+        "tool_calls",
+        "finish_reason",
+        "logprobs",
+        "legacy_logprobs",
+        "legacy_token_logprobs",
+        "token_ids",
+        "raw_output",
+    )
+
+    def __init__(self) -> None:
+        self.role: Optional[str] = None
+        self.content: List[str] = []
+        self.reasoning: List[str] = []
+        # Tool call index -> [id, type, name fragments, argument fragments].
+        self.tool_calls: Dict[int, List[Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.logprobs = _LogprobColumns()
+        # Legacy (completions style) logprobs are already columns; token_logprobs
+        # is kept in an array('d'), with NaN for None.
+        self.legacy_logprobs: Dict[str, List[Any]] = {}
+        self.legacy_token_logprobs: Optional[array[float]] = None
+        self.token_ids: List[int] = []
+        self.raw_output: Optional[Dict[str, Any]] = None
+
+    def assemble(self, index: int) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": self.role or "assistant", "content": "".join(self.content)}
+        if self.reasoning:
+            message["reasoning_content"] = "".join(self.reasoning)
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": call_id,
+                    "type": call_type or "function",
+                    "function": {"name": "".join(name), "arguments": "".join(arguments)},
+                }
+                for call_id, call_type, name, arguments in (self.tool_calls[i] for i in sorted(self.tool_calls))
+            ]
+        choice: Dict[str, Any] = {"index": index, "message": message, "finish_reason": self.finish_reason}
+        logprobs = self.assemble_logprobs()
+        if logprobs is not None:
+            choice["logprobs"] = logprobs
+        if self.token_ids:
+            choice["token_ids"] = self.token_ids
+        if self.raw_output is not None:
+            choice["raw_output"] = self.raw_output
+        return choice
+
+    def assemble_logprobs(self) -> Optional[Dict[str, Any]]:
+        if self.logprobs.size:
+            return {"content": self.logprobs.entries()}
+        if self.legacy_token_logprobs is None and not self.legacy_logprobs:
+            return None
+        legacy: Dict[str, Any] = dict(self.legacy_logprobs)
+        if self.legacy_token_logprobs is not None:
+            legacy["token_logprobs"] = [value if value == value else None for value in self.legacy_token_logprobs]
+        return legacy
+
+
+class ChatCompletionAggregator:
+    """Assembles the final ``CompletionCreateResponse`` of a chat completion stream.
+
+    :meth:`add` only keeps a reference to each chunk's decoded JSON. :meth:`completion`
+    walks them once, joining content and tool call argument fragments (merged by tool
+    call ``index``), concatenating logprobs and token ids, and keeping the last usage,
+    then constructs the response model a single time.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[Dict[str, Any]] = []
+
+    def add(self, chunk: Union[ChatChunk, ChatCompletionChunk, Dict[str, Any]]) -> None:
+        if isinstance(chunk, ChatChunk):
+            self._chunks.append(chunk.data)
+        elif isinstance(chunk, BaseModel):
+            self._chunks.append(chunk.to_dict(mode="json"))
+        else:
+            self._chunks.append(chunk)
+
+    def completion(self) -> CompletionCreateResponse:
+        result: Dict[str, Any] = {}
+        choices: Dict[int, _ChoiceParts] = {}
+        for data in self._chunks:
+            _add_chat_chunk(result, choices, data)
+        return _chat_completion(result, choices)
+
+
+def _add_chat_chunk(result: Dict[str, Any], choices: Dict[int, _ChoiceParts], data: Dict[str, Any]) -> None:
+    for key in ("id", "created", "model", "prompt_token_ids"):
+        if key not in result and data.get(key) is not None:
+            result[key] = data[key]
+    for key in ("usage", "perf_metrics"):
+        if data.get(key) is not None:
+            result[key] = data[key]
+    for choice in data.get("choices") or ():
+        index = choice.get("index", 0)
+        parts = choices.get(index)
+        if parts is None:
+            parts = choices[index] = _ChoiceParts()
+        _add_choice(parts, choice)
+
+
+def _chat_completion(result: Dict[str, Any], choices: Dict[int, _ChoiceParts]) -> CompletionCreateResponse:
+    value = {**result, "object": "chat.completion", "choices": [choices[i].assemble(i) for i in sorted(choices)]}
+    return cast(CompletionCreateResponse, construct_type(type_=CompletionCreateResponse, value=value))
+
+
+def _add_choice(parts: _ChoiceParts, choice: Dict[str, Any]) -> None:
+    delta: Dict[str, Any] = choice.get("delta") or {}
+    if delta.get("role"):
+        parts.role = delta["role"]
+    if delta.get("content"):
+        parts.content.append(delta["content"])
+    if delta.get("reasoning_content"):
+        parts.reasoning.append(delta["reasoning_content"])
+    for position, call in enumerate(delta.get("tool_calls") or ()):
+        slot = parts.tool_calls.get(call.get("index", position))
+        if slot is None:
+            slot = parts.tool_calls[call.get("index", position)] = [None, None, [], []]
+        if call.get("id"):
+            slot[0] = call["id"]
+        if call.get("type"):
+            slot[1] = call["type"]
+        function = call.get("function") or {}
+        if function.get("name"):
+            slot[2].append(function["name"])
+        if function.get("arguments"):
+            slot[3].append(function["arguments"])
+    if choice.get("finish_reason"):
+        parts.finish_reason = choice["finish_reason"]
+    logprobs: Optional[Dict[str, Any]] = choice.get("logprobs")
+    if logprobs:
+        content: Optional[List[Dict[str, Any]]] = logprobs.get("content")
+        if content is not None:
+            parts.logprobs.extend(content)
+        else:
+            for key, values in logprobs.items():
+                if not isinstance(values, list):
+                    continue
+                if key == "token_logprobs":
+                    if parts.legacy_token_logprobs is None:
+                        parts.legacy_token_logprobs = array("d")
+                    parts.legacy_token_logprobs.extend(
+                        float("nan") if value is None else value for value in cast(List[Optional[float]], values)
+                    )
+                else:
+                    parts.legacy_logprobs.setdefault(key, []).extend(cast(List[Any], values))
+    if choice.get("token_ids"):
+        parts.token_ids.extend(choice["token_ids"])
+    if choice.get("raw_output"):
+        parts.raw_output = choice["raw_output"]
@@ -41,18 +41,31 @@ from fireworks.training.sdk._constants import (
 from fireworks.training.sdk.deployment import (
     DEFAULT_CHECKSUM_FORMAT,
     DEFAULT_DELTA_COMPRESSION,
+    HedgePolicy,
+    RetryBudget,
+    RequestTiming,
     ServerMetrics,
+    AdmissionClass,
+    AdmissionQueue,
+    CircuitBreaker,
     DeploymentInfo,
     DeploymentConfig,
+    ConcurrencyBroker,
     DeploymentManager,
     DeploymentSampler,
     SampledCompletion,
     SamplingRequestError,
+    DeploymentSamplerPool,
     FixedConcurrencyController,
+    SharedConcurrencyController,
     AdaptiveConcurrencyController,
     DeploymentSamplerTimeoutError,
+    GradientConcurrencyController,
     SamplingConcurrencyController,
+    TokenAwareConcurrencyController,
+    TokenBudgetConcurrencyController,
 )
+from fireworks.training.sdk.tokenization import TokenizerWorkerPool
 from fireworks.training.sdk.tinker_compat import (
     install_tinker_service_client,
     patched_tinker_service_client,
@@ -115,10 +128,23 @@ __all__ = [
     "SamplingConcurrencyController",
     "AdaptiveConcurrencyController",
     "FixedConcurrencyController",
+    "GradientConcurrencyController",
+    "TokenAwareConcurrencyController",
+    "TokenBudgetConcurrencyController",
+    "SharedConcurrencyController",
+    "ConcurrencyBroker",
+    "CircuitBreaker",
+    "HedgePolicy",
+    "RetryBudget",
+    "AdmissionClass",
+    "AdmissionQueue",
+    "DeploymentSamplerPool",
     "SampledCompletion",
+    "RequestTiming",
     "SamplingRequestError",
     "DeploymentSamplerTimeoutError",
     "ServerMetrics",
+    "TokenizerWorkerPool",
     # LR scheduler shared schema
     "ConstantSchedule",
     "LinearSchedule",
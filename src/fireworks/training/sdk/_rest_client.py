@@ -45,15 +45,70 @@ def _make_sync_client(verify: bool) -> httpx.Client:
     return httpx.Client(verify=verify, timeout=httpx.Timeout(60.0))
 
 
-def _make_async_client(verify: bool) -> httpx.AsyncClient:
+_ASYNC_LIMITS = httpx.Limits(
+    max_connections=256,
+    # Keep idle connections available for async sampling bursts.
+    max_keepalive_connections=64,
+)
+
+# Extra connections above the concurrency window: a released slot's
+# connection may still be closing when the next request is admitted.
+_POOL_HEADROOM = 16
+
+
+def _async_limits_for_window(max_window: int | None) -> httpx.Limits:
+    """Connection limits for at most ``max_window`` concurrent streams.
+
+    Without a bound, :data:`_ASYNC_LIMITS` applies.  Otherwise the pool holds
+    one connection per stream (plus headroom), so requests admitted by the
+    concurrency controller never queue invisibly inside httpx.
+    """
+    if max_window is None:
+        return _ASYNC_LIMITS
+    size = max(1, max_window) + _POOL_HEADROOM
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _resolve_http2(http2: bool) -> bool:
+    if http2 and not _http2_available():
+        logger.warning("http2=True needs the 'h2' package (pip install 'httpx[http2]'); using HTTP/1.1")
+        return False
+    return http2
+
+
+def _make_async_transport(
+    verify: bool, limits: httpx.Limits = _ASYNC_LIMITS, http2: bool = False
+) -> httpx.AsyncHTTPTransport:
+    return httpx.AsyncHTTPTransport(verify=verify, limits=limits, http2=_resolve_http2(http2))
+
+
+def _make_async_client(
+    verify: bool,
+    transport: httpx.AsyncBaseTransport | None = None,
+    *,
+    limits: httpx.Limits = _ASYNC_LIMITS,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    """Async sampling client; ``transport`` replaces the pooled HTTP transport (e.g. record/replay).
+
+    ``verify`` / ``limits`` / ``http2`` are passed to the client itself as well,
+    so the transports httpx builds for proxy mounts (``HTTPS_PROXY`` etc.) get
+    the same settings.
+    """
     return httpx.AsyncClient(
         verify=verify,
         timeout=httpx.Timeout(connect=30.0, read=600.0, write=30.0, pool=30.0),
-        limits=httpx.Limits(
-            max_connections=256,
-            # Keep idle connections available for async sampling bursts.
-            max_keepalive_connections=64,
-        ),
+        limits=limits,
+        http2=_resolve_http2(http2),
+        transport=transport,
     )
 
 
@@ -121,9 +176,14 @@ class _RestClient:
             return self._verify_ssl_override
         return _should_verify_ssl(url)
 
+    def _async_client_options(self) -> tuple[httpx.Limits, bool]:
+        """Connection limits and HTTP/2 flag for the lazily built async client."""
+        return _ASYNC_LIMITS, False
+
     def _get_async_client(self) -> httpx.AsyncClient:
         if self._async_client is None or self._async_client.is_closed:
-            self._async_client = _make_async_client(self._base_verify)
+            limits, http2 = self._async_client_options()
+            self._async_client = _make_async_client(self._base_verify, limits=limits, http2=http2)
         return self._async_client
 
     def _sync_request(self, url: str, **kwargs) -> httpx.Response:
@@ -2,7 +2,15 @@
 
 from __future__ import annotations
 
-from typing import Any
+import json
+from typing import Any, Callable
+
+from fireworks._streaming import SSELineDecoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is installed with tinker
+    orjson = None  # type: ignore[assignment]
 
 
 class _SSETruncationError(RuntimeError):
@@ -14,8 +22,16 @@ class _SSETruncationError(RuntimeError):
     :meth:`DeploymentSampler._do_one_completion` recognises this exact
     type and retries it; other ``RuntimeError`` subclasses propagate
     unchanged.
+
+    For ``n > 1`` requests, ``completed_choices`` holds the assembled choices
+    that did finish before the stream was cut, so only the missing ones need
+    to be sampled again.
     """
 
+    def __init__(self, message: str, *, completed_choices: list[dict[str, Any]] | None = None) -> None:
+        super().__init__(message)
+        self.completed_choices: list[dict[str, Any]] = completed_choices or []
+
 
 # =============================================================================
 # SSE decoder for streaming completions
@@ -43,6 +59,9 @@ class _SSEDecoder:
     * Comment lines (``:…``) are skipped
     * ``[DONE]`` sentinel terminates the stream
 
+    Lines are split by the shared linear-time
+    :class:`fireworks._streaming.SSELineDecoder`.
+
     .. _SSE spec: https://html.spec.whatwg.org/multipage/server-sent-events.html
     """
 
@@ -50,27 +69,18 @@ class _SSEDecoder:
         self._event: str | None = None
         self._data: list[str] = []
 
-    @staticmethod
-    async def _aiter_chunks(stream: Any) -> Any:
-        """Reassemble raw bytes into SSE chunks (delimited by blank lines)."""
-        buf = b""
-        async for raw in stream.aiter_bytes():
-            for line in raw.splitlines(keepends=True):
-                buf += line
-                if buf.endswith((b"\r\r", b"\n\n", b"\r\n\r\n")):
-                    yield buf
-                    buf = b""
-        if buf:
-            yield buf
-
     async def aiter_events(self, response: Any) -> Any:
         """Yield :class:`_SSEEvent` objects from an ``httpx.Response``."""
-        async for chunk in self._aiter_chunks(response):
-            for raw_line in chunk.splitlines():
-                line = raw_line.decode("utf-8")
+        lines = SSELineDecoder()
+        async for raw in response.aiter_bytes():
+            for line in lines.decode(raw):
                 event = self._decode_line(line)
                 if event is not None:
                     yield event
+        for line in lines.flush():
+            event = self._decode_line(line)
+            if event is not None:
+                yield event
 
     def _decode_line(self, line: str) -> _SSEEvent | None:
         # Blank line → dispatch accumulated event.
@@ -96,3 +106,70 @@ class _SSEDecoder:
             self._event = value
 
         return None
+
+
+# =============================================================================
+# Chunk JSON decoding
+# =============================================================================
+
+_json_loads: Callable[[str], Any] = orjson.loads if orjson is not None else json.loads
+
+# Fields of a streamed completions choice / per-token logprob entry that the
+# sampler reads; everything else (``token``, ``bytes``, ``top_logprobs``, …)
+# is dropped by the lean decoder.
+_LEAN_CHOICE_KEYS = ("index", "text", "token_ids", "finish_reason", "raw_output")
+_LEAN_TOKEN_KEYS = ("logprob", "sampling_logprob", "routing_matrix")
+_LEAN_CHUNK_KEYS = ("usage", "perf_metrics")
+
+
+def _decode_chunk(data: str) -> Any:
+    """Decode one SSE ``data`` payload (``orjson`` when installed)."""
+    return _json_loads(data)
+
+
+def _decode_chunk_lean(data: str) -> Any:
+    """Decode one SSE ``data`` payload, keeping only the fields the sampler uses.
+
+    The payload is still parsed in full, so this costs slightly more than
+    :func:`_decode_chunk` per event; what it saves is memory afterwards.
+    Per-token logprob entries shrink to ``logprob`` / ``sampling_logprob`` /
+    ``routing_matrix``, so a long rollout retains a few small dicts per token
+    instead of the full entry (token text, bytes, top-k alternatives).
+    """
+    chunk = _json_loads(data)
+    if not isinstance(chunk, dict):
+        return chunk
+    lean: dict[str, Any] = {key: chunk[key] for key in _LEAN_CHUNK_KEYS if key in chunk}
+    choices = chunk.get("choices")
+    if choices:
+        lean_choices = []
+        for choice in choices:
+            lean_choice = {key: choice[key] for key in _LEAN_CHOICE_KEYS if key in choice}
+            lp = choice.get("logprobs")
+            if lp and isinstance(lp, dict):
+                content = lp.get("content")
+                if isinstance(content, list):
+                    lean_choice["logprobs"] = {
+                        "content": [{key: tok[key] for key in _LEAN_TOKEN_KEYS if key in tok} for tok in content]
+                    }
+            lean_choices.append(lean_choice)
+        lean["choices"] = lean_choices
+    return lean
+
+
+_CHUNK_DECODERS: dict[str, Callable[[str], Any]] = {
+    "json": _decode_chunk,
+    "lean": _decode_chunk_lean,
+}
+
+
+def _resolve_chunk_decoder(decoder: str | Callable[[str], Any]) -> Callable[[str], Any]:
+    """Map a ``chunk_decoder`` argument (name or callable) to a callable."""
+    if callable(decoder):
+        return decoder
+    try:
+        return _CHUNK_DECODERS[decoder]
+    except KeyError:
+        raise ValueError(
+            f"Unknown chunk_decoder {decoder!r}; expected one of {sorted(_CHUNK_DECODERS)} or a callable"
+        ) from None
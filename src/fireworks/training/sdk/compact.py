@@ -0,0 +1,112 @@
+"""Array-backed, list-compatible sequences for compact SampledCompletions."""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any, Iterator, Sequence, overload
+from itertools import chain
+
+
+class CompactSequence(Sequence[Any]):
+    """Read-only sequence stored as an optional shared prefix plus a tail array.
+
+    Used by :class:`~fireworks.training.sdk.sampling.DeploymentSampler` in
+    ``compact_completions`` mode: token ids live in ``array('i')`` (int32) and
+    logprobs in ``array('f')`` (float32) instead of one Python object per
+    element, and the ``n`` completions of a prompt all reference the same
+    prompt buffer as their prefix instead of each holding a copy.
+
+    Behaves like the list it replaces for reading: ``len``, indexing,
+    slicing (returns a ``list``), iteration, ``==`` against any sequence and
+    ``+`` with a list.  :meth:`tolist` materializes a plain list and
+    :meth:`numpy` returns an ``int32`` / ``float32`` array.
+    """
+
+    __slots__ = ("_head", "_tail")
+
+    def __init__(self, tail: array, head: array | None = None):
+        self._tail = tail
+        self._head = head if head is not None else array(tail.typecode)
+
+    @classmethod
+    def tokens(cls, completion_ids: Sequence[int], prompt: array | None = None) -> "CompactSequence":
+        """``prompt`` (shared, never mutated) followed by ``completion_ids`` as int32."""
+        return cls(array("i", completion_ids), prompt)
+
+    @classmethod
+    def floats(cls, values: Sequence[float]) -> "CompactSequence":
+        """``values`` stored as float32."""
+        return cls(array("f", values))
+
+    @property
+    def typecode(self) -> str:
+        return self._tail.typecode
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the tail (the shared prefix is not counted)."""
+        return len(self._tail) * self._tail.itemsize
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self._tail)
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        head_len = len(self._head)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if stop <= start:
+                return []
+            out = self._head[start:min(stop, head_len)].tolist() if start < head_len else []
+            if stop > head_len:
+                out.extend(self._tail[max(start - head_len, 0) : stop - head_len].tolist())
+            return out
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("CompactSequence index out of range")
+        if index < head_len:
+            return self._head[index]
+        return self._tail[index - head_len]
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain(self._head, self._tail)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CompactSequence):
+            return self.tolist() == other.tolist()
+        if isinstance(other, (list, tuple, array)):
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __add__(self, other: Sequence[Any]) -> list[Any]:
+        return self.tolist() + list(other)
+
+    def __radd__(self, other: Sequence[Any]) -> list[Any]:
+        return list(other) + self.tolist()
+
+    def __repr__(self) -> str:
+        return f"CompactSequence({self.typecode!r}, {self.tolist()!r})"
+
+    def tolist(self) -> list[Any]:
+        return self._head.tolist() + self._tail.tolist()
+
+    def numpy(self) -> Any:
+        """Return the values as a NumPy ``int32`` / ``float32`` array."""
+        try:
+            import numpy as np
+        except ImportError as err:
+            raise ImportError("NumPy is not installed. Use tolist() instead.") from err
+        dtype = np.int32 if self.typecode == "i" else np.float32
+        if not len(self._head):
+            return np.frombuffer(self._tail, dtype=dtype)
+        return np.concatenate([np.frombuffer(self._head, dtype=dtype), np.frombuffer(self._tail, dtype=dtype)])
@@ -1,10 +1,16 @@
-"""Concurrency controllers for DeploymentSampler completions (fixed + AIMD)."""
+"""Concurrency controllers for DeploymentSampler completions (fixed, AIMD, gradient, token budget)."""
 
 from __future__ import annotations
 
+import math
+import time
 import asyncio
 import logging
-from typing import TYPE_CHECKING, Protocol, runtime_checkable
+from typing import TYPE_CHECKING, Protocol, Sequence, runtime_checkable
+from collections import deque
+from dataclasses import dataclass
+
+from fireworks.training.sdk.streaming_stats import QuantileSketch
 
 if TYPE_CHECKING:
     from fireworks.training.sdk.sampling import ServerMetrics
@@ -12,9 +18,25 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def _quantile_summary(prefix: str, sketch: QuantileSketch) -> dict[str, float]:
+    """``<prefix>_p50`` / ``_p95`` / ``_p99`` of a step sketch (empty if no samples)."""
+    out: dict[str, float] = {}
+    for q in (0.5, 0.95, 0.99):
+        value = sketch.quantile(q)
+        if value is not None:
+            out[f"{prefix}_p{q * 100:g}"] = value
+    return out
+
+
 @runtime_checkable
 class SamplingConcurrencyController(Protocol):
-    """Interface for controlling concurrent deployment sampling requests."""
+    """Interface for controlling concurrent deployment sampling requests.
+
+    The built-in controllers also accept an optional ``priority`` keyword on
+    ``acquire`` / ``release`` (the admission class of the request, see
+    :class:`AdmissionQueue`).  ``DeploymentSampler`` only passes it when a
+    sample call sets ``priority``, so custom controllers need not support it.
+    """
 
     @property
     def window_size(self) -> int: ...
@@ -26,33 +48,232 @@ class SamplingConcurrencyController(Protocol):
     def step_completed(self) -> dict[str, float]: ...
 
 
+@runtime_checkable
+class TokenAwareConcurrencyController(SamplingConcurrencyController, Protocol):
+    """Controller that admits requests by estimated token cost.
+
+    ``DeploymentSampler`` calls :meth:`acquire_tokens` / :meth:`release_tokens`
+    with ``(prompt tokens + max_tokens) * n`` instead of :meth:`acquire` /
+    :meth:`release` when its controller implements this interface.
+    """
+
+    async def acquire_tokens(self, cost: int, priority: str | None = None) -> None: ...
+
+    def release_tokens(
+        self, cost: int, metrics: "ServerMetrics | None" = None, priority: str | None = None
+    ) -> None: ...
+
+
+# =============================================================================
+# AdmissionQueue — weighted priority semaphore shared by the controllers
+# =============================================================================
+
+
+@dataclass(frozen=True)
+class AdmissionClass:
+    """Scheduling parameters of one admission class (e.g. ``"eval"``).
+
+    Classes with a higher ``priority`` are always served first (strict
+    priority).  Classes with the same priority share capacity in proportion
+    to ``weight`` (weighted-fair).  ``max_in_flight`` caps the requests of
+    this class admitted at once.
+    """
+
+    name: str
+    priority: int = 0
+    weight: float = 1.0
+    max_in_flight: int | None = None
+
+
+class _ClassState:
+    __slots__ = ("spec", "waiters", "in_flight", "vtime", "wait_total", "wait_max", "admitted")
+
+    def __init__(self, spec: AdmissionClass):
+        self.spec = spec
+        self.waiters: deque[tuple[int, float, asyncio.Future[None]]] = deque()
+        self.in_flight = 0
+        # Virtual time: units served / weight (weighted-fair ordering).
+        self.vtime = 0.0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.admitted = 0
+
+    def head(self) -> tuple[int, float, asyncio.Future[None]] | None:
+        while self.waiters and self.waiters[0][2].done():
+            self.waiters.popleft()
+        return self.waiters[0] if self.waiters else None
+
+
+class AdmissionQueue:
+    """Semaphore of ``value`` units with per-class priority queues.
+
+    ``acquire(cost, priority)`` takes ``cost`` units for a request of
+    admission class ``priority`` (``None`` is the ``"default"`` class;
+    unknown names get priority 0, weight 1).  When units free up, waiters are
+    admitted by strict class priority, then weighted-fair among classes of
+    equal priority, FIFO within a class.  A class at its ``max_in_flight``
+    is skipped; otherwise a head request that does not fit blocks the ones
+    behind it, so large requests are not starved.  A request larger than
+    the whole capacity is admitted when nothing else is in flight.
+
+    ``_value`` holds the free units, like ``asyncio.Semaphore._value``, so
+    a controller may grow it with :meth:`add` or shrink it directly.  Per
+    class queue wait times are collected until :meth:`drain_wait_stats`.
+    """
+
+    DEFAULT_CLASS = "default"
+
+    def __init__(self, value: int, classes: Sequence[AdmissionClass] | None = None):
+        self._value: int = value
+        self._in_flight: int = 0
+        self._classes: dict[str, _ClassState] = {}
+        for spec in classes or ():
+            if spec.weight <= 0:
+                raise ValueError(f"admission class {spec.name!r}: weight must be positive")
+            self._classes[spec.name] = _ClassState(spec)
+
+    def _state(self, priority: str | None) -> _ClassState:
+        name = priority if priority is not None else self.DEFAULT_CLASS
+        state = self._classes.get(name)
+        if state is None:
+            state = self._classes[name] = _ClassState(AdmissionClass(name))
+        return state
+
+    def _fits(self, state: _ClassState, cost: int) -> bool:
+        limit = state.spec.max_in_flight
+        if limit is not None and state.in_flight >= limit:
+            return False
+        return self._in_flight == 0 or self._value >= cost
+
+    def _admit(self, state: _ClassState, cost: int, waited: float) -> None:
+        self._value -= cost
+        self._in_flight += 1
+        state.in_flight += 1
+        state.vtime += cost / state.spec.weight
+        state.admitted += 1
+        state.wait_total += waited
+        state.wait_max = max(state.wait_max, waited)
+
+    def _wake(self) -> None:
+        while True:
+            backlogged = [state for state in self._classes.values() if state.head() is not None]
+            if not backlogged:
+                return
+            backlogged.sort(key=lambda state: (-state.spec.priority, state.vtime))
+            for state in backlogged:
+                cost, enqueued_at, future = state.waiters[0]
+                limit = state.spec.max_in_flight
+                if limit is not None and state.in_flight >= limit:
+                    continue
+                if not self._fits(state, cost):
+                    # Head-of-line blocking keeps large requests from starving.
+                    return
+                state.waiters.popleft()
+                self._admit(state, cost, time.monotonic() - enqueued_at)
+                future.set_result(None)
+                break
+            else:
+                return
+
+    async def acquire(self, cost: int = 1, priority: str | None = None) -> None:
+        state = self._state(priority)
+        if state.head() is None:
+            # An idle class must not bank credit while it had nothing queued.
+            active = [other.vtime for other in self._classes.values() if other.head() is not None]
+            if active:
+                state.vtime = max(state.vtime, min(active))
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        state.waiters.append((cost, time.monotonic(), future))
+        # Admits immediately unless an earlier or higher-priority request
+        # is still waiting.
+        self._wake()
+        if future.done():
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before the waiter was cancelled: give it back.
+                self.release(cost, priority)
+            else:
+                self._wake()
+            raise
+
+    def release(self, cost: int = 1, priority: str | None = None) -> None:
+        self._value += cost
+        self._in_flight = max(0, self._in_flight - 1)
+        state = self._state(priority)
+        state.in_flight = max(0, state.in_flight - 1)
+        self._wake()
+
+    def add(self, units: int) -> None:
+        """Grow (or, with a negative value, shrink) the free units."""
+        self._value += units
+        self._wake()
+
+    def queued(self, priority: str | None = None) -> int:
+        """Requests waiting in one class, or in all classes."""
+        states = [self._state(priority)] if priority is not None else list(self._classes.values())
+        return sum(1 for state in states for _, _, future in state.waiters if not future.done())
+
+    def drain_wait_stats(self) -> dict[str, float]:
+        """Per-class ``admitted/<class>``, ``queue_wait_avg/<class>`` and
+        ``queue_wait_max/<class>`` (seconds) since the last drain.
+
+        Empty while only the default class is in use.
+        """
+        stats: dict[str, float] = {}
+        named = any(name != self.DEFAULT_CLASS for name in self._classes)
+        for name, state in self._classes.items():
+            if not named:
+                state.admitted = 0
+                state.wait_total = 0.0
+                state.wait_max = 0.0
+                continue
+            if not state.admitted:
+                continue
+            stats[f"admitted/{name}"] = float(state.admitted)
+            stats[f"queue_wait_avg/{name}"] = state.wait_total / state.admitted
+            stats[f"queue_wait_max/{name}"] = state.wait_max
+            state.admitted = 0
+            state.wait_total = 0.0
+            state.wait_max = 0.0
+        return stats
+
+
 # =============================================================================
 # FixedConcurrencyController — static semaphore
 # =============================================================================
 
 
 class FixedConcurrencyController(SamplingConcurrencyController):
-    """Fixed concurrency controller backed by an asyncio.Semaphore.
+    """Fixed concurrency controller backed by an :class:`AdmissionQueue`.
 
     Implements ``SamplingConcurrencyController`` with a static window.
+    ``admission_classes`` configures per-class priorities, weights and
+    limits for requests sampled with ``priority=...``.
     """
 
-    def __init__(self, max_concurrency: int):
+    def __init__(self, max_concurrency: int, admission_classes: Sequence[AdmissionClass] | None = None):
         self._max_concurrency = max_concurrency
-        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._semaphore = AdmissionQueue(max_concurrency, admission_classes)
 
     @property
     def window_size(self) -> int:
         return self._max_concurrency
 
-    async def acquire(self) -> None:
-        await self._semaphore.acquire()
+    @property
+    def max_window(self) -> int:
+        return self._max_concurrency
+
+    async def acquire(self, priority: str | None = None) -> None:
+        await self._semaphore.acquire(priority=priority)
 
-    def release(self, metrics: "ServerMetrics | None" = None) -> None:
-        self._semaphore.release()
+    def release(self, metrics: "ServerMetrics | None" = None, priority: str | None = None) -> None:
+        self._semaphore.release(priority=priority)
 
     def step_completed(self) -> dict[str, float]:
-        return {"window": float(self._max_concurrency)}
+        return {"window": float(self._max_concurrency), **self._semaphore.drain_wait_stats()}
 
 
 # =============================================================================
@@ -70,6 +291,9 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
     growth), capped at ``_MAX_INCREASE_FACTOR``.
 
     Compatible with ``DeploymentSampler`` -- pass as ``concurrency_controller``.
+    Requests are admitted through an :class:`AdmissionQueue`;
+    ``admission_classes`` configures per-class priorities, weights and limits
+    for requests sampled with ``priority=...``.
     """
 
     # -- Internal constants (not user-configurable) --
@@ -94,6 +318,7 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         multiplicative_decrease: float = _DEFAULT_MULTIPLICATIVE_DECREASE,
         ema_alpha: float = _DEFAULT_EMA_ALPHA,
         adjustment_interval: int = _DEFAULT_ADJUSTMENT_INTERVAL,
+        admission_classes: Sequence[AdmissionClass] | None = None,
     ):
         if adjustment_interval < 0:
             raise ValueError("adjustment_interval must be non-negative")
@@ -108,14 +333,17 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         self._adjustment_interval = adjustment_interval
 
         self._ema_prefill_queue: float | None = None
-        self._semaphore = asyncio.Semaphore(initial_window)
+        self._semaphore = AdmissionQueue(initial_window, admission_classes)
         self._interval_requests: int = 0
 
         self._completed_requests: int = 0
         self._last_logged_window: int = initial_window
 
         # Batch-level metrics: collected per-request, aggregated at step boundary.
-        self._prefill_queues: list[float] = []
+        # Constant-memory sketches: the interval one feeds the AIMD update,
+        # the step one reports queue quantiles in step_completed().
+        self._interval_pq = QuantileSketch()
+        self._step_pq = QuantileSketch()
         self._step_metrics_count: int = 0
         self._step_cache_hits: int = 0
         self._step_cache_total: int = 0
@@ -124,25 +352,31 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
     def window_size(self) -> int:
         return max(self._min_window, min(self._max_window, int(self._window)))
 
+    @property
+    def max_window(self) -> int:
+        """Upper bound of :attr:`window_size`; sizes the sampler's connection pool."""
+        return self._max_window
+
     @property
     def ema_prefill_queue(self) -> float | None:
         return self._ema_prefill_queue
 
-    async def acquire(self) -> None:
-        await self._semaphore.acquire()
+    async def acquire(self, priority: str | None = None) -> None:
+        await self._semaphore.acquire(priority=priority)
 
-    def release(self, metrics: ServerMetrics | None = None) -> None:
+    def release(self, metrics: ServerMetrics | None = None, priority: str | None = None) -> None:
         """Release a slot, collect metrics, and optionally adjust the window.
 
         A positive ``adjustment_interval`` adjusts after that many completed
         requests. :meth:`step_completed` adjusts any remaining requests and
         starts a fresh interval for the next RL step.
         """
-        self._semaphore.release()
+        self._semaphore.release(priority=priority)
         self._completed_requests += 1
         if metrics is not None:
             if metrics.prefill_queue_duration is not None:
-                self._prefill_queues.append(metrics.prefill_queue_duration)
+                self._interval_pq.add(metrics.prefill_queue_duration)
+                self._step_pq.add(metrics.prefill_queue_duration)
             self._step_metrics_count += 1
             if metrics.cached_prompt_tokens is not None:
                 self._step_cache_hits += metrics.cached_prompt_tokens
@@ -152,12 +386,9 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         if self._adjustment_interval > 0:
             self._interval_requests += 1
             if self._interval_requests >= self._adjustment_interval:
-                if self._prefill_queues:
-                    avg_pq = sum(self._prefill_queues) / len(
-                        self._prefill_queues
-                    )
-                    self._update_window(avg_pq)
-                self._prefill_queues.clear()
+                if self._interval_pq.count:
+                    self._update_window(self._interval_pq.sum / self._interval_pq.count)
+                self._interval_pq.clear()
                 self._interval_requests = 0
 
     def step_completed(self) -> dict[str, float]:
@@ -173,11 +404,12 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         }
 
         # Compute the average since the last adjustment.
-        if self._prefill_queues:
-            avg_pq = sum(self._prefill_queues) / len(self._prefill_queues)
+        if self._interval_pq.count:
+            avg_pq = self._interval_pq.sum / self._interval_pq.count
             summary["avg_pq"] = avg_pq
             self._update_window(avg_pq)
             summary["window_after"] = float(self.window_size)
+        summary.update(_quantile_summary("pq", self._step_pq))
 
         if self._step_cache_total > 0:
             summary["cache_hit_rate"] = self._step_cache_hits / self._step_cache_total
@@ -185,6 +417,8 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         if self._ema_prefill_queue is not None:
             summary["ema_pq"] = self._ema_prefill_queue
 
+        summary.update(self._semaphore.drain_wait_stats())
+
         logger.info(
             "AdaptiveConcurrency step: window=%d, reqs=%d, avg_pq=%.3fs, ema_pq=%s, cache=%.1f%%",
             self.window_size,
@@ -195,7 +429,8 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
         )
 
         # Reset per-step accumulators.
-        self._prefill_queues.clear()
+        self._interval_pq.clear()
+        self._step_pq.clear()
         self._interval_requests = 0
         self._step_metrics_count = 0
         self._step_cache_hits = 0
@@ -232,8 +467,7 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
     def _resize_semaphore(self, old_size: int, new_size: int) -> int:
         delta = new_size - old_size
         if delta > 0:
-            for _ in range(delta):
-                self._semaphore.release()
+            self._semaphore.add(delta)
             return new_size
         elif delta < 0:
             resized_size = old_size
@@ -245,3 +479,432 @@ class AdaptiveConcurrencyController(SamplingConcurrencyController):
                     break
             return resized_size
         return old_size
+
+
+# =============================================================================
+# GradientConcurrencyController — latency-gradient (Vegas-style) window
+# =============================================================================
+
+
+class GradientConcurrencyController(SamplingConcurrencyController):
+    """Concurrency controller that tracks the latency gradient, not a queue target.
+
+    Estimates the throughput-optimal window the way TCP Vegas and Netflix's
+    gradient limiter do.  Each request yields a latency sample: the first of
+    ``latency_metrics`` set on its ``ServerMetrics``.  The default is
+    ``server_ttft`` with ``client_ttft`` as a fallback; TTFT grows with
+    queueing but not with completion length.
+
+    Every ``adjustment_interval`` requests the controller compares the
+    interval's average latency (short) with a slow EMA over about
+    ``long_window`` requests (long), which serves as the no-load baseline:
+
+    - ``gradient = clamp(tolerance * long / short, 0.5, 1.0)``.
+    - ``target = window * gradient + sqrt(window)``.
+    - The window moves ``smoothing`` of the way towards ``target``.
+
+    Latency within ``tolerance`` of the baseline keeps the gradient at 1,
+    so the window grows by the ``sqrt(window)`` queue allowance.  Latency
+    above it shrinks the window in proportion to the overshoot instead of
+    halving it.  The window only grows while at least half of it is in use.
+
+    Shrinking does not wait for free slots.  New requests are held back
+    until the in-flight count drops below the new window.
+    """
+
+    _MIN_GRADIENT = 0.5
+    _MIN_LATENCY_FLOOR = 1e-4
+    _DEFAULT_INITIAL_WINDOW = 16
+    _DEFAULT_MIN_WINDOW = 1
+    _DEFAULT_MAX_WINDOW = 256
+    _DEFAULT_TOLERANCE = 1.5
+    _DEFAULT_SMOOTHING = 0.2
+    _DEFAULT_LONG_WINDOW = 600
+    _DEFAULT_ADJUSTMENT_INTERVAL = 16
+    _DEFAULT_LATENCY_METRICS = ("server_ttft", "client_ttft")
+
+    def __init__(
+        self,
+        initial_window: int = _DEFAULT_INITIAL_WINDOW,
+        min_window: int = _DEFAULT_MIN_WINDOW,
+        max_window: int = _DEFAULT_MAX_WINDOW,
+        tolerance: float = _DEFAULT_TOLERANCE,
+        smoothing: float = _DEFAULT_SMOOTHING,
+        long_window: int = _DEFAULT_LONG_WINDOW,
+        adjustment_interval: int = _DEFAULT_ADJUSTMENT_INTERVAL,
+        latency_metrics: Sequence[str] = _DEFAULT_LATENCY_METRICS,
+        admission_classes: Sequence[AdmissionClass] | None = None,
+    ):
+        if adjustment_interval < 0:
+            raise ValueError("adjustment_interval must be non-negative")
+        if tolerance < 1.0:
+            raise ValueError("tolerance must be at least 1.0")
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("smoothing must be in (0, 1]")
+        if long_window < 1:
+            raise ValueError("long_window must be at least 1")
+        if not latency_metrics:
+            raise ValueError("latency_metrics must name at least one ServerMetrics field")
+
+        self._min_window = min_window
+        self._max_window = max_window
+        self._window: float = float(max(min_window, min(max_window, initial_window)))
+        self._tolerance = tolerance
+        self._smoothing = smoothing
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._adjustment_interval = adjustment_interval
+        self._latency_metrics = tuple(latency_metrics)
+
+        self._semaphore = AdmissionQueue(self.window_size, admission_classes)
+        self._in_flight: int = 0
+        self._max_in_flight: int = 0
+        self._long_latency: float | None = None
+        self._gradient: float = 1.0
+        self._interval_requests: int = 0
+
+        # Step-level metrics, aggregated at the step boundary.
+        self._interval_latency = QuantileSketch()
+        self._step_latency = QuantileSketch()
+        self._step_metrics_count: int = 0
+
+    @property
+    def window_size(self) -> int:
+        return max(self._min_window, min(self._max_window, int(self._window)))
+
+    @property
+    def max_window(self) -> int:
+        """Upper bound of :attr:`window_size`; sizes the sampler's connection pool."""
+        return self._max_window
+
+    @property
+    def long_latency(self) -> float | None:
+        """Slow-moving baseline latency (seconds)."""
+        return self._long_latency
+
+    @property
+    def gradient(self) -> float:
+        """Last computed gradient (``1.0`` means no latency inflation)."""
+        return self._gradient
+
+    async def acquire(self, priority: str | None = None) -> None:
+        await self._semaphore.acquire(priority=priority)
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+    def release(self, metrics: "ServerMetrics | None" = None, priority: str | None = None) -> None:
+        """Release a slot, record the latency sample, and optionally adjust the window."""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._semaphore.release(priority=priority)
+        if metrics is not None:
+            self._step_metrics_count += 1
+            latency = self._latency_sample(metrics)
+            if latency is not None:
+                self._interval_latency.add(latency)
+                self._step_latency.add(latency)
+
+        if self._adjustment_interval > 0:
+            self._interval_requests += 1
+            if self._interval_requests >= self._adjustment_interval:
+                if self._interval_latency.count:
+                    self._update_window(self._interval_latency.sum / self._interval_latency.count)
+                self._interval_latency.clear()
+                self._interval_requests = 0
+                self._max_in_flight = self._in_flight
+
+    def _latency_sample(self, metrics: "ServerMetrics") -> float | None:
+        for name in self._latency_metrics:
+            value = getattr(metrics, name, None)
+            if value is not None:
+                return float(value)
+        return None
+
+    def _update_window(self, short_latency: float) -> None:
+        """Move the window towards ``window * gradient + sqrt(window)``."""
+        short_latency = max(short_latency, self._MIN_LATENCY_FLOOR)
+        if self._long_latency is None:
+            self._long_latency = short_latency
+        else:
+            self._long_latency += self._long_alpha * (short_latency - self._long_latency)
+            if self._long_latency / short_latency > 2.0:
+                # Load dropped well below the baseline's regime; let the
+                # baseline recover quickly instead of over its long window.
+                self._long_latency *= 0.9
+
+        self._gradient = max(self._MIN_GRADIENT, min(1.0, self._tolerance * self._long_latency / short_latency))
+        target = self._window * self._gradient + math.sqrt(self._window)
+        if target > self._window and self._max_in_flight < self._window / 2:
+            # Application-limited: more slots would not be used.
+            return
+
+        old_int_window = self.window_size
+        self._window = (1 - self._smoothing) * self._window + self._smoothing * target
+        self._window = max(float(self._min_window), min(float(self._max_window), self._window))
+        # Free units may go negative on a shrink; in-flight requests drain it.
+        self._semaphore.add(self.window_size - old_int_window)
+
+    def step_completed(self) -> dict[str, float]:
+        """Adjust the window from the step's remaining samples and return a summary."""
+        summary: dict[str, float] = {
+            "window": float(self.window_size),
+            "requests": float(self._step_metrics_count),
+        }
+        if self._step_latency.count:
+            summary["avg_latency"] = self._step_latency.sum / self._step_latency.count
+            summary.update(_quantile_summary("latency", self._step_latency))
+        if self._interval_latency.count:
+            self._update_window(self._interval_latency.sum / self._interval_latency.count)
+            summary["window_after"] = float(self.window_size)
+        if self._long_latency is not None:
+            summary["long_latency"] = self._long_latency
+            summary["gradient"] = self._gradient
+        summary.update(self._semaphore.drain_wait_stats())
+
+        logger.info(
+            "GradientConcurrency step: window=%d, reqs=%d, avg_latency=%.3fs, gradient=%.2f",
+            self.window_size,
+            self._step_metrics_count,
+            summary.get("avg_latency", 0.0),
+            self._gradient,
+        )
+
+        self._interval_latency.clear()
+        self._step_latency.clear()
+        self._interval_requests = 0
+        self._max_in_flight = self._in_flight
+        self._step_metrics_count = 0
+
+        return summary
+
+
+# =============================================================================
+# TokenBudgetConcurrencyController — AIMD over an in-flight token budget
+# =============================================================================
+
+
+class TokenBudgetConcurrencyController(TokenAwareConcurrencyController):
+    """AIMD controller that limits estimated in-flight *tokens*, not requests.
+
+    Each request costs ``prompt tokens + max_tokens`` (times ``n``) and is
+    admitted while the in-flight total stays within the budget, so a batch
+    mixing 200-token and 32k-token prompts loads the deployment evenly
+    instead of alternating between overload and idle.  Admission goes
+    through an :class:`AdmissionQueue` (FIFO within a class): a large
+    request waiting for room is not starved by small ones behind it, and a
+    request larger than the whole budget still runs when nothing else is in
+    flight.
+
+    The budget adapts like :class:`AdaptiveConcurrencyController`, from the
+    worse of ``prefill_queue_duration / prefill_queue_target`` and
+    ``generation_queue_duration / generation_queue_target``: multiplicative
+    decrease above 1, proportional additive increase below.
+
+    :attr:`window_size` reports the budget in requests of the average cost
+    seen so far.  Plain :meth:`acquire` / :meth:`release` charge
+    ``default_request_cost`` tokens.
+    """
+
+    _MAX_INCREASE_FACTOR = 4.0
+    _MIN_PRESSURE_FLOOR = 0.001
+    _DEFAULT_INITIAL_BUDGET = 262_144
+    _DEFAULT_MIN_BUDGET = 8_192
+    _DEFAULT_MAX_BUDGET = 8_388_608
+    _DEFAULT_PQ_TARGET = 0.5     # Prefill queue target in seconds.
+    _DEFAULT_GQ_TARGET = 1.0     # Generation queue target in seconds.
+    _DEFAULT_ADDITIVE_INCREASE = 16_384
+    _DEFAULT_MULTIPLICATIVE_DECREASE = 0.5
+    _DEFAULT_EMA_ALPHA = 0.3
+    _DEFAULT_ADJUSTMENT_INTERVAL = 32
+    _DEFAULT_REQUEST_COST = 4_096
+    _COST_EMA_ALPHA = 0.1
+
+    def __init__(
+        self,
+        initial_budget: int = _DEFAULT_INITIAL_BUDGET,
+        min_budget: int = _DEFAULT_MIN_BUDGET,
+        max_budget: int = _DEFAULT_MAX_BUDGET,
+        prefill_queue_target: float = _DEFAULT_PQ_TARGET,
+        generation_queue_target: float = _DEFAULT_GQ_TARGET,
+        additive_increase: int = _DEFAULT_ADDITIVE_INCREASE,
+        multiplicative_decrease: float = _DEFAULT_MULTIPLICATIVE_DECREASE,
+        ema_alpha: float = _DEFAULT_EMA_ALPHA,
+        adjustment_interval: int = _DEFAULT_ADJUSTMENT_INTERVAL,
+        default_request_cost: int = _DEFAULT_REQUEST_COST,
+        admission_classes: Sequence[AdmissionClass] | None = None,
+    ):
+        if adjustment_interval < 0:
+            raise ValueError("adjustment_interval must be non-negative")
+        if not 0 < min_budget <= max_budget:
+            raise ValueError("budget bounds must satisfy 0 < min_budget <= max_budget")
+        if default_request_cost < 1:
+            raise ValueError("default_request_cost must be at least 1")
+
+        self._min_budget = min_budget
+        self._max_budget = max_budget
+        self._budget: float = float(max(min_budget, min(max_budget, initial_budget)))
+        self._prefill_queue_target = prefill_queue_target
+        self._generation_queue_target = generation_queue_target
+        self._additive_increase = additive_increase
+        self._multiplicative_decrease = multiplicative_decrease
+        self._ema_alpha = ema_alpha
+        self._adjustment_interval = adjustment_interval
+        self._default_request_cost = default_request_cost
+
+        self._in_flight_tokens: int = 0
+        self._semaphore = AdmissionQueue(int(self._budget), admission_classes)
+        self._avg_cost: float = float(default_request_cost)
+        self._ema_pressure: float | None = None
+        self._interval_requests: int = 0
+
+        # Step-level metrics, aggregated at the step boundary.
+        self._interval_pq = QuantileSketch()
+        self._interval_gq = QuantileSketch()
+        self._step_pq = QuantileSketch()
+        self._step_gq = QuantileSketch()
+        self._step_metrics_count: int = 0
+        self._step_cache_hits: int = 0
+        self._step_cache_total: int = 0
+
+    @property
+    def budget(self) -> int:
+        return int(self._budget)
+
+    @property
+    def in_flight_tokens(self) -> int:
+        return self._in_flight_tokens
+
+    @property
+    def window_size(self) -> int:
+        return max(1, int(self._budget / max(self._avg_cost, 1.0)))
+
+    @property
+    def max_window(self) -> int:
+        """Requests that fit ``max_budget`` at ``default_request_cost`` each; sizes the sampler's connection pool."""
+        return max(1, self._max_budget // self._default_request_cost)
+
+    @property
+    def ema_pressure(self) -> float | None:
+        """Smoothed queue pressure (``> 1`` means above target)."""
+        return self._ema_pressure
+
+    # -- Admission ---------------------------------------------------------------
+
+    async def acquire_tokens(self, cost: int, priority: str | None = None) -> None:
+        cost = max(1, int(cost))
+        self._avg_cost += self._COST_EMA_ALPHA * (cost - self._avg_cost)
+        await self._semaphore.acquire(cost, priority)
+        self._in_flight_tokens += cost
+
+    def release_tokens(
+        self, cost: int, metrics: "ServerMetrics | None" = None, priority: str | None = None
+    ) -> None:
+        """Return ``cost`` tokens, collect metrics, and optionally adjust the budget."""
+        cost = max(1, int(cost))
+        self._in_flight_tokens = max(0, self._in_flight_tokens - cost)
+        self._semaphore.release(cost, priority)
+        if metrics is not None:
+            if metrics.prefill_queue_duration is not None:
+                self._interval_pq.add(metrics.prefill_queue_duration)
+                self._step_pq.add(metrics.prefill_queue_duration)
+            if metrics.generation_queue_duration is not None:
+                self._interval_gq.add(metrics.generation_queue_duration)
+                self._step_gq.add(metrics.generation_queue_duration)
+            self._step_metrics_count += 1
+            if metrics.cached_prompt_tokens is not None:
+                self._step_cache_hits += metrics.cached_prompt_tokens
+            if metrics.prompt_tokens is not None:
+                self._step_cache_total += metrics.prompt_tokens
+
+        if self._adjustment_interval > 0:
+            self._interval_requests += 1
+            if self._interval_requests >= self._adjustment_interval:
+                pressure = self._interval_pressure()
+                if pressure is not None:
+                    self._update_budget(pressure)
+                self._interval_pq.clear()
+                self._interval_gq.clear()
+                self._interval_requests = 0
+
+    async def acquire(self, priority: str | None = None) -> None:
+        await self.acquire_tokens(self._default_request_cost, priority)
+
+    def release(self, metrics: "ServerMetrics | None" = None, priority: str | None = None) -> None:
+        self.release_tokens(self._default_request_cost, metrics, priority)
+
+    # -- Adaptation --------------------------------------------------------------
+
+    def _interval_pressure(self) -> float | None:
+        """Worst queue duration relative to its target since the last adjustment."""
+        pressures = []
+        if self._interval_pq.count:
+            avg_pq = self._interval_pq.sum / self._interval_pq.count
+            pressures.append(avg_pq / self._prefill_queue_target)
+        if self._interval_gq.count:
+            avg_gq = self._interval_gq.sum / self._interval_gq.count
+            pressures.append(avg_gq / self._generation_queue_target)
+        return max(pressures) if pressures else None
+
+    def _update_budget(self, pressure: float) -> None:
+        """AIMD adjustment based on the averaged queue pressure."""
+        if self._ema_pressure is None:
+            self._ema_pressure = pressure
+        else:
+            a = self._ema_alpha
+            self._ema_pressure = a * pressure + (1 - a) * self._ema_pressure
+
+        old_budget = int(self._budget)
+        if self._ema_pressure > 1.0:
+            self._budget *= self._multiplicative_decrease
+        else:
+            # Proportional increase: grow faster when far below target.
+            headroom = 1.0 / max(self._ema_pressure, self._MIN_PRESSURE_FLOOR)
+            self._budget += self._additive_increase * min(headroom, self._MAX_INCREASE_FACTOR)
+
+        self._budget = max(float(self._min_budget), min(float(self._max_budget), self._budget))
+        # Free units may go negative on a shrink; a larger budget may admit
+        # queued requests right away.
+        self._semaphore.add(int(self._budget) - old_budget)
+
+    def step_completed(self) -> dict[str, float]:
+        """Adjust the budget from the step's queue pressure and return a summary."""
+        summary: dict[str, float] = {
+            "window": float(self.window_size),
+            "budget": float(self.budget),
+            "requests": float(self._step_metrics_count),
+            "avg_request_cost": self._avg_cost,
+        }
+        if self._interval_pq.count:
+            summary["avg_pq"] = self._interval_pq.sum / self._interval_pq.count
+        if self._interval_gq.count:
+            summary["avg_gq"] = self._interval_gq.sum / self._interval_gq.count
+        summary.update(_quantile_summary("pq", self._step_pq))
+        summary.update(_quantile_summary("gq", self._step_gq))
+
+        pressure = self._interval_pressure()
+        if pressure is not None:
+            self._update_budget(pressure)
+            summary["budget_after"] = float(self.budget)
+
+        if self._step_cache_total > 0:
+            summary["cache_hit_rate"] = self._step_cache_hits / self._step_cache_total
+        if self._ema_pressure is not None:
+            summary["ema_pressure"] = self._ema_pressure
+        summary.update(self._semaphore.drain_wait_stats())
+
+        logger.info(
+            "TokenBudgetConcurrency step: budget=%d, window~%d, reqs=%d, pressure=%s",
+            self.budget,
+            self.window_size,
+            self._step_metrics_count,
+            f"{self._ema_pressure:.3f}" if self._ema_pressure is not None else "N/A",
+        )
+
+        self._interval_pq.clear()
+        self._interval_gq.clear()
+        self._step_pq.clear()
+        self._step_gq.clear()
+        self._interval_requests = 0
+        self._step_metrics_count = 0
+        self._step_cache_hits = 0
+        self._step_cache_total = 0
+
+        return summary
@@ -0,0 +1,576 @@
+"""Host-wide concurrency window shared by samplers over a Unix-socket broker.
+
+Every ``DeploymentSampler`` owns its controller, so N rollout processes
+against one deployment would run N independent control loops, each sized
+for the whole deployment.  :class:`SharedConcurrencyController` forwards
+``acquire`` / ``release`` (and server metrics) to a
+:class:`ConcurrencyBroker`.  The broker hosts a single controller per
+deployment ``model``, so all samplers on the host share one admission
+limit and one congestion estimate.
+
+The broker is started on demand as a detached process
+(``python -m fireworks.training.sdk.concurrency_broker``).  It listens on a
+per-user, per-model socket and exits after ``idle_timeout`` seconds
+without clients.  Slots held by a client whose connection drops (for
+example, a crashed worker) are returned automatically.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import getpass
+import hashlib
+import logging
+import argparse
+import tempfile
+import itertools
+import threading
+import subprocess
+from typing import Any, Callable
+from collections import Counter
+from dataclasses import fields
+
+from fireworks.training.sdk.sampling import ServerMetrics
+from fireworks.training.sdk.concurrency import (
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    GradientConcurrencyController,
+    SamplingConcurrencyController,
+    TokenAwareConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+
+logger = logging.getLogger(__name__)
+
+_CONTROLLERS: dict[str, Callable[..., SamplingConcurrencyController]] = {
+    "fixed": FixedConcurrencyController,
+    "adaptive": AdaptiveConcurrencyController,
+    "gradient": GradientConcurrencyController,
+    "token": TokenBudgetConcurrencyController,
+}
+
+
+def default_socket_path(model: str) -> str:
+    """Per-user broker socket path for deployment ``model``."""
+    digest = hashlib.sha256(model.encode()).hexdigest()[:16]
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(base, f"fireworks-concurrency-{user}-{digest}.sock")
+
+
+def _encode(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def _metrics_payload(metrics: ServerMetrics | None) -> dict[str, Any] | None:
+    if metrics is None:
+        return None
+    # ``client_timing`` describes this process's request, not the deployment.
+    values = ((f.name, getattr(metrics, f.name)) for f in fields(metrics) if f.name != "client_timing")
+    return {name: value for name, value in values if value is not None}
+
+
+# =============================================================================
+# ConcurrencyBroker — hosts the shared controller
+# =============================================================================
+
+
+class ConcurrencyBroker:
+    """Serves one concurrency controller to many samplers over a Unix socket.
+
+    The protocol is newline-delimited JSON.  ``acquire`` requests are
+    answered once the controller admits them.  ``release`` and ``cancel``
+    are one-way.  ``hello``, ``window`` and ``step`` are answered right
+    away.  Each connection's held slots are tracked so they can be returned
+    if it drops.
+
+    :meth:`serve` runs on the current event loop.  :meth:`start` runs the
+    broker on a background thread, e.g. to host it inside the trainer
+    process.
+    """
+
+    _DEFAULT_IDLE_TIMEOUT = 300.0
+
+    def __init__(
+        self,
+        socket_path: str,
+        controller: SamplingConcurrencyController,
+        idle_timeout: float | None = None,
+    ):
+        self._socket_path = socket_path
+        self._controller = controller
+        self._idle_timeout = idle_timeout
+        self._clients = 0
+        self._idle_since: float | None = time.monotonic()
+        self._server: asyncio.AbstractServer | None = None
+        self._stopped: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def controller(self) -> SamplingConcurrencyController:
+        return self._controller
+
+    @property
+    def clients(self) -> int:
+        return self._clients
+
+    async def serve(self) -> None:
+        """Listen until :meth:`close` or the idle timeout."""
+        if os.path.exists(self._socket_path):
+            if _socket_alive(self._socket_path):
+                raise RuntimeError(f"a concurrency broker is already listening on {self._socket_path}")
+            os.unlink(self._socket_path)
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_unix_server(self._handle, path=self._socket_path)
+        os.chmod(self._socket_path, 0o600)
+        logger.info("Concurrency broker listening on %s", self._socket_path)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                idle_since = self._idle_since
+                if (
+                    self._idle_timeout is not None
+                    and idle_since is not None
+                    and time.monotonic() - idle_since >= self._idle_timeout
+                ):
+                    logger.info("Concurrency broker idle for %.0fs, exiting", self._idle_timeout)
+                    break
+        finally:
+            self._server.close()
+            await self._server.wait_closed()
+            if os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+
+    def start(self) -> None:
+        """Run :meth:`serve` on a daemon thread and wait until it listens."""
+        listening = threading.Event()
+
+        def _run() -> None:
+            async def _main() -> None:
+                task = asyncio.ensure_future(self.serve())
+                while self._server is None and not task.done():
+                    await asyncio.sleep(0.01)
+                listening.set()
+                await task
+
+            asyncio.run(_main())
+
+        self._thread = threading.Thread(target=_run, name="fireworks-concurrency-broker", daemon=True)
+        self._thread.start()
+        listening.wait(timeout=10.0)
+
+    def close(self) -> None:
+        """Stop serving; safe to call from any thread."""
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+
+    # -- Connections -------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients += 1
+        self._idle_since = None
+        held: Counter[tuple[str | None, int | None]] = Counter()
+        pending: dict[int, asyncio.Task[None]] = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.warning("Concurrency broker: dropping malformed message %r", line[:200])
+                    continue
+                self._dispatch(message, writer, held, pending)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in pending.values():
+                task.cancel()
+            for (priority, cost), count in held.items():
+                for _ in range(count):
+                    self._release(priority, cost, None)
+            self._clients -= 1
+            if self._clients == 0:
+                self._idle_since = time.monotonic()
+            writer.close()
+
+    def _dispatch(
+        self,
+        message: dict[str, Any],
+        writer: asyncio.StreamWriter,
+        held: Counter[tuple[str | None, int | None]],
+        pending: dict[int, asyncio.Task[None]],
+    ) -> None:
+        op = message.get("op")
+        request_id = message.get("id")
+        priority = message.get("priority")
+        cost = message.get("cost")
+        if op == "acquire":
+            task = asyncio.ensure_future(self._grant(request_id, priority, cost, writer, held))
+            pending[request_id] = task
+            task.add_done_callback(lambda _t, rid=request_id: pending.pop(rid, None))
+        elif op == "release":
+            key = (priority, cost)
+            if held[key] <= 0:
+                # Slot was already returned when an earlier connection dropped.
+                return
+            held[key] -= 1
+            metrics = message.get("metrics")
+            self._release(priority, cost, ServerMetrics(**metrics) if metrics else None)
+        elif op == "cancel":
+            task = pending.pop(request_id, None)
+            if task is None or not task.cancel():
+                # Admitted before the cancel arrived: hand the slot back.
+                key = (priority, cost)
+                if held[key] > 0:
+                    held[key] -= 1
+                    self._release(priority, cost, None)
+        elif op == "step":
+            summary = self._controller.step_completed()
+            # Blocking steps arrive on a one-shot connection of their own.
+            others = 1 if message.get("oneshot") else 0
+            summary["shared_clients"] = float(max(0, self._clients - others))
+            writer.write(_encode({"id": request_id, "summary": summary}))
+        elif op in ("hello", "window"):
+            writer.write(_encode({"id": request_id, "window": self._controller.window_size}))
+        else:
+            logger.warning("Concurrency broker: unknown op %r", op)
+
+    async def _grant(
+        self,
+        request_id: int,
+        priority: str | None,
+        cost: int | None,
+        writer: asyncio.StreamWriter,
+        held: Counter[tuple[str | None, int | None]],
+    ) -> None:
+        controller = self._controller
+        if cost is not None and isinstance(controller, TokenAwareConcurrencyController):
+            await controller.acquire_tokens(cost, priority)
+        elif priority is None:
+            await controller.acquire()
+        else:
+            await controller.acquire(priority=priority)  # type: ignore[call-arg]
+        held[(priority, cost)] += 1
+        if not writer.is_closing():
+            writer.write(_encode({"id": request_id, "window": controller.window_size}))
+
+    def _release(self, priority: str | None, cost: int | None, metrics: ServerMetrics | None) -> None:
+        controller = self._controller
+        if cost is not None and isinstance(controller, TokenAwareConcurrencyController):
+            controller.release_tokens(cost, metrics, priority)
+        elif priority is None:
+            controller.release(metrics)
+        else:
+            controller.release(metrics, priority=priority)  # type: ignore[call-arg]
+
+
+def _controller_max_window(controller: str, options: dict[str, Any]) -> int | None:
+    try:
+        built = _CONTROLLERS[controller](**options)
+    except (TypeError, ValueError):
+        return None
+    return getattr(built, "max_window", None)
+
+
+def _socket_alive(path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+# =============================================================================
+# SharedConcurrencyController — client side, one per sampler
+# =============================================================================
+
+
+class SharedConcurrencyController(TokenAwareConcurrencyController):
+    """Concurrency controller backed by the host-wide broker for ``model``.
+
+    Pass it as ``concurrency_controller`` to every sampler that targets the
+    deployment (from any number of processes).  The first client starts
+    the broker with ``controller`` (``"fixed"``, ``"adaptive"``,
+    ``"gradient"`` or ``"token"``) built from ``controller_options``.  Later
+    clients join the running broker, and their own ``controller`` and
+    ``controller_options`` are ignored.  With ``spawn=False`` the broker
+    must already be running, e.g. one started by the trainer with
+    :meth:`ConcurrencyBroker.start`.
+
+    Token costs and ``priority`` are forwarded, so the shared controller
+    sees exactly what a local one would.  :meth:`step_completed` steps the
+    shared controller.  When several workers each finish a step, the
+    adjustment happens once and later callers see the remaining interval.
+    Called on a running event loop it does not wait for the broker: the
+    step is sent over the open connection and the summary of the previous
+    step is returned.
+    """
+
+    _DEFAULT_CONTROLLER = "adaptive"
+    _DEFAULT_IDLE_TIMEOUT = 300.0
+    _SPAWN_TIMEOUT_S = 30.0  # Covers importing the SDK in a fresh interpreter.
+
+    def __init__(
+        self,
+        model: str,
+        *,
+        socket_path: str | None = None,
+        controller: str = _DEFAULT_CONTROLLER,
+        controller_options: dict[str, Any] | None = None,
+        spawn: bool = True,
+        idle_timeout: float = _DEFAULT_IDLE_TIMEOUT,
+    ):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("SharedConcurrencyController requires Unix domain sockets")
+        if controller not in _CONTROLLERS:
+            raise ValueError(f"Unknown controller {controller!r}; expected one of {sorted(_CONTROLLERS)}")
+        self._model = model
+        self._socket_path = socket_path or default_socket_path(model)
+        self._controller = controller
+        self._controller_options = dict(controller_options or {})
+        self._spawn = spawn
+        self._idle_timeout = idle_timeout
+        self._max_window = _controller_max_window(controller, self._controller_options)
+
+        self._window = int(self._controller_options.get("initial_window", 1))
+        self._ids = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._connect_lock: asyncio.Lock | None = None
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._summary: dict[str, float] = {}
+        self._step_task: asyncio.Task[None] | None = None
+
+    @property
+    def socket_path(self) -> str:
+        return self._socket_path
+
+    @property
+    def window_size(self) -> int:
+        """Shared window as of the last broker reply."""
+        return self._window
+
+    @property
+    def max_window(self) -> int | None:
+        """Upper bound of the shared window under this client's ``controller`` / ``controller_options``.
+
+        Sizes the sampler's connection pool; ``None`` when the options do not
+        build a controller with a bound.
+        """
+        return self._max_window
+
+    # -- Admission ---------------------------------------------------------------
+
+    async def acquire(self, priority: str | None = None) -> None:
+        await self._request_slot(priority, None)
+
+    def release(self, metrics: ServerMetrics | None = None, priority: str | None = None) -> None:
+        self._send({"op": "release", "priority": priority, "cost": None, "metrics": _metrics_payload(metrics)})
+
+    async def acquire_tokens(self, cost: int, priority: str | None = None) -> None:
+        await self._request_slot(priority, max(1, int(cost)))
+
+    def release_tokens(self, cost: int, metrics: ServerMetrics | None = None, priority: str | None = None) -> None:
+        self._send(
+            {"op": "release", "priority": priority, "cost": max(1, int(cost)), "metrics": _metrics_payload(metrics)}
+        )
+
+    def step_completed(self) -> dict[str, float]:
+        """Step the shared controller and return its summary.
+
+        Outside an event loop this waits for the broker's reply.  On a
+        running loop it only schedules the step and returns the summary of
+        the previous one (with the current window), so in-flight streams
+        are never stalled.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._step_task = loop.create_task(self._step())
+            return {**self._summary, "window": float(self._window)}
+        try:
+            reply = self._request_sync({"op": "step", "oneshot": True})
+        except OSError as e:
+            logger.warning("Concurrency broker at %s unreachable for step_completed: %s", self._socket_path, e)
+            return {"window": float(self._window)}
+        self._summary = {k: float(v) for k, v in reply["summary"].items()}
+        return dict(self._summary)
+
+    async def _step(self) -> None:
+        try:
+            reply = await self._request({"op": "step"})
+        except OSError as e:
+            logger.warning("Concurrency broker at %s unreachable for step_completed: %s", self._socket_path, e)
+            return
+        self._summary = {k: float(v) for k, v in reply["summary"].items()}
+        self._window = int(self._summary.get("window", self._window))
+
+    async def _request_slot(self, priority: str | None, cost: int | None) -> None:
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._send({"op": "acquire", "id": request_id, "priority": priority, "cost": cost})
+        try:
+            self._window = int((await future)["window"])
+        except asyncio.CancelledError:
+            self._pending.pop(request_id, None)
+            self._send({"op": "cancel", "id": request_id, "priority": priority, "cost": cost})
+            raise
+
+    async def _request(self, message: dict[str, Any]) -> dict[str, Any]:
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._send({**message, "id": request_id})
+        return await future
+
+    # -- Connection --------------------------------------------------------------
+
+    def _send(self, message: dict[str, Any]) -> None:
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            # The broker returned this connection's slots when it dropped.
+            return
+        writer.write(_encode(message))
+
+    async def _ensure_connected(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._drop_connection()
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+        assert self._connect_lock is not None
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._socket_path)
+            except OSError:
+                if not self._spawn:
+                    raise
+                await loop.run_in_executor(None, self._spawn_broker)
+                reader, writer = await asyncio.open_unix_connection(self._socket_path)
+            self._reader, self._writer = reader, writer
+            self._reader_task = asyncio.ensure_future(self._read_replies(reader))
+            hello_id = next(self._ids)
+            hello: asyncio.Future[dict[str, Any]] = loop.create_future()
+            self._pending[hello_id] = hello
+            writer.write(_encode({"op": "hello", "id": hello_id}))
+            self._window = int((await hello)["window"])
+
+    async def _read_replies(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._pending.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Concurrency broker connection lost: %s", e)
+        finally:
+            error = ConnectionError(f"concurrency broker at {self._socket_path} closed the connection")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self._writer is not None:
+                self._writer.close()
+
+    def _drop_connection(self) -> None:
+        writer, self._writer, self._reader = self._writer, None, None
+        if writer is not None:
+            try:
+                writer.close()
+            except RuntimeError:
+                # The loop that owned the connection is gone.
+                pass
+        self._pending.clear()
+
+    def _request_sync(self, message: dict[str, Any]) -> dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(10.0)
+            sock.connect(self._socket_path)
+            sock.sendall(_encode({**message, "id": 0}))
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+        if not line:
+            raise ConnectionError(f"concurrency broker at {self._socket_path} closed the connection")
+        return json.loads(line)
+
+    def _spawn_broker(self) -> None:
+        """Start a detached broker unless another process just did."""
+        import fcntl  # Unix only, like the sockets this controller requires.
+
+        with open(self._socket_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if _socket_alive(self._socket_path):
+                return
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "fireworks.training.sdk.concurrency_broker",
+                    "--socket",
+                    self._socket_path,
+                    "--controller",
+                    self._controller,
+                    "--options",
+                    json.dumps(self._controller_options),
+                    "--idle-timeout",
+                    str(self._idle_timeout),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            deadline = time.monotonic() + self._SPAWN_TIMEOUT_S
+            while not _socket_alive(self._socket_path):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"concurrency broker did not start on {self._socket_path}")
+                time.sleep(0.05)
+            logger.info("Started concurrency broker for %s on %s", self._model, self._socket_path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a shared DeploymentSampler concurrency broker.")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--controller", choices=sorted(_CONTROLLERS), default="adaptive")
+    parser.add_argument("--options", default="{}", help="JSON keyword arguments for the controller")
+    parser.add_argument("--idle-timeout", type=float, default=ConcurrencyBroker._DEFAULT_IDLE_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    controller = _CONTROLLERS[args.controller](**json.loads(args.options))
+    broker = ConcurrencyBroker(args.socket, controller, idle_timeout=args.idle_timeout)
+    asyncio.run(broker.serve())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
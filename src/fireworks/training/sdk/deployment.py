@@ -1063,14 +1063,26 @@ from fireworks.training.sdk._sse import (  # noqa: F401,E402
     _SSETruncationError,
 )
 from fireworks.training.sdk.sampling import (  # noqa: F401,E402
+    RequestTiming,
     ServerMetrics,
     DeploymentSampler,
     SampledCompletion,
     SamplingRequestError,
     DeploymentSamplerTimeoutError,
 )
+from fireworks.training.sdk.resilience import HedgePolicy, RetryBudget, CircuitBreaker  # noqa: F401,E402
 from fireworks.training.sdk.concurrency import (  # noqa: F401,E402
+    AdmissionClass,
+    AdmissionQueue,
     FixedConcurrencyController,
     AdaptiveConcurrencyController,
+    GradientConcurrencyController,
     SamplingConcurrencyController,
+    TokenAwareConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+from fireworks.training.sdk.sampling_pool import DeploymentSamplerPool  # noqa: F401,E402
+from fireworks.training.sdk.concurrency_broker import (  # noqa: F401,E402
+    ConcurrencyBroker,
+    SharedConcurrencyController,
 )
@@ -0,0 +1,391 @@
+"""Record and replay ``DeploymentSampler`` HTTP traffic for offline benchmarks.
+
+:class:`RecordingTransport` wraps the sampler's real transport and captures
+every completions response (status, headers and the SSE body as timed byte
+chunks) to a JSON-lines file.  :class:`ReplayTransport` is an
+``httpx.MockTransport`` that serves those recordings locally with the
+recorded time-to-headers, TTFT and inter-chunk timing, and can inject
+429/503 responses and truncated streams.
+
+Recordings are payload-free on the request side: only ``n``, ``max_tokens``,
+``temperature``, ``logprobs`` and the prompt length are kept.  Response
+bodies are stored as received.
+
+Example::
+
+    recorder = record_sampler(sampler, "rollouts.jsonl")
+    await sampler.sample_with_tokens(messages, n=8)   # live deployment
+
+    replay = ReplayTransport(load_exchanges("rollouts.jsonl"), faults=ReplayFaults(rate_503=0.05))
+    attach_transport(sampler, replay)                  # no deployment needed
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Callable, Iterable, AsyncIterator
+from dataclasses import field, dataclass
+
+import httpx
+
+from fireworks.training.sdk._rest_client import _make_async_client, _make_async_transport
+
+if TYPE_CHECKING:
+    from fireworks.training.sdk.sampling import DeploymentSampler
+
+_REQUEST_META_KEYS = ("n", "max_tokens", "temperature", "logprobs")
+# First chunk that ends a choice; a truncated replay stops before it.
+_TERMINAL_CHUNK = re.compile(rb'"finish_reason":\s*"|"raw_output":\s*\{|\[DONE\]')
+
+
+def _request_meta(request: httpx.Request) -> dict[str, Any]:
+    try:
+        body = json.loads(request.content or b"{}")
+    except (httpx.RequestNotRead, ValueError):
+        return {}
+    if not isinstance(body, dict):
+        return {}
+    meta = {key: body[key] for key in _REQUEST_META_KEYS if key in body}
+    prompt = body.get("prompt")
+    if isinstance(prompt, list):
+        meta["prompt_len"] = len(prompt)
+    return meta
+
+
+@dataclass
+class RecordedExchange:
+    """One recorded completions response."""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    chunks: List[Tuple[float, bytes]] = field(default_factory=list)
+    """``(seconds since the request was sent, raw body bytes)`` pairs."""
+    headers_s: float = 0.0
+    """Seconds from sending the request to receiving the response headers."""
+    request: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ttft_s(self) -> float | None:
+        """Seconds from sending the request to the first body chunk."""
+        return self.chunks[0][0] if self.chunks else None
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "headers": [list(item) for item in self.headers],
+            "headers_s": self.headers_s,
+            "request": self.request,
+            # latin-1 round-trips arbitrary bytes through a JSON string.
+            "chunks": [[offset, chunk.decode("latin-1")] for offset, chunk in self.chunks],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "RecordedExchange":
+        return cls(
+            status=int(data["status"]),
+            headers=[(str(k), str(v)) for k, v in data.get("headers", [])],
+            chunks=[(float(offset), chunk.encode("latin-1")) for offset, chunk in data.get("chunks", [])],
+            headers_s=float(data.get("headers_s", 0.0)),
+            request=dict(data.get("request", {})),
+        )
+
+    @classmethod
+    def synthetic(
+        cls,
+        completion_tokens: int = 256,
+        *,
+        n: int = 1,
+        prompt_tokens: int = 512,
+        ttft_s: float = 0.2,
+        inter_token_s: float = 0.01,
+        logprobs: bool = True,
+        top_logprobs: int = 0,
+    ) -> "RecordedExchange":
+        """A generated stream with one event per token per choice.
+
+        Useful when no recording is at hand; the shape matches the
+        deployment's ``raw_output=True`` completions stream.
+        """
+        chunks: list[tuple[float, bytes]] = []
+        for step in range(completion_tokens):
+            offset = ttft_s + step * inter_token_s
+            for index in range(n):
+                token_id = 1000 + step
+                choice: dict[str, Any] = {"index": index, "text": f" t{step}", "token_ids": [token_id]}
+                if logprobs:
+                    entry: dict[str, Any] = {"token": f" t{step}", "logprob": -0.5, "sampling_logprob": -0.5}
+                    if top_logprobs:
+                        entry["top_logprobs"] = [{"token": f" a{k}", "logprob": -1.0 - k} for k in range(top_logprobs)]
+                    choice["logprobs"] = {"content": [entry]}
+                if step == completion_tokens - 1:
+                    choice["finish_reason"] = "length"
+                    choice["raw_output"] = {"completion_token_ids": list(range(1000, 1000 + completion_tokens))}
+                chunks.append((offset, f"data: {json.dumps({'choices': [choice]})}\n\n".encode()))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens * n}
+        end = ttft_s + completion_tokens * inter_token_s
+        chunks.append((end, f"data: {json.dumps({'choices': [], 'usage': usage})}\n\ndata: [DONE]\n\n".encode()))
+        return cls(
+            status=200,
+            headers=[("content-type", "text/event-stream"), ("prompt-tokens", str(prompt_tokens))],
+            chunks=chunks,
+            headers_s=min(ttft_s, 0.01),
+            request={"n": n, "max_tokens": completion_tokens, "prompt_len": prompt_tokens},
+        )
+
+
+def load_exchanges(path: str | os.PathLike[str]) -> list[RecordedExchange]:
+    """Read a JSON-lines recording written by :class:`RecordingTransport`."""
+    with open(path, encoding="utf-8") as f:
+        return [RecordedExchange.from_json(json.loads(line)) for line in f if line.strip()]
+
+
+def save_exchanges(path: str | os.PathLike[str], exchanges: Iterable[RecordedExchange]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for exchange in exchanges:
+            f.write(json.dumps(exchange.to_json()) + "\n")
+
+
+# =============================================================================
+# Recording
+# =============================================================================
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        stream: Any,
+        exchange: RecordedExchange,
+        t0: float,
+        on_close: Callable[[RecordedExchange], None],
+    ):
+        self._stream = stream
+        self._exchange = exchange
+        self._t0 = t0
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._exchange.chunks.append((time.perf_counter() - self._t0, bytes(chunk)))
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._exchange)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that records every response it passes through.
+
+    Exchanges are kept in :attr:`exchanges` and, when ``path`` is given,
+    appended to that JSON-lines file as each response is closed.  A stream
+    the client closes early (e.g. ``should_abort``) is recorded as received.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, path: str | os.PathLike[str] | None = None):
+        self._transport = transport
+        self._path = path
+        self.exchanges: list[RecordedExchange] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        t0 = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        exchange = RecordedExchange(
+            status=response.status_code,
+            headers=list(response.headers.multi_items()),
+            headers_s=time.perf_counter() - t0,
+            request=_request_meta(request),
+        )
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, exchange, t0, self._finish),
+            extensions=response.extensions,
+        )
+
+    def _finish(self, exchange: RecordedExchange) -> None:
+        self.exchanges.append(exchange)
+        if self._path is not None:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange.to_json()) + "\n")
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+
+@dataclass
+class ReplayFaults:
+    """Per-request fault probabilities for :class:`ReplayTransport`."""
+
+    rate_429: float = 0.0
+    rate_503: float = 0.0
+    rate_truncate: float = 0.0
+    """Serve the stream only up to (not including) the first chunk that ends a choice."""
+    retry_after_s: float | None = None
+    """``Retry-After`` sent with injected 429/503 responses."""
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        chunks: list[tuple[float, bytes]],
+        start: float,
+        time_scale: float,
+        on_close: Callable[[], None],
+    ):
+        self._chunks = chunks
+        self._start = start
+        self._time_scale = time_scale
+        self._on_close: Callable[[], None] | None = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        previous = self._start
+        for offset, chunk in self._chunks:
+            delay = (offset - previous) * self._time_scale
+            previous = offset
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    async def aclose(self) -> None:
+        if self._on_close is not None:
+            self._on_close, on_close = None, self._on_close
+            on_close()
+
+
+class ReplayTransport(httpx.MockTransport):
+    """Serve recorded exchanges with their original timing.
+
+    Exchanges are replayed round-robin among those recorded with the same
+    ``n`` as the request (falling back to all of them).  ``time_scale``
+    stretches or compresses every delay (``0`` replays instantly).
+
+    ``prefill_queue_fn`` maps the number of requests in flight on the
+    transport (from request to stream close) to a ``prefill-queue-duration``
+    header, so the adaptive
+    concurrency controllers see load-dependent feedback offline.
+
+    :attr:`stats` counts requests, injected faults and the peak number of
+    requests in flight.
+    """
+
+    def __init__(
+        self,
+        exchanges: Iterable[RecordedExchange],
+        *,
+        time_scale: float = 1.0,
+        faults: ReplayFaults | None = None,
+        prefill_queue_fn: Callable[[int], float] | None = None,
+        seed: int | None = None,
+    ):
+        self._exchanges = list(exchanges)
+        if not self._exchanges:
+            raise ValueError("ReplayTransport needs at least one recorded exchange")
+        if time_scale < 0:
+            raise ValueError("time_scale must be non-negative")
+        self._by_n: dict[int, list[RecordedExchange]] = {}
+        for exchange in self._exchanges:
+            self._by_n.setdefault(int(exchange.request.get("n", 1)), []).append(exchange)
+        self._cursor: dict[int | None, int] = {}
+        self._time_scale = time_scale
+        self._faults = faults or ReplayFaults()
+        self._prefill_queue_fn = prefill_queue_fn
+        self._rng = random.Random(seed)
+        self._in_flight = 0
+        self.stats: dict[str, int] = {
+            "requests": 0,
+            "faults_429": 0,
+            "faults_503": 0,
+            "truncations": 0,
+            "max_in_flight": 0,
+        }
+        super().__init__(self._handle)
+
+    def _next_exchange(self, n: int) -> RecordedExchange:
+        key: int | None = n if n in self._by_n else None
+        pool = self._by_n[n] if key is not None else self._exchanges
+        position = self._cursor.get(key, 0)
+        self._cursor[key] = position + 1
+        return pool[position % len(pool)]
+
+    def _draw_fault(self) -> str | None:
+        faults = self._faults
+        draw = self._rng.random()
+        for name, rate in (("429", faults.rate_429), ("503", faults.rate_503), ("truncate", faults.rate_truncate)):
+            if draw < rate:
+                return name
+            draw -= rate
+        return None
+
+    async def _sleep(self, seconds: float) -> None:
+        if seconds * self._time_scale > 0:
+            await asyncio.sleep(seconds * self._time_scale)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.stats["requests"] += 1
+        exchange = self._next_exchange(int(_request_meta(request).get("n", 1)))
+        fault = self._draw_fault()
+        self._in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+        try:
+            await self._sleep(exchange.headers_s)
+        except BaseException:
+            self._done()
+            raise
+        headers = httpx.Headers(exchange.headers)
+        if self._prefill_queue_fn is not None:
+            headers["prefill-queue-duration"] = str(self._prefill_queue_fn(self._in_flight))
+
+        if fault in ("429", "503"):
+            self._done()
+            self.stats[f"faults_{fault}"] += 1
+            fault_headers = {}
+            if self._faults.retry_after_s is not None:
+                fault_headers["retry-after"] = str(self._faults.retry_after_s)
+            return httpx.Response(int(fault), headers=fault_headers, json={"error": {"message": "injected fault"}})
+
+        chunks = exchange.chunks
+        if fault == "truncate":
+            self.stats["truncations"] += 1
+            terminal = next((i for i, (_, chunk) in enumerate(chunks) if _TERMINAL_CHUNK.search(chunk)), len(chunks))
+            chunks = chunks[: self._rng.randrange(terminal + 1)]
+            headers.pop("content-length", None)
+        return httpx.Response(
+            exchange.status,
+            headers=headers,
+            stream=_ReplayStream(chunks, exchange.headers_s, self._time_scale, self._done),
+        )
+
+    def _done(self) -> None:
+        self._in_flight -= 1
+
+
+def attach_transport(sampler: "DeploymentSampler", transport: httpx.AsyncBaseTransport) -> None:
+    """Route the sampler's async requests through ``transport``.
+
+    Call before the first request; a client the sampler already opened is
+    replaced without being closed.
+    """
+    sampler._async_client = _make_async_client(sampler._base_verify, transport=transport)
+
+
+def record_sampler(sampler: "DeploymentSampler", path: str | os.PathLike[str] | None = None) -> RecordingTransport:
+    """Record the sampler's live traffic (optionally to ``path``)."""
+    limits, http2 = sampler._async_client_options()
+    recorder = RecordingTransport(_make_async_transport(sampler._base_verify, limits, http2), path)
+    attach_transport(sampler, recorder)
+    return recorder
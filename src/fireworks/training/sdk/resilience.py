@@ -0,0 +1,299 @@
+"""Circuit breaker, request hedging and retry budget for DeploymentSampler.
+
+Pass a :class:`CircuitBreaker` as ``DeploymentSampler(circuit_breaker=...)``
+to stop admitting requests while the deployment fails.  Pass a
+:class:`HedgePolicy` as ``hedging=...`` to race a duplicate of slow
+requests.  Pass a :class:`RetryBudget` as ``retry_budget=...`` to cap
+retries and hedges to a share of successful traffic.
+"""
+
+from __future__ import annotations
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CircuitBreaker — sampler-wide pause on high transient error rates
+# =============================================================================
+
+
+class CircuitBreaker:
+    """Pauses request admission while the deployment's error rate is too high.
+
+    Outcomes of the last ``window_s`` seconds are counted.  Transient
+    failures (5xx, 429, timeouts, connection errors, truncated streams)
+    count as errors.  Other errors, such as a 400, say nothing about the
+    replica's health and are ignored.
+
+    States:
+
+    - ``closed``: requests pass.  Once at least ``min_requests`` outcomes
+      are counted and the error rate reaches ``failure_rate_threshold``,
+      the breaker opens.
+    - ``open``: :meth:`admit` waits, so retries stop hammering the
+      deployment and do not use up their own retry budgets.
+    - ``half_open``: after ``open_s`` seconds, up to ``probes`` requests are
+      let through.  If all of them succeed the breaker closes.  Any transient
+      failure opens it again for another ``open_s``.
+
+    One breaker may be shared by several samplers targeting the same
+    deployment.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _DEFAULT_FAILURE_RATE_THRESHOLD = 0.5
+    _DEFAULT_MIN_REQUESTS = 20
+    _DEFAULT_WINDOW_S = 10.0
+    _DEFAULT_OPEN_S = 5.0
+    _DEFAULT_PROBES = 4
+    _SLOTS = 10
+    _POLL_S = 0.05
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = _DEFAULT_FAILURE_RATE_THRESHOLD,
+        min_requests: int = _DEFAULT_MIN_REQUESTS,
+        window_s: float = _DEFAULT_WINDOW_S,
+        open_s: float = _DEFAULT_OPEN_S,
+        probes: int = _DEFAULT_PROBES,
+    ):
+        if not 0.0 < failure_rate_threshold <= 1.0:
+            raise ValueError("failure_rate_threshold must be in (0, 1]")
+        if min_requests < 1 or probes < 1:
+            raise ValueError("min_requests and probes must be at least 1")
+        if window_s <= 0 or open_s < 0:
+            raise ValueError("window_s must be positive and open_s non-negative")
+        self._threshold = failure_rate_threshold
+        self._min_requests = min_requests
+        self._slot_s = window_s / self._SLOTS
+        self._open_s = open_s
+        self._probes = probes
+
+        # Ring of [epoch, successes, failures] per time slot.
+        self._slots: list[list[int]] = [[-1, 0, 0] for _ in range(self._SLOTS)]
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_admitted = 0
+        self._probes_succeeded = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        self._maybe_half_open()
+        return self._state
+
+    @property
+    def trips(self) -> int:
+        """Number of times the breaker has opened."""
+        return self._trips
+
+    def error_rate(self) -> float | None:
+        """Transient error rate over the window, or ``None`` if empty."""
+        successes, failures = self._counts()
+        total = successes + failures
+        return failures / total if total else None
+
+    async def admit(self) -> bool:
+        """Wait until a request may be sent.
+
+        Returns True when it is a half-open probe.  Pass that value to
+        :meth:`record`.
+        """
+        while True:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return False
+            if self._state == self.HALF_OPEN and self._probes_admitted < self._probes:
+                self._probes_admitted += 1
+                return True
+            if self._state == self.OPEN:
+                await asyncio.sleep(max(self._POLL_S, self._opened_at + self._open_s - time.monotonic()))
+            else:
+                await asyncio.sleep(self._POLL_S)
+
+    def record(self, success: bool | None, probe: bool = False) -> None:
+        """Record a request outcome.
+
+        ``success=None`` means no verdict: the request was cancelled or
+        failed in a way unrelated to the deployment's health.
+        """
+        if probe and self._state == self.HALF_OPEN:
+            if success is None:
+                # Give the probe slot to another request.
+                self._probes_admitted -= 1
+            elif success:
+                self._probes_succeeded += 1
+                if self._probes_succeeded >= self._probes:
+                    self._close()
+            else:
+                self._open()
+            return
+        if success is None:
+            return
+        slot = self._slot()
+        slot[1 if success else 2] += 1
+        if not success and self._state == self.CLOSED:
+            successes, failures = self._counts()
+            total = successes + failures
+            if total >= self._min_requests and failures / total >= self._threshold:
+                self._open()
+
+    def _open(self) -> None:
+        if self._state != self.OPEN:
+            self._trips += 1
+            logger.warning(
+                "Circuit breaker open: transient error rate %.0f%%; pausing admission for %.1fs",
+                (self.error_rate() or 1.0) * 100,
+                self._open_s,
+            )
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+    def _close(self) -> None:
+        logger.info("Circuit breaker closed after %d successful probes", self._probes_succeeded)
+        self._state = self.CLOSED
+        for slot in self._slots:
+            slot[:] = [-1, 0, 0]
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_s:
+            self._state = self.HALF_OPEN
+            self._probes_admitted = 0
+            self._probes_succeeded = 0
+
+    def _slot(self) -> list[int]:
+        epoch = int(time.monotonic() / self._slot_s)
+        slot = self._slots[epoch % self._SLOTS]
+        if slot[0] != epoch:
+            slot[:] = [epoch, 0, 0]
+        return slot
+
+    def _counts(self) -> tuple[int, int]:
+        epoch = int(time.monotonic() / self._slot_s)
+        successes = failures = 0
+        for slot_epoch, ok, failed in self._slots:
+            if epoch - self._SLOTS < slot_epoch <= epoch:
+                successes += ok
+                failures += failed
+        return successes, failures
+
+
+# =============================================================================
+# HedgePolicy — duplicate slow requests
+# =============================================================================
+
+
+@dataclass
+class HedgePolicy:
+    """When ``DeploymentSampler`` issues a hedged duplicate of a request.
+
+    A duplicate is sent once an attempt has run longer than the ``quantile``
+    of recent successful attempt latencies, measured over ``window_s``
+    seconds.  The delay is never below ``min_delay_s``.  The first
+    successful response wins and the other request is cancelled, which
+    frees its concurrency slot and the deployment's KV cache.  Hedging
+    starts after ``min_samples`` latencies have been observed.  With
+    ``quantile=0.95``, roughly 5% of requests are duplicated.
+    """
+
+    quantile: float = 0.95
+    min_delay_s: float = 0.5
+    min_samples: int = 20
+    window_s: float = 120.0
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.quantile < 1.0:
+            raise ValueError("quantile must be in (0, 1)")
+
+
+# =============================================================================
+# RetryBudget — token bucket capping retries to a share of successful traffic
+# =============================================================================
+
+
+class RetryBudget:
+    """Token bucket that caps retries to a share of successful requests.
+
+    Each successful request deposits ``retry_ratio`` tokens, and each retry
+    (or hedged duplicate) withdraws one.  So in steady state at most
+    ``retry_ratio`` extra requests are sent per success, however many
+    logical requests are failing at once.  ``min_retries_per_s`` tokens
+    also trickle in over time, so a sampler that has not succeeded yet can
+    still retry a little.  The balance never exceeds ``max_tokens``.
+
+    Share one budget between samplers to cap their combined retry load.
+    """
+
+    _DEFAULT_RETRY_RATIO = 0.1
+    _DEFAULT_MIN_RETRIES_PER_S = 1.0
+    _DEFAULT_MAX_TOKENS = 100.0
+
+    def __init__(
+        self,
+        retry_ratio: float = _DEFAULT_RETRY_RATIO,
+        min_retries_per_s: float = _DEFAULT_MIN_RETRIES_PER_S,
+        max_tokens: float = _DEFAULT_MAX_TOKENS,
+    ):
+        if retry_ratio < 0 or min_retries_per_s < 0:
+            raise ValueError("retry_ratio and min_retries_per_s must be non-negative")
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self._retry_ratio = retry_ratio
+        self._min_retries_per_s = min_retries_per_s
+        self._max_tokens = max_tokens
+        self._balance = max_tokens
+        self._refilled_at = time.monotonic()
+        # Counters since the last drain_stats().
+        self._successes = 0
+        self._retries = 0
+        self._denied = 0
+
+    @property
+    def balance(self) -> float:
+        self._refill()
+        return self._balance
+
+    def deposit(self) -> None:
+        """Record a successful request."""
+        self._refill()
+        self._successes += 1
+        self._balance = min(self._max_tokens, self._balance + self._retry_ratio)
+
+    def try_withdraw(self) -> bool:
+        """Take one token for a retry; False (and nothing taken) if exhausted."""
+        self._refill()
+        if self._balance < 1.0:
+            self._denied += 1
+            return False
+        self._balance -= 1.0
+        self._retries += 1
+        return True
+
+    def drain_stats(self) -> dict[str, float]:
+        """Budget consumption since the last drain.
+
+        Returns ``retry_budget_balance``, ``retries``, ``retries_denied`` and
+        ``successes``.
+        """
+        stats = {
+            "retry_budget_balance": self.balance,
+            "retries": float(self._retries),
+            "retries_denied": float(self._denied),
+            "successes": float(self._successes),
+        }
+        self._successes = self._retries = self._denied = 0
+        return stats
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self._refilled_at = now - self._refilled_at, now
+        if elapsed > 0 and self._min_retries_per_s:
+            self._balance = min(self._max_tokens, self._balance + elapsed * self._min_retries_per_s)
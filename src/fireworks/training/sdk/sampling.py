@@ -2,15 +2,15 @@
 
 from __future__ import annotations
 
-import json
 import time
 import uuid
 import random
 import asyncio
 import logging
 import warnings
-from math import ceil
-from typing import TYPE_CHECKING, Any, List
+from array import array
+from typing import TYPE_CHECKING, Any, List, Callable, Sequence
+from collections import deque
 from dataclasses import dataclass
 
 import httpx
@@ -18,24 +18,31 @@ import httpx
 if TYPE_CHECKING:
     from transformers import PreTrainedTokenizerBase
 
-from fireworks.training.sdk._sse import _SSEDecoder, _SSETruncationError
+from fireworks.training.sdk._sse import _SSEDecoder, _SSETruncationError, _resolve_chunk_decoder
 from fireworks.training.sdk.errors import (
     DOCS_SDK,
     format_sdk_error,
     parse_retry_after,
     async_request_with_retries,
 )
+from fireworks.training.sdk.compact import CompactSequence
+from fireworks.training.sdk.resilience import HedgePolicy, RetryBudget, CircuitBreaker
 from fireworks.training.sdk.concurrency import (
     FixedConcurrencyController,
     AdaptiveConcurrencyController,
     SamplingConcurrencyController,
+    TokenAwareConcurrencyController,
 )
-from fireworks.training.sdk._rest_client import _RestClient
+from fireworks.training.sdk._rest_client import _RestClient, _async_limits_for_window
+from fireworks.training.sdk.tokenization import ChatTemplateCache, TokenizerWorkerPool
+from fireworks.training.sdk.sampling_batch import SampleBatch
+from fireworks.training.sdk.streaming_stats import SlidingQuantiles, ServerMetricsWindow
 from fireworks.training.sdk.sampling_observability import (
     REQUEST_ID_HEADER,
     ERROR_KIND_TIMEOUT,
     ERROR_KIND_CONNECTION,
     ERROR_KIND_HTTP_STATUS,
+    ERROR_KIND_RETRY_BUDGET,
     ERROR_KIND_SSE_TRUNCATION,
     SamplingRequestError,
     DeploymentSamplerTimeoutError,
@@ -45,11 +52,97 @@ from fireworks.training.sdk.sampling_observability import (
 
 logger = logging.getLogger(__name__)
 
+# ``finish_reason`` of a completion whose stream was closed early because the
+# caller's ``should_abort`` callback returned True.
+FINISH_REASON_ABORTED = "aborted"
+
 # =============================================================================
 # DeploymentSampler — completions API with client-side tokenization
 # =============================================================================
 
 
+@dataclass
+class RequestTiming:
+    """Client-side timeline of one sampling request, in seconds.
+
+    Phase durations: ``queue_wait`` (circuit breaker and concurrency slot),
+    ``connection_wait`` (a connection from the client's pool), ``connect``
+    and ``tls`` (only on a new connection), ``request_write`` (headers and
+    body) and ``parse`` (SSE/JSON decoding and building completions).
+
+    Milestones, measured from the moment the request is handed to the HTTP
+    client: ``first_byte`` (response headers received), ``first_token``,
+    ``last_token`` and ``total`` (stream fully consumed).
+
+    Large ``queue_wait`` or ``connection_wait`` means the time is spent in
+    this process; large ``connect``/``tls``/``request_write`` points at the
+    network; a large gap between ``request_write`` and ``first_byte`` is the
+    deployment.  Fields are ``None`` when the transport does not report the
+    event (e.g. test transports, or ``connect`` on a reused connection).
+    """
+
+    queue_wait: float | None = None
+    connection_wait: float | None = None
+    connect: float | None = None
+    tls: float | None = None
+    request_write: float | None = None
+    first_byte: float | None = None
+    first_token: float | None = None
+    last_token: float | None = None
+    total: float | None = None
+    parse: float | None = None
+
+
+class _RequestTimeline:
+    """Collects httpcore trace events and stream milestones for :class:`RequestTiming`."""
+
+    __slots__ = ("sent_at", "events", "first_token_at", "last_token_at", "parse_s")
+
+    def __init__(self) -> None:
+        self.sent_at = time.perf_counter()
+        # Event name without its ``connection.`` / ``http11.`` / ``http2.``
+        # prefix -> first time it was seen.
+        self.events: dict[str, float] = {}
+        self.first_token_at: float | None = None
+        self.last_token_at: float | None = None
+        self.parse_s = 0.0
+
+    async def trace(self, event: str, _info: dict[str, Any]) -> None:
+        self.events.setdefault(event.partition(".")[2], time.perf_counter())
+
+    def token(self) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+
+    def finish(self) -> RequestTiming:
+        events = self.events
+        sent_at = self.sent_at
+
+        def _span(start: str, end: str) -> float | None:
+            if start in events and end in events:
+                return events[end] - events[start]
+            return None
+
+        def _since_sent(at: float | None) -> float | None:
+            return None if at is None else at - sent_at
+
+        write_start = events.get("send_request_headers.started")
+        write_end = events.get("send_request_body.complete")
+        return RequestTiming(
+            connection_wait=min(events.values()) - sent_at if events else None,
+            connect=_span("connect_tcp.started", "connect_tcp.complete"),
+            tls=_span("start_tls.started", "start_tls.complete"),
+            request_write=write_end - write_start if write_start is not None and write_end is not None else None,
+            first_byte=_since_sent(events.get("receive_response_headers.complete")),
+            first_token=_since_sent(self.first_token_at),
+            last_token=_since_sent(self.last_token_at),
+            total=time.perf_counter() - sent_at,
+            parse=self.parse_s,
+        )
+
+
 @dataclass
 class ServerMetrics:
     """Server-side metrics extracted from response headers.
@@ -67,6 +160,14 @@ class ServerMetrics:
     server_processing_time: float | None = None
     client_ttft: float | None = None
     """Client-measured time-to-first-token (seconds).  Only set for streaming."""
+    client_pool_wait: float | None = None
+    """Seconds the request waited for a connection from the client's pool.
+
+    Client-side queuing, separate from the server's ``prefill_queue_duration``.
+    ``None`` when the transport does not report connection events.
+    """
+    client_timing: RequestTiming | None = None
+    """Full client-side timeline of the request (see :class:`RequestTiming`)."""
 
     @staticmethod
     def from_headers(headers: dict[str, str], client_ttft: float | None = None) -> "ServerMetrics":
@@ -109,6 +210,14 @@ class SampledCompletion:
     Contains the full token sequence (prompt + completion) needed for training,
     with prompt tokens from client-side tokenization and completion tokens from
     the deployment's ``raw_output`` response.
+
+    With ``DeploymentSampler(compact_completions=True)`` the token and logprob
+    fields are :class:`~fireworks.training.sdk.compact.CompactSequence` views
+    instead of lists: token ids are stored as int32 with the prompt buffer
+    shared by every completion of the same sample call, and logprobs as
+    float32 (about 7 significant digits; call ``tolist()`` or ``numpy()`` when
+    a copy is needed).  Indexing, slicing, ``len``, iteration and ``==``
+    behave as on the lists.
     """
 
     text: str
@@ -124,6 +233,46 @@ class SampledCompletion:
     """True when echo=True was used: logprob lists have P+C-1 entries
     (training-aligned).  False: completion-only."""
     routing_matrices: List[str] | None = None
+    timing: RequestTiming | None = None
+    """Client-side timeline of the request that produced this completion.
+
+    Shared by the completions of one server-side ``n`` request; ``None``
+    for choices salvaged from a truncated stream."""
+
+
+class _ChoiceAccumulator:
+    """Per-index state while demultiplexing a streamed completions response."""
+
+    __slots__ = ("text", "token_ids", "logprobs", "finish_reason", "raw_output", "aborted")
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.token_ids: list[int] = []
+        self.logprobs: list[dict] = []
+        self.finish_reason: str | None = None
+        self.raw_output: dict[str, Any] | None = None
+        self.aborted = False
+
+    @property
+    def is_complete(self) -> bool:
+        return self.aborted or self.finish_reason is not None or bool(self.raw_output)
+
+    def abort(self) -> None:
+        self.aborted = True
+        self.finish_reason = FINISH_REASON_ABORTED
+        self.raw_output = {"completion_token_ids": self.token_ids}
+
+    def assemble(self, index: int) -> dict[str, Any]:
+        choice: dict[str, Any] = {
+            "index": index,
+            "text": self.text,
+            "finish_reason": self.finish_reason or "stop",
+        }
+        if self.logprobs:
+            choice["logprobs"] = {"content": self.logprobs}
+        if self.raw_output:
+            choice["raw_output"] = self.raw_output
+        return choice
 
 
 class DeploymentSampler(_RestClient):
@@ -156,6 +305,9 @@ class DeploymentSampler(_RestClient):
             print(c.text, len(c.full_tokens), c.finish_reason)
     """
 
+    # drain_metrics() returns at most this many (the most recent) metrics.
+    _MAX_RECENT_METRICS = 16_384
+
     def __init__(
         self,
         inference_url: str,
@@ -167,11 +319,82 @@ class DeploymentSampler(_RestClient):
         additional_headers: dict[str, str] | None = None,
         *,
         request_context: dict[str, Any] | None = None,
+        incremental_stream: bool = True,
+        server_side_n: bool = False,
+        chat_template_cache_size: int | None = None,
+        tokenize_off_loop: bool = False,
+        tokenizer_pool: TokenizerWorkerPool | None = None,
+        compact_completions: bool = False,
+        chunk_decoder: str | Callable[[str], Any] = "json",
+        metrics_window_s: float = 60.0,
+        circuit_breaker: CircuitBreaker | None = None,
+        hedging: HedgePolicy | None = None,
+        retry_budget: RetryBudget | None = None,
+        http2: bool = False,
+        connection_pool_size: int | None = None,
     ):
         super().__init__(api_key=api_key, base_url=inference_url, additional_headers=additional_headers)
         self.model = model
         self.tokenizer = tokenizer
-        self._recent_metrics: list[ServerMetrics] = []
+        # Decode SSE events as bytes arrive (real client TTFT, bounded memory,
+        # early close). ``False`` restores the legacy path that buffers the
+        # whole response body before decoding.
+        self.incremental_stream = incremental_stream
+        # Default fan-out for ``n > 1`` sample calls: one server-side ``n=N``
+        # request instead of ``n`` independent ``n=1`` requests.
+        self.server_side_n = server_side_n
+        # ``sample_with_tokens`` memoizes ``apply_chat_template`` per distinct
+        # messages list (``0`` disables). ``tokenize_off_loop`` runs cache
+        # misses in a worker thread so slow tokenizers never block the loop.
+        self._chat_template_cache = (
+            ChatTemplateCache() if chat_template_cache_size is None else ChatTemplateCache(chat_template_cache_size)
+        )
+        self.tokenize_off_loop = tokenize_off_loop
+        # Optional batched executor for chat templates and integer-stop
+        # decoding; takes precedence over ``tokenize_off_loop``. Owned by the
+        # caller (not closed by ``close()``).
+        self.tokenizer_pool = tokenizer_pool
+        # Return array-backed ``CompactSequence`` token/logprob fields sharing
+        # one prompt buffer per sample call, instead of per-completion lists.
+        self.compact_completions = compact_completions
+        # Decoder for each SSE ``data`` payload: ``"json"`` (full chunks,
+        # orjson when installed), ``"lean"`` (parses the full chunk, then
+        # keeps only the fields the sampler reads, dropping ``top_logprobs``
+        # etc.; saves retained memory, not parse time) or a ``str -> dict``
+        # callable.
+        self._chunk_decoder = _resolve_chunk_decoder(chunk_decoder)
+        self._recent_metrics: deque[ServerMetrics] = deque(maxlen=self._MAX_RECENT_METRICS)
+        # Constant-memory p50/p95/p99 of queue/TTFT metrics over the last
+        # ``metrics_window_s`` seconds; see metrics_summary().
+        self._metrics_window = ServerMetricsWindow(metrics_window_s)
+        # Optional sampler-wide breaker: pauses admission while the
+        # deployment's transient error rate is above its threshold.
+        self._circuit_breaker = circuit_breaker
+        # Optional hedging: duplicate attempts slower than a latency quantile.
+        self._hedging = hedging
+        self._hedge_latency = SlidingQuantiles(hedging.window_s) if hedging is not None else None
+        self._hedge_delay_cache: tuple[float, float | None] = (0.0, None)
+        self._hedges_issued = 0
+        self._hedge_wins = 0
+        # Optional token bucket shared by every request's retries (and
+        # hedges); when empty, transient failures fail fast.
+        self._retry_budget = retry_budget
+        # Called with every ServerMetrics as its slot is released; used by
+        # DeploymentSamplerPool to track per-target queue EMAs.
+        self.on_server_metrics: Callable[[ServerMetrics], None] | None = None
+        # Async connection pool, sized when the client is first built:
+        # ``connection_pool_size`` connections, or by default one per stream
+        # the controller may ever admit (its ``max_window``). ``http2``
+        # multiplexes streams over fewer connections when the ``h2`` package
+        # is installed.
+        if connection_pool_size is not None and connection_pool_size < 1:
+            raise ValueError("connection_pool_size must be at least 1")
+        self.http2 = http2
+        self.connection_pool_size = connection_pool_size
+        # Cumulative prompt-cache counters (never drained), so callers can
+        # diff them across an RL step independently of drain_metrics().
+        self._cached_prompt_tokens_total: int = 0
+        self._prompt_tokens_total: int = 0
         self._warned_missing_sampling_logprob_fallback = False
         # Optional non-sensitive identity (session/run/checkpoint/step) attached
         # to the structured error so a failure is attributable. A plain dict;
@@ -207,6 +430,12 @@ class DeploymentSampler(_RestClient):
     ) -> None:
         self._concurrency_controller = controller
 
+    def _async_client_options(self) -> tuple[httpx.Limits, bool]:
+        max_window = self.connection_pool_size
+        if max_window is None:
+            max_window = getattr(self._concurrency_controller, "max_window", None)
+        return _async_limits_for_window(max_window), self.http2
+
     def _inference_headers(self) -> dict[str, str]:
         """Headers for inference completions requests."""
         return self._headers(Authorization=f"Bearer {self.api_key}")
@@ -222,12 +451,15 @@ class DeploymentSampler(_RestClient):
         hotload_retry_interval: float = _HOTLOAD_RETRY_INTERVAL_S,
         hotload_max_retries: int = _HOTLOAD_MAX_RETRIES,
         logical_request_id: str | None = None,
+        should_abort: Callable[[str, List[int]], bool] | None = None,
+        n: int = 1,
         **kwargs: Any,
     ) -> tuple[dict[str, Any], ServerMetrics]:
-        """Streaming n=1 async completions request.
+        """Streaming async completions request.
 
         Opens an SSE stream, accumulates chunks into the same response
-        format that ``async_completions`` returns, and extracts
+        format that ``async_completions`` returns (one assembled choice per
+        ``index``, sorted, when ``n > 1``), and extracts
         ``ServerMetrics`` from both:
 
         * **HTTP response headers** -- available immediately (partial:
@@ -238,14 +470,28 @@ class DeploymentSampler(_RestClient):
 
         The request automatically sets ``perf_metrics_in_response=True``
         so the server includes complete metrics in the last chunk.
+
+        With ``incremental_stream`` enabled (the default) the response body
+        is consumed as it arrives: ``client_ttft`` is the time to the first
+        generated text, and the connection is closed as soon as ``[DONE]``
+        is seen.  With it disabled, the whole body is buffered first and
+        ``client_ttft`` degrades to time-to-last-byte.
+
+        ``should_abort(text_so_far, tokens_so_far)`` is evaluated after every
+        chunk.  When it returns True the stream is closed immediately and the
+        partial choice comes back with ``finish_reason="aborted"`` and
+        ``raw_output.completion_token_ids`` built from the per-chunk
+        ``token_ids`` (``return_token_ids`` is enabled automatically).  With
+        ``n > 1`` an aborted choice stops accumulating and the stream is
+        closed once every choice has finished or been aborted.
         """
         http_timeout = kwargs.pop("http_timeout", 600)
-        if kwargs.get("images"):
+        if kwargs.get("images") or should_abort is not None:
             kwargs.setdefault("return_token_ids", True)
         payload: dict[str, Any] = {
             "model": self.model,
             "prompt": prompt,
-            "n": 1,
+            "n": n,
             "max_tokens": max_tokens,
             "temperature": temperature,
             "stream": True,
@@ -270,6 +516,12 @@ class DeploymentSampler(_RestClient):
 
         for hotload_attempt in range(hotload_max_retries + 1):
             t0 = time.time()
+            request = client.build_request("POST", url, headers=headers, json=payload, timeout=http_timeout)
+            # httpcore reports connect / TLS / write / response-header events
+            # through the trace extension; the first one marks the end of the
+            # wait for a pooled connection.
+            timeline = _RequestTimeline()
+            request.extensions["trace"] = timeline.trace
             # The sampling path owns its own retry budget in
             # ``_do_one_completion`` (attempts, jittered backoff, Retry-After,
             # structured events). Opt this transport-level helper out of BOTH
@@ -277,121 +529,167 @@ class DeploymentSampler(_RestClient):
             # request is not retried by two nested loops with multiplied budgets
             # (previously up to MAX_WAIT_TIME per attempt x _RETRY_MAX_ATTEMPTS).
             resp = await async_request_with_retries(
-                client.post,
-                url,
-                headers=headers,
-                json=payload,
-                timeout=http_timeout,
+                client.send,
+                request,
+                stream=self.incremental_stream,
                 retry_status_codes=(),
                 retry_exceptions=(),
             )
+            try:
+                if resp.status_code in (404, 425) and hotload_attempt < hotload_max_retries:
+                    logger.info(
+                        "Deployment not ready (HTTP %d), retry %d/%d in %ds...",
+                        resp.status_code,
+                        hotload_attempt + 1,
+                        hotload_max_retries,
+                        int(hotload_retry_interval),
+                    )
+                    await asyncio.sleep(hotload_retry_interval)
+                    continue
 
-            if resp.status_code in (404, 425) and hotload_attempt < hotload_max_retries:
-                logger.info(
-                    "Deployment not ready (HTTP %d), retry %d/%d in %ds...",
-                    resp.status_code,
-                    hotload_attempt + 1,
-                    hotload_max_retries,
-                    int(hotload_retry_interval),
+                if resp.is_error:
+                    # Error bodies are small; read them so the raised
+                    # HTTPStatusError carries a usable ``response.text``.
+                    await resp.aread()
+                resp.raise_for_status()
+
+                result, server_metrics = await self._consume_completions_stream(
+                    resp, t0, prompt_len, should_abort, n, timeline
                 )
-                await asyncio.sleep(hotload_retry_interval)
-                continue
+                timing = server_metrics.client_timing = timeline.finish()
+                server_metrics.client_pool_wait = timing.connection_wait
+                return result, server_metrics
+            finally:
+                await resp.aclose()
+
+        raise RuntimeError("Exhausted hotload retries in streaming mode")
 
-            resp.raise_for_status()
-
-            accumulated_text = ""
-            accumulated_logprobs: list[dict] = []
-            finish_reason = None
-            usage_info = None
-            raw_output = None
-            perf_metrics_dict: dict[str, str] | None = None
-            first_token_time: float | None = None
-
-            # Track whether the stream ended cleanly. A well-formed completion
-            # must close with [DONE] and/or set finish_reason. A clean TCP close
-            # without either signals server-side mid-stream truncation.
-            has_seen_done = False
-            has_seen_finish_reason = False
-
-            decoder = _SSEDecoder()
-            async for sse in decoder.aiter_events(resp):
-                if sse.data.startswith("[DONE]"):
-                    has_seen_done = True
-                    break
-
-                try:
-                    chunk = json.loads(sse.data)
-                except (ValueError, TypeError):
+    async def _consume_completions_stream(
+        self,
+        resp: httpx.Response,
+        t0: float,
+        prompt_len: int,
+        should_abort: Callable[[str, List[int]], bool] | None = None,
+        n: int = 1,
+        timeline: _RequestTimeline | None = None,
+    ) -> tuple[dict[str, Any], ServerMetrics]:
+        """Decode an SSE completions response, demultiplexing choices by index."""
+        choices: dict[int, _ChoiceAccumulator] = {}
+        usage_info = None
+        perf_metrics_dict: dict[str, str] | None = None
+        first_token_time: float | None = None
+
+        # Track whether the stream ended cleanly. A well-formed completion
+        # must close with [DONE] and/or set finish_reason. A clean TCP close
+        # without either signals server-side mid-stream truncation.
+        has_seen_done = False
+        any_aborted = False
+
+        decode_chunk = self._chunk_decoder
+        decoder = _SSEDecoder()
+        async for sse in decoder.aiter_events(resp):
+            if sse.data.startswith("[DONE]"):
+                has_seen_done = True
+                break
+
+            decode_started = time.perf_counter()
+            try:
+                chunk = decode_chunk(sse.data)
+            except (ValueError, TypeError):
+                continue
+            finally:
+                if timeline is not None:
+                    timeline.parse_s += time.perf_counter() - decode_started
+
+            for choice in chunk.get("choices", []):
+                index = choice.get("index", 0)
+                acc = choices.get(index)
+                if acc is None:
+                    acc = choices[index] = _ChoiceAccumulator()
+                if acc.aborted:
                     continue
 
-                for choice in chunk.get("choices", []):
-                    text_delta = choice.get("text", "")
-                    if text_delta:
-                        if first_token_time is None:
-                            first_token_time = time.time()
-                        accumulated_text += text_delta
-
-                    lp = choice.get("logprobs")
-                    if lp and isinstance(lp, dict):
-                        content = lp.get("content")
-                        if isinstance(content, list):
-                            accumulated_logprobs.extend(content)
-
-                    fr = choice.get("finish_reason")
-                    if fr:
-                        finish_reason = fr
-                        has_seen_finish_reason = True
-
-                    ro = choice.get("raw_output")
-                    if ro:
-                        raw_output = ro
-
-                if "usage" in chunk:
-                    usage_info = chunk["usage"]
-
-                # perf_metrics is patched into the final chunk by the server
-                # (with is_completed=True, so it has full timing data).
-                if "perf_metrics" in chunk:
-                    perf_metrics_dict = chunk["perf_metrics"]
-
-            if not raw_output and not has_seen_done and not has_seen_finish_reason:
+                text_delta = choice.get("text", "")
+                if text_delta:
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    if timeline is not None:
+                        timeline.token()
+                    acc.text += text_delta
+
+                token_ids = choice.get("token_ids")
+                if token_ids:
+                    acc.token_ids.extend(token_ids)
+
+                lp = choice.get("logprobs")
+                if lp and isinstance(lp, dict):
+                    content = lp.get("content")
+                    if isinstance(content, list):
+                        acc.logprobs.extend(content)
+
+                fr = choice.get("finish_reason")
+                if fr:
+                    acc.finish_reason = fr
+
+                ro = choice.get("raw_output")
+                if ro:
+                    acc.raw_output = ro
+
+                if (
+                    should_abort is not None
+                    and acc.finish_reason is None
+                    and should_abort(acc.text, acc.token_ids)
+                ):
+                    acc.abort()
+                    any_aborted = True
+
+            if "usage" in chunk:
+                usage_info = chunk["usage"]
+
+            # perf_metrics is patched into the final chunk by the server
+            # (with is_completed=True, so it has full timing data).
+            if "perf_metrics" in chunk:
+                perf_metrics_dict = chunk["perf_metrics"]
+
+            if any_aborted and len(choices) >= n and all(acc.is_complete for acc in choices.values()):
+                # Leaving the loop lets the caller close the response, which
+                # cancels generation server-side and frees the KV cache.
+                break
+
+        if not has_seen_done:
+            # Aborted choices were finished by the client; any other choice
+            # without finish_reason or raw_output was cut off.
+            complete = {i: acc for i, acc in choices.items() if acc.is_complete}
+            if len(complete) < n:
                 raise _SSETruncationError(
                     "Transient server-side error: the inference deployment "
                     "closed the SSE stream mid-generation without sending "
                     "[DONE], finish_reason, or raw_output. The SDK is "
                     "retrying. If this persists across all retry attempts, "
-                    "contact the Fireworks team."
+                    "contact the Fireworks team.",
+                    completed_choices=[complete[i].assemble(i) for i in sorted(complete)],
                 )
 
-            client_ttft = (first_token_time - t0) if first_token_time else None
-
-            # Build ServerMetrics: prefer perf_metrics from final chunk
-            # (has complete timing), fall back to HTTP headers (partial).
-            metrics_source = perf_metrics_dict or dict(resp.headers)
-            server_metrics = ServerMetrics.from_headers(metrics_source, client_ttft=client_ttft)
-
-            assembled_choice: dict[str, Any] = {
-                "text": accumulated_text,
-                "finish_reason": finish_reason or "stop",
-            }
-            if accumulated_logprobs:
-                assembled_choice["logprobs"] = {"content": accumulated_logprobs}
-            if raw_output:
-                assembled_choice["raw_output"] = raw_output
-            result: dict[str, Any] = {"choices": [assembled_choice]}
-            if usage_info:
-                result["usage"] = usage_info
-
-            elapsed = time.time() - t0
-            logger.debug(
-                "Stream completions: prompt=%d, text_len=%d, %.1fs",
-                prompt_len,
-                len(accumulated_text),
-                elapsed,
-            )
-            return result, server_metrics
+        client_ttft = (first_token_time - t0) if first_token_time else None
 
-        raise RuntimeError("Exhausted hotload retries in streaming mode")
+        # Build ServerMetrics: prefer perf_metrics from final chunk
+        # (has complete timing), fall back to HTTP headers (partial).
+        metrics_source = perf_metrics_dict or dict(resp.headers)
+        server_metrics = ServerMetrics.from_headers(metrics_source, client_ttft=client_ttft)
+
+        result: dict[str, Any] = {"choices": [choices[i].assemble(i) for i in sorted(choices)]}
+        if usage_info:
+            result["usage"] = usage_info
+
+        elapsed = time.time() - t0
+        logger.debug(
+            "Stream completions: prompt=%d, n=%d, text_len=%d, %.1fs",
+            prompt_len,
+            n,
+            sum(len(acc.text) for acc in choices.values()),
+            elapsed,
+        )
+        return result, server_metrics
 
     @staticmethod
     def _extract_logprobs(
@@ -454,6 +752,8 @@ class DeploymentSampler(_RestClient):
         max_tokens: int = 1024,
         temperature: float = 1.0,
         max_seq_len: int | None = None,
+        should_abort: Callable[[str, List[int]], bool] | None = None,
+        server_side_n: bool | None = None,
         **kwargs: Any,
     ) -> List[SampledCompletion]:
         """Sample n completions via streaming, firing n individual requests concurrently.
@@ -461,37 +761,36 @@ class DeploymentSampler(_RestClient):
         Each completion is an independent async streaming request.
         Server metrics from response headers are fed into the
         ``AdaptiveConcurrencyController`` (if one was provided).
+        With ``server_side_n`` the n completions share a single request
+        instead; see :meth:`sample_with_prompt_tokens`.
+
+        ``should_abort(text_so_far, tokens_so_far)`` is checked after every
+        streamed chunk of each completion; see :meth:`sample_with_prompt_tokens`.
         """
         if self.tokenizer is None:
             raise ValueError("Tokenizer is required for sample_with_tokens")
+        self._check_should_abort(should_abort, kwargs)
         user_requested_logprobs = kwargs.get("logprobs", False)
         routing_requested = kwargs.get("include_routing_matrix", False)
         echo_mode = kwargs.get("echo", False)
 
-        prompt_ids: list[int] = self.tokenizer.apply_chat_template(
-            messages,
-            tokenize=True,
-            add_generation_prompt=True,
-            return_dict=False,
-        )
+        prompt_ids = await self._apply_chat_template(messages)
 
         if max_seq_len is not None and len(prompt_ids) >= max_seq_len:
             return []
 
-        async def _one(idx: int) -> List[SampledCompletion]:
-            return await self._do_one_completion(
-                prompt_ids,
-                max_tokens,
-                temperature,
-                max_seq_len,
-                user_requested_logprobs,
-                routing_requested,
-                echo_mode,
-                **kwargs,
-            )
-
-        results = await asyncio.gather(*[_one(i) for i in range(n)])
-        return [c for batch in results for c in batch]
+        return await self._fan_out(
+            prompt_ids,
+            n,
+            max_tokens,
+            temperature,
+            max_seq_len,
+            user_requested_logprobs,
+            routing_requested,
+            echo_mode,
+            server_side_n,
+            **kwargs,
+        )
 
     async def sample_with_prompt_tokens(
         self,
@@ -501,6 +800,8 @@ class DeploymentSampler(_RestClient):
         temperature: float = 1.0,
         max_seq_len: int | None = None,
         stop: list[str] | list[int] | None = None,
+        should_abort: Callable[[str, List[int]], bool] | None = None,
+        server_side_n: bool | None = None,
         **kwargs: Any,
     ) -> List[SampledCompletion]:
         """Sample n completions from a pre-tokenized prompt.
@@ -522,9 +823,29 @@ class DeploymentSampler(_RestClient):
         ``list[str]`` stops are forwarded as string stop sequences. ``list[int]``
         stops are decoded with the sampler tokenizer before forwarding because
         the completions API only accepts string stop sequences.
+
+        ``should_abort(text_so_far, tokens_so_far)`` is checked after every
+        streamed chunk of each completion. Returning True closes that stream
+        right away -- releasing the concurrency slot and the deployment's KV
+        cache -- and yields a partial :class:`SampledCompletion` with
+        ``finish_reason="aborted"``. ``tokens_so_far`` is the list of
+        completion token ids received so far.
+
+        By default the n completions are n independent ``n=1`` requests, each
+        holding its own concurrency slot. ``server_side_n=True`` (or the
+        sampler-wide ``server_side_n`` setting) sends one ``n=N`` request
+        instead: the prompt is sent and prefilled once, a single slot is
+        used, and choices are demultiplexed by index. If the stream is cut
+        after some choices finished, only the missing ones are re-requested.
+
+        ``priority="<class>"`` queues the requests in that admission class of
+        the concurrency controller (see
+        :class:`~fireworks.training.sdk.concurrency.AdmissionQueue`), e.g. to
+        let evaluation rollouts overtake a backlog of training rollouts.
         """
         if max_seq_len is not None and len(prompt_token_ids) >= max_seq_len:
             return []
+        self._check_should_abort(should_abort, kwargs)
 
         user_requested_logprobs = kwargs.get("logprobs", False)
         routing_requested = kwargs.get("include_routing_matrix", False)
@@ -533,48 +854,269 @@ class DeploymentSampler(_RestClient):
             if all(type(s) is str for s in stop):
                 kwargs["stop"] = stop
             elif all(type(s) is int for s in stop):
-                if self.tokenizer is None:
+                if self.tokenizer_pool is not None:
+                    kwargs["stop"] = await self.tokenizer_pool.decode_each(stop)
+                elif self.tokenizer is None:
                     raise ValueError(
                         "Tokenizer is required to convert integer stop token IDs "
                         "to string stop sequences for the completions API"
                     )
-                kwargs["stop"] = [self.tokenizer.decode([token_id], skip_special_tokens=False) for token_id in stop]
+                else:
+                    kwargs["stop"] = [
+                        self.tokenizer.decode([token_id], skip_special_tokens=False) for token_id in stop
+                    ]
             else:
                 raise ValueError("stop must be list[str] or list[int]")
 
+        return await self._fan_out(
+            prompt_token_ids,
+            n,
+            max_tokens,
+            temperature,
+            max_seq_len,
+            user_requested_logprobs,
+            routing_requested,
+            echo_mode,
+            server_side_n,
+            **kwargs,
+        )
+
+    def sample_batch(
+        self,
+        prompts: Sequence[list[int]],
+        n: int = 1,
+        *,
+        max_in_flight: int | None = None,
+        return_exceptions: bool = False,
+        prefix_aware: bool = False,
+        min_shared_prefix: int = 32,
+        attach_prompt_cache_key: bool = False,
+        **kwargs: Any,
+    ) -> SampleBatch:
+        """Sample ``n`` completions for every prompt of an RL step.
+
+        Returns a :class:`~fireworks.training.sdk.sampling_batch.SampleBatch`
+        to ``async for`` over: it yields one ``PromptResult`` per prompt in
+        completion order while keeping the concurrency window saturated and
+        at most ``max_in_flight`` requests outstanding.  Once exhausted it
+        exposes ``groups`` (completions per prompt index) and
+        ``concurrency_summary`` (the controller's ``step_completed()``
+        result, called automatically).
+
+        Remaining ``kwargs`` are forwarded to :meth:`sample_with_prompt_tokens`.
+        With ``return_exceptions=True`` a failed prompt yields a result with
+        ``error`` set instead of aborting the batch.
+
+        ``prefix_aware=True`` dispatches prompts sharing at least
+        ``min_shared_prefix`` leading token ids back-to-back to maximize
+        deployment prompt-cache hits; ``attach_prompt_cache_key=True`` also
+        sends a ``prompt_cache_key`` derived from each group's shared prefix.
+        The batch's ``cache_stats`` reports the achieved cache-hit rate.
+        """
+        return SampleBatch(
+            self,
+            prompts,
+            n,
+            max_in_flight,
+            return_exceptions,
+            kwargs,
+            prefix_aware=prefix_aware,
+            min_shared_prefix=min_shared_prefix,
+            attach_prompt_cache_key=attach_prompt_cache_key,
+        )
+
+    async def _fan_out(
+        self,
+        prompt_ids: list[int],
+        n: int,
+        max_tokens: int,
+        temperature: float,
+        max_seq_len: int | None,
+        user_requested_logprobs: bool,
+        routing_requested: bool,
+        echo_mode: bool,
+        server_side_n: bool | None,
+        **kwargs: Any,
+    ) -> List[SampledCompletion]:
+        """Issue ``n`` completions as one ``n=N`` request or ``n`` ``n=1`` requests."""
+        if server_side_n is None:
+            server_side_n = self.server_side_n
+        prompt_buffer = array("i", prompt_ids) if self.compact_completions else None
+        if server_side_n and n > 1:
+            return await self._do_one_completion(
+                prompt_ids,
+                max_tokens,
+                temperature,
+                max_seq_len,
+                user_requested_logprobs,
+                routing_requested,
+                echo_mode,
+                n=n,
+                prompt_buffer=prompt_buffer,
+                **kwargs,
+            )
+
         async def _one(_idx: int) -> List[SampledCompletion]:
             return await self._do_one_completion(
-                prompt_token_ids,
+                prompt_ids,
                 max_tokens,
                 temperature,
                 max_seq_len,
                 user_requested_logprobs,
                 routing_requested,
                 echo_mode,
+                prompt_buffer=prompt_buffer,
                 **kwargs,
             )
 
         results = await asyncio.gather(*[_one(i) for i in range(n)])
         return [c for batch in results for c in batch]
 
-    async def _acquire_concurrency(self) -> None:
-        """Acquire a concurrency slot from the controller."""
-        if self._concurrency_controller is not None:
-            await self._concurrency_controller.acquire()
+    @staticmethod
+    def _check_should_abort(
+        should_abort: Callable[[str, List[int]], bool] | None,
+        kwargs: dict[str, Any],
+    ) -> None:
+        """Validate ``should_abort`` and thread it through ``kwargs``."""
+        if should_abort is None:
+            return
+        if kwargs.get("echo", False):
+            # Partial streams carry completion token ids only, so the echoed
+            # prompt prefix cannot be verified or stripped.
+            raise ValueError("should_abort cannot be combined with echo=True")
+        kwargs["should_abort"] = should_abort
+
+    async def _acquire_concurrency(self, cost: int | None = None, priority: str | None = None) -> None:
+        """Acquire a concurrency slot from the controller.
+
+        ``cost`` is the request's estimated token cost; token-aware
+        controllers admit against it instead of counting requests.
+        ``priority`` names the controller's admission class to queue in;
+        it is only forwarded when set, so custom controllers without
+        admission classes keep working.
+        """
+        controller = self._concurrency_controller
+        if controller is None:
+            return
+        if cost is not None and isinstance(controller, TokenAwareConcurrencyController):
+            if priority is None:
+                await controller.acquire_tokens(cost)
+            else:
+                await controller.acquire_tokens(cost, priority=priority)
+        elif priority is None:
+            await controller.acquire()
+        else:
+            await controller.acquire(priority=priority)  # type: ignore[call-arg]
 
-    def _release_concurrency(self, server_metrics: ServerMetrics | None = None) -> None:
+    def _release_concurrency(
+        self,
+        server_metrics: ServerMetrics | None = None,
+        cost: int | None = None,
+        priority: str | None = None,
+    ) -> None:
         """Release a concurrency slot, feeding metrics to the controller."""
         if server_metrics is not None:
             self._recent_metrics.append(server_metrics)
-        if self._concurrency_controller is not None:
-            self._concurrency_controller.release(server_metrics)
+            self._metrics_window.add(server_metrics)
+            if server_metrics.prompt_tokens is not None:
+                self._prompt_tokens_total += server_metrics.prompt_tokens
+                self._cached_prompt_tokens_total += server_metrics.cached_prompt_tokens or 0
+            if self.on_server_metrics is not None:
+                self.on_server_metrics(server_metrics)
+        controller = self._concurrency_controller
+        if controller is None:
+            return
+        if cost is not None and isinstance(controller, TokenAwareConcurrencyController):
+            if priority is None:
+                controller.release_tokens(cost, server_metrics)
+            else:
+                controller.release_tokens(cost, server_metrics, priority=priority)
+        elif priority is None:
+            controller.release(server_metrics)
+        else:
+            controller.release(server_metrics, priority=priority)  # type: ignore[call-arg]
 
     def drain_metrics(self) -> list[ServerMetrics]:
-        """Return and clear all collected ServerMetrics since last drain."""
+        """Return and clear all collected ServerMetrics since last drain.
+
+        At most the last ``_MAX_RECENT_METRICS`` are kept between drains.
+        Each carries the request's client-side ``client_timing``.
+        Retry-budget consumption is drained separately by
+        :meth:`drain_retry_metrics`.
+        """
         out = list(self._recent_metrics)
         self._recent_metrics.clear()
         return out
 
+    def drain_retry_metrics(self) -> dict[str, float]:
+        """Return and reset retry-budget consumption since the last drain.
+
+        Keys are ``retry_budget_balance``, ``retries``, ``retries_denied`` and
+        ``successes``.  The dict is empty without a ``retry_budget``.
+        """
+        if self._retry_budget is None:
+            return {}
+        return self._retry_budget.drain_stats()
+
+    def metrics_summary(self) -> dict[str, float]:
+        """Sliding-window ServerMetrics statistics.
+
+        Covers the last ``metrics_window_s`` seconds and is independent of
+        :meth:`drain_metrics`.  Keys look like ``server_ttft_p95``,
+        ``prefill_queue_duration_p99`` and ``client_ttft_max``, plus
+        ``cache_hit_rate``.  ``client_pool_wait_*`` is the time spent
+        waiting for a pooled connection (client-side queuing), and
+        ``timing_<phase>_*`` covers each :class:`RequestTiming` phase.
+        Quantiles come from a DDSketch with 1% relative error.
+
+        With hedging enabled, also reports ``hedges_issued`` and
+        ``hedge_wins``; with a circuit breaker, ``circuit_breaker_trips`` and
+        ``circuit_breaker_open`` (1.0 while admission is paused); with a
+        retry budget, ``retry_budget_balance``.
+        """
+        summary = self._metrics_window.summary()
+        if self._hedging is not None:
+            summary["hedges_issued"] = float(self._hedges_issued)
+            summary["hedge_wins"] = float(self._hedge_wins)
+        if self._circuit_breaker is not None:
+            summary["circuit_breaker_trips"] = float(self._circuit_breaker.trips)
+            summary["circuit_breaker_open"] = float(self._circuit_breaker.state != CircuitBreaker.CLOSED)
+        if self._retry_budget is not None:
+            summary["retry_budget_balance"] = self._retry_budget.balance
+        return summary
+
+    def prompt_cache_counters(self) -> tuple[int, int]:
+        """Cumulative ``(cached_prompt_tokens, prompt_tokens)`` from server metrics."""
+        return self._cached_prompt_tokens_total, self._prompt_tokens_total
+
+    def chat_template_cache_stats(self) -> dict[str, int]:
+        """Cumulative hit/miss/eviction counters of the chat-template cache."""
+        return self._chat_template_cache.stats()
+
+    _CHAT_TEMPLATE_KWARGS: dict[str, Any] = {"add_generation_prompt": True}
+
+    async def _apply_chat_template(self, messages: list[dict[str, str]]) -> list[int]:
+        """Tokenize ``messages`` through the chat-template cache."""
+        tokenizer = self.tokenizer
+        assert tokenizer is not None
+
+        def _apply() -> list[int]:
+            return tokenizer.apply_chat_template(
+                messages, tokenize=True, return_dict=False, **self._CHAT_TEMPLATE_KWARGS
+            )
+
+        async def _compute() -> list[int]:
+            if self.tokenizer_pool is not None:
+                return await self.tokenizer_pool.apply_chat_template(messages, **self._CHAT_TEMPLATE_KWARGS)
+            if self.tokenize_off_loop:
+                return await asyncio.to_thread(_apply)
+            return _apply()
+
+        if self._chat_template_cache.max_size == 0:
+            return list(await _compute())
+        key = ChatTemplateCache.make_key(messages, self._CHAT_TEMPLATE_KWARGS, tokenizer)
+        return await self._chat_template_cache.get_or_compute(key, _compute)
+
     # Per-completion retry covers two transient server-side classes:
     # 1. SSE truncation: the deployment closes the stream mid-generation
     #    without [DONE]/finish_reason/raw_output. Surfaces as a RuntimeError
@@ -644,14 +1186,6 @@ class DeploymentSampler(_RestClient):
             return transient.response.status_code in self._RETRY_TIMEOUT_STATUS_CODES
         return False
 
-    @staticmethod
-    def _p95(values: list[float]) -> float | None:
-        if not values:
-            return None
-        ordered = sorted(values)
-        index = min(len(ordered) - 1, ceil(0.95 * len(ordered)) - 1)
-        return ordered[index]
-
     @staticmethod
     def _format_seconds(value: float | None) -> str | None:
         if value is None:
@@ -659,28 +1193,19 @@ class DeploymentSampler(_RestClient):
         return f"{value:.1f}s"
 
     def _recent_metrics_diagnostic(self) -> list[str]:
-        recent = self._recent_metrics[-32:]
-        if not recent:
-            return []
-
+        window = self._metrics_window
         fields: list[str] = []
-        prefill_p95 = self._p95([m.prefill_queue_duration for m in recent if m.prefill_queue_duration is not None])
-        generation_p95 = self._p95(
-            [m.generation_queue_duration for m in recent if m.generation_queue_duration is not None]
-        )
-        ttft_p95 = self._p95([m.client_ttft for m in recent if m.client_ttft is not None])
-        concurrent = [m.num_concurrent_requests for m in recent if m.num_concurrent_requests is not None]
-
-        for name, value in (
-            ("recent_prefill_queue_p95", prefill_p95),
-            ("recent_generation_queue_p95", generation_p95),
-            ("recent_client_ttft_p95", ttft_p95),
+        for name, metric in (
+            ("recent_prefill_queue_p95", "prefill_queue_duration"),
+            ("recent_generation_queue_p95", "generation_queue_duration"),
+            ("recent_client_ttft_p95", "client_ttft"),
         ):
-            formatted = self._format_seconds(value)
+            formatted = self._format_seconds(window.quantile(metric, 0.95))
             if formatted:
                 fields.append(f"{name}={formatted}")
-        if concurrent:
-            fields.append(f"recent_concurrent_requests_max={max(concurrent)}")
+        concurrent = window.sketch("num_concurrent_requests").max
+        if concurrent is not None:
+            fields.append(f"recent_concurrent_requests_max={int(concurrent)}")
         return fields
 
     @staticmethod
@@ -823,33 +1348,60 @@ class DeploymentSampler(_RestClient):
         user_requested_logprobs: bool,
         routing_requested: bool,
         echo_mode: bool,
+        n: int = 1,
+        prompt_buffer: array | None = None,
         **kwargs: Any,
     ) -> List[SampledCompletion]:
         backoff = self._RETRY_BASE_BACKOFF_S
         diagnostic_context = kwargs.pop("timeout_diagnostic_context", None)
         sampling_context = kwargs.pop("sampling_context", None)
+        priority = kwargs.pop("priority", None)
         raw_logprobs_match_sampling = self._raw_logprobs_match_sampling_params(temperature, kwargs)
         # One stable id for this logical request, constant across every retry and
         # sent as X-Request-Id so a failure is searchable in server logs.
         logical_request_id = uuid.uuid4().hex
         context = self._build_context(sampling_context)
+        # Server-side fan-out (n > 1): choices that finished before a
+        # truncated stream are kept; retries only request the remainder.
+        collected: List[SampledCompletion] = []
+        remaining = n
+
+        def _parse(result: dict[str, Any]) -> List[SampledCompletion]:
+            return self._parse_completions_result(
+                result,
+                prompt_ids,
+                max_seq_len,
+                user_requested_logprobs,
+                routing_requested,
+                echo_mode,
+                raw_logprobs_match_sampling,
+                prompt_buffer,
+            )
 
         for attempt in range(1, self._RETRY_MAX_ATTEMPTS + 1):
-            await self._acquire_concurrency()
-            server_metrics: ServerMetrics | None = None
+            # Estimated token footprint of this attempt (prompt + generation).
+            cost = (len(prompt_ids) + max_tokens) * remaining
             transient: BaseException | None = None
             label = ""
+            stream_kwargs = dict(
+                prompt=prompt_ids,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                raw_output=True,
+                logical_request_id=logical_request_id,
+                n=remaining,
+                **kwargs,
+            )
             try:
-                result, server_metrics = await self.async_completions_stream(
-                    prompt=prompt_ids,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    raw_output=True,
-                    logical_request_id=logical_request_id,
-                    **kwargs,
-                )
+                if self._hedging is not None:
+                    result, server_metrics = await self._hedged_attempt(cost, priority, stream_kwargs)
+                else:
+                    result, server_metrics = await self._single_attempt(cost, priority, stream_kwargs)
             except _SSETruncationError as e:
                 transient, label = e, "SSE truncation"
+                if e.completed_choices:
+                    collected.extend(_parse({"choices": e.completed_choices}))
+                    remaining -= len(e.completed_choices)
             except httpx.HTTPStatusError as e:
                 if e.response.status_code not in self._RETRY_HTTP_TRANSIENT_CODES:
                     # Non-retryable (e.g. 400/401/403/404/409/422): fail fast
@@ -858,23 +1410,19 @@ class DeploymentSampler(_RestClient):
                 transient, label = e, f"HTTP {e.response.status_code}"
             except self._RETRY_HTTPX_CONNECTION_EXC as e:
                 transient, label = e, type(e).__name__
-            finally:
-                # A caller may cancel a live stream (for example, a bounded
-                # rollout timeout or scheduler shutdown), and contract/parser
-                # failures may bypass the retryable exception branches above.
-                # Every successful acquire must release exactly once.
-                self._release_concurrency(server_metrics)
 
             if transient is None:
-                return self._parse_completions_result(
-                    result,
-                    prompt_ids,
-                    max_seq_len,
-                    user_requested_logprobs,
-                    routing_requested,
-                    echo_mode,
-                    raw_logprobs_match_sampling,
-                )
+                if self._retry_budget is not None:
+                    self._retry_budget.deposit()
+                timing = server_metrics.client_timing
+                parse_started = time.perf_counter()
+                completions = _parse(result)
+                if timing is not None:
+                    timing.parse = (timing.parse or 0.0) + time.perf_counter() - parse_started
+                    for completion in completions:
+                        completion.timing = timing
+                collected.extend(completions)
+                return collected
 
             # Extract payload-free failure facts for this attempt.
             response = getattr(transient, "response", None)
@@ -883,6 +1431,26 @@ class DeploymentSampler(_RestClient):
             error_kind = self._classify_transient(transient)
             retry_after_s = parse_retry_after(response) if response is not None else None
 
+            if attempt < self._RETRY_MAX_ATTEMPTS and self._retry_budget is not None:
+                if not self._retry_budget.try_withdraw():
+                    # Fail fast: during an error storm, retries beyond the
+                    # shared budget would only multiply the load.
+                    logger.warning(
+                        "[%s] Retry budget exhausted after %s (attempt %d); failing fast.",
+                        logical_request_id,
+                        label,
+                        attempt,
+                    )
+                    raise SamplingRequestError(
+                        logical_request_id=logical_request_id,
+                        model=self.model,
+                        attempts=attempt,
+                        final_status=status,
+                        final_error_kind=ERROR_KIND_RETRY_BUDGET,
+                        request_id=request_id,
+                        context=context,
+                    ) from transient
+
             if attempt == self._RETRY_MAX_ATTEMPTS:
                 raise self._terminal_error(
                     transient,
@@ -924,6 +1492,99 @@ class DeploymentSampler(_RestClient):
         # This line is here only to satisfy the type checker's flow analysis.
         raise AssertionError("unreachable: retry loop exited without return/raise")
 
+    async def _single_attempt(
+        self, cost: int, priority: str | None, stream_kwargs: dict[str, Any]
+    ) -> tuple[dict[str, Any], ServerMetrics]:
+        """Run one streaming request: breaker admission, concurrency slot, stream."""
+        queued_at = time.perf_counter()
+        breaker = self._circuit_breaker
+        probe = await breaker.admit() if breaker is not None else False
+        healthy: bool | None = None
+        try:
+            await self._acquire_concurrency(cost, priority)
+            server_metrics: ServerMetrics | None = None
+            started = time.perf_counter()
+            try:
+                result, server_metrics = await self.async_completions_stream(**stream_kwargs)
+                if server_metrics.client_timing is None:
+                    server_metrics.client_timing = RequestTiming()
+                server_metrics.client_timing.queue_wait = started - queued_at
+            except (_SSETruncationError, *self._RETRY_HTTPX_CONNECTION_EXC):
+                healthy = False
+                raise
+            except httpx.HTTPStatusError as e:
+                healthy = False if e.response.status_code in self._RETRY_HTTP_TRANSIENT_CODES else None
+                raise
+            finally:
+                # A caller may cancel a live stream (for example, a bounded
+                # rollout timeout, scheduler shutdown or a winning hedge), and
+                # contract/parser failures may bypass the retryable exception
+                # branches above. Every successful acquire must release
+                # exactly once.
+                self._release_concurrency(server_metrics, cost, priority)
+            healthy = True
+            if self._hedge_latency is not None:
+                self._hedge_latency.add(time.perf_counter() - started)
+            return result, server_metrics
+        finally:
+            if breaker is not None:
+                breaker.record(healthy, probe=probe)
+
+    def _hedge_delay(self) -> float | None:
+        """Seconds before hedging an attempt, or ``None`` until enough samples exist."""
+        assert self._hedging is not None and self._hedge_latency is not None
+        now = time.monotonic()
+        expires, delay = self._hedge_delay_cache
+        if now < expires:
+            return delay
+        latencies = self._hedge_latency.snapshot(now)
+        delay = None
+        if latencies.count >= self._hedging.min_samples:
+            delay = max(self._hedging.min_delay_s, latencies.quantile(self._hedging.quantile) or 0.0)
+        # Merging the window's sketches is cheap but not free; refresh once a second.
+        self._hedge_delay_cache = (now + 1.0, delay)
+        return delay
+
+    async def _hedged_attempt(
+        self, cost: int, priority: str | None, stream_kwargs: dict[str, Any]
+    ) -> tuple[dict[str, Any], ServerMetrics]:
+        """Like :meth:`_single_attempt`, racing a duplicate once the attempt is slow."""
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._single_attempt(cost, priority, stream_kwargs))
+        if delay is None:
+            return await primary
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            if self._retry_budget is not None and not self._retry_budget.try_withdraw():
+                # A hedge is extra load like a retry; skip it when the budget is spent.
+                return await primary
+            self._hedges_issued += 1
+            hedge = asyncio.ensure_future(self._single_attempt(cost, priority, stream_kwargs))
+            tasks.add(hedge)
+            first_error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is hedge:
+                            self._hedge_wins += 1
+                        return task.result()
+                    first_error = first_error or error
+            assert first_error is not None
+            raise first_error
+        finally:
+            # Cancel the loser (or both, if the caller was cancelled).
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
     @staticmethod
     def _raw_logprobs_match_sampling_params(temperature: float, kwargs: dict[str, Any]) -> bool:
         """Return True when raw logprobs are equivalent to sampling logprobs."""
@@ -958,8 +1619,13 @@ class DeploymentSampler(_RestClient):
         routing_requested: bool,
         echo_mode: bool,
         raw_logprobs_match_sampling: bool,
+        prompt_buffer: array | None = None,
     ) -> List[SampledCompletion]:
-        """Parse a completions API response into SampledCompletion objects."""
+        """Parse a completions API response into SampledCompletion objects.
+
+        When ``prompt_buffer`` is given, token and logprob fields are built as
+        :class:`CompactSequence` views that reference it as their prefix.
+        """
         completions: List[SampledCompletion] = []
         for choice in result.get("choices", []):
             text = choice.get("text", "")
@@ -1044,7 +1710,17 @@ class DeploymentSampler(_RestClient):
                 if routing_matrices is not None:
                     routing_matrices = routing_matrices[1:]
 
-            full_tokens = prompt_for_full + list(completion_ids)
+            if prompt_buffer is not None:
+                prefix = prompt_buffer
+                if expanded_prompt_ids is not None and prompt_for_full != prompt_ids:
+                    prefix = array("i", prompt_for_full)
+                full_tokens: Sequence[int] = CompactSequence.tokens(completion_ids, prefix)
+                if raw_logprobs is not None:
+                    raw_logprobs = CompactSequence.floats(raw_logprobs)
+                if sampling_logprobs is not None and None not in sampling_logprobs:
+                    sampling_logprobs = CompactSequence.floats(sampling_logprobs)
+            else:
+                full_tokens = prompt_for_full + list(completion_ids)
             if max_seq_len is not None and len(full_tokens) > max_seq_len:
                 logger.debug(
                     "Completion post-filtered: %d tokens > max_seq_len %d",
@@ -1056,12 +1732,12 @@ class DeploymentSampler(_RestClient):
             completions.append(
                 SampledCompletion(
                     text=text,
-                    full_tokens=full_tokens,
+                    full_tokens=full_tokens,  # type: ignore[arg-type]
                     prompt_len=len(prompt_for_full),
                     finish_reason=finish_reason,
                     completion_len=len(completion_ids),
-                    inference_logprobs=raw_logprobs,
-                    sampling_logprobs=sampling_logprobs,
+                    inference_logprobs=raw_logprobs,  # type: ignore[arg-type]
+                    sampling_logprobs=sampling_logprobs,  # type: ignore[arg-type]
                     logprobs_echoed=lp_is_echo,
                     routing_matrices=routing_matrices,
                 )
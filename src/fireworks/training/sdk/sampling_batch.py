@@ -0,0 +1,267 @@
+"""Whole-step batch rollouts on top of :class:`DeploymentSampler`.
+
+``DeploymentSampler.sample_batch(prompts, n)`` returns a :class:`SampleBatch`:
+an async iterable that yields one :class:`PromptResult` per prompt in
+completion order, keeps the sampler's concurrency window saturated without
+materializing thousands of coroutines up front, and exposes the per-prompt
+grouping and the controller's step summary once exhausted.
+
+With ``prefix_aware=True`` prompts that share a token-id prefix (system
+prompt, few-shot examples) are dispatched back-to-back so the deployment's
+prompt cache still holds the prefix when each sibling is prefilled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from array import array
+from typing import TYPE_CHECKING, Any, List, Sequence, AsyncIterator
+from dataclasses import field, dataclass
+
+if TYPE_CHECKING:
+    from fireworks.training.sdk.sampling import DeploymentSampler, SampledCompletion
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PromptResult:
+    """All completions sampled for one prompt of a batch."""
+
+    index: int
+    """Position of the prompt in the ``prompts`` sequence."""
+    completions: List["SampledCompletion"] = field(default_factory=list)
+    error: BaseException | None = None
+    """Terminal error for this prompt (only with ``return_exceptions=True``)."""
+
+
+def _common_prefix_len(a: Sequence[int], b: Sequence[int]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def group_by_shared_prefix(prompts: Sequence[Sequence[int]], min_shared_prefix: int) -> list[tuple[list[int], int]]:
+    """Group prompt indices whose token ids share at least ``min_shared_prefix`` tokens.
+
+    Sorting the prompts lexicographically places every prompt next to the
+    ones it shares the longest prefix with, so one linear pass over adjacent
+    pairs finds the groups.  Returns ``(indices, shared_prefix_len)`` pairs in
+    dispatch order; prompts without siblings form singleton groups with a
+    shared length of ``0``.
+    """
+    order = sorted(range(len(prompts)), key=lambda i: tuple(prompts[i]))
+    groups: list[tuple[list[int], int]] = []
+    members: list[int] = []
+    shared = 0
+    for index in order:
+        if members:
+            lcp = _common_prefix_len(prompts[members[-1]], prompts[index])
+            if lcp >= max(min_shared_prefix, 1):
+                shared = lcp if len(members) == 1 else min(shared, lcp)
+                members.append(index)
+                continue
+            groups.append((members, shared))
+        members, shared = [index], 0
+    if members:
+        groups.append((members, shared))
+    return groups
+
+
+def prefix_cache_key(prefix: Sequence[int]) -> str:
+    """Stable ``prompt_cache_key`` for a shared token-id prefix."""
+    return hashlib.blake2b(array("i", prefix).tobytes(), digest_size=16).hexdigest()
+
+
+class SampleBatch:
+    """Async iterable over the prompts of one RL step, in completion order.
+
+    Prompts are scheduled lazily: at most ``max_in_flight`` sampling requests
+    are outstanding (counting ``n`` requests per prompt unless the sampler
+    uses server-side fan-out), and new prompts are only started when the
+    consumer pulls a result, so finished-but-unconsumed completions cannot
+    pile up.  When ``max_in_flight`` is not given it tracks twice the
+    controller's current window, so an adaptive window that grows mid-step is
+    kept saturated.
+
+    When iteration ends -- after the last prompt, on a failed prompt or when
+    the consumer stops early -- ``step_completed()`` is called on the
+    sampler's concurrency controller and its summary is kept in
+    :attr:`concurrency_summary`.  A :class:`SharedConcurrencyController`
+    does not wait for its broker there, so its summary is the previous
+    step's.
+
+    With ``prefix_aware`` the dispatch order follows
+    :func:`group_by_shared_prefix`, and ``attach_prompt_cache_key`` sends a
+    ``prompt_cache_key`` derived from each group's shared prefix so siblings
+    are routed to the replica that already holds it.  :attr:`cache_stats`
+    reports the prompt-cache hit rate the batch actually achieved.
+
+    Example::
+
+        batch = sampler.sample_batch(prompts, n=16, max_tokens=2048)
+        async for result in batch:
+            rewards = score(result.completions)
+        groups, summary = batch.groups, batch.concurrency_summary
+    """
+
+    _DEFAULT_MAX_IN_FLIGHT = 64
+
+    def __init__(
+        self,
+        sampler: "DeploymentSampler",
+        prompts: Sequence[list[int]],
+        n: int,
+        max_in_flight: int | None,
+        return_exceptions: bool,
+        sample_kwargs: dict[str, Any],
+        prefix_aware: bool = False,
+        min_shared_prefix: int = 32,
+        attach_prompt_cache_key: bool = False,
+    ):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self._sampler = sampler
+        self._prompts = prompts
+        self._n = n
+        self._max_in_flight = max_in_flight
+        self._return_exceptions = return_exceptions
+        self._sample_kwargs = sample_kwargs
+        self._results: list[PromptResult | None] = [None] * len(prompts)
+        self._concurrency_summary: dict[str, float] | None = None
+        self._started = False
+
+        self._order: list[int] = list(range(len(prompts)))
+        self._cache_keys: dict[int, str] = {}
+        self._prefix_groups = 0
+        if prefix_aware or attach_prompt_cache_key:
+            groups = group_by_shared_prefix(prompts, min_shared_prefix)
+            self._order = [index for members, _ in groups for index in members]
+            self._prefix_groups = sum(1 for members, _ in groups if len(members) > 1)
+            if attach_prompt_cache_key and "prompt_cache_key" not in sample_kwargs:
+                for members, shared in groups:
+                    if len(members) > 1:
+                        key = prefix_cache_key(prompts[members[0]][:shared])
+                        self._cache_keys.update((index, key) for index in members)
+        self._cache_counters_start: tuple[int, int] = (0, 0)
+        self._cache_stats: dict[str, float] | None = None
+
+    @property
+    def groups(self) -> list[list["SampledCompletion"]]:
+        """Completions grouped by prompt index (empty for failed/pending prompts)."""
+        return [r.completions if r is not None else [] for r in self._results]
+
+    @property
+    def errors(self) -> dict[int, BaseException]:
+        """Terminal errors by prompt index (only with ``return_exceptions=True``)."""
+        return {r.index: r.error for r in self._results if r is not None and r.error is not None}
+
+    @property
+    def concurrency_summary(self) -> dict[str, float] | None:
+        """``step_completed()`` summary of the controller, once iteration has ended."""
+        return self._concurrency_summary
+
+    @property
+    def cache_stats(self) -> dict[str, float] | None:
+        """Prompt-cache outcome of the batch, once iteration has ended.
+
+        ``cached_prompt_tokens`` / ``prompt_tokens`` come from the server
+        metrics of every request the sampler completed while the batch ran;
+        ``cache_hit_rate`` is their ratio (absent when the deployment does not
+        report prompt tokens).  ``prefix_groups`` counts groups of two or
+        more prompts sharing a prefix.
+        """
+        return self._cache_stats
+
+    def _requests_per_prompt(self) -> int:
+        server_side_n = self._sample_kwargs.get("server_side_n")
+        if server_side_n is None:
+            server_side_n = self._sampler.server_side_n
+        return 1 if server_side_n else self._n
+
+    def _prompt_limit(self) -> int:
+        if self._max_in_flight is not None:
+            budget = self._max_in_flight
+        else:
+            controller = self._sampler.concurrency_controller
+            window = getattr(controller, "window_size", None)
+            budget = 2 * window if window else self._DEFAULT_MAX_IN_FLIGHT
+        return max(1, budget // self._requests_per_prompt())
+
+    async def _sample_one(self, index: int) -> PromptResult:
+        kwargs = self._sample_kwargs
+        cache_key = self._cache_keys.get(index)
+        if cache_key is not None:
+            kwargs = {**kwargs, "prompt_cache_key": cache_key}
+        try:
+            completions = await self._sampler.sample_with_prompt_tokens(self._prompts[index], n=self._n, **kwargs)
+        except Exception as e:
+            if not self._return_exceptions:
+                raise
+            logger.warning("sample_batch: prompt %d failed: %s", index, e)
+            return PromptResult(index=index, error=e)
+        return PromptResult(index=index, completions=completions)
+
+    def __aiter__(self) -> AsyncIterator[PromptResult]:
+        if self._started:
+            raise RuntimeError("SampleBatch can only be iterated once")
+        self._started = True
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[PromptResult]:
+        next_index = 0
+        pending: set[asyncio.Task[PromptResult]] = set()
+        self._cache_counters_start = self._sampler.prompt_cache_counters()
+        try:
+            while next_index < len(self._order) or pending:
+                limit = self._prompt_limit()
+                while next_index < len(self._order) and len(pending) < limit:
+                    pending.add(asyncio.ensure_future(self._sample_one(self._order[next_index])))
+                    next_index += 1
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    self._results[result.index] = result
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            self._finish()
+
+    def _finish(self) -> None:
+        controller = self._sampler.concurrency_controller
+        if controller is not None:
+            self._concurrency_summary = controller.step_completed()
+
+        cached_start, total_start = self._cache_counters_start
+        cached_end, total_end = self._sampler.prompt_cache_counters()
+        cached, total = cached_end - cached_start, total_end - total_start
+        stats: dict[str, float] = {
+            "cached_prompt_tokens": float(cached),
+            "prompt_tokens": float(total),
+            "prefix_groups": float(self._prefix_groups),
+        }
+        if total > 0:
+            stats["cache_hit_rate"] = cached / total
+        self._cache_stats = stats
+        logger.info(
+            "sample_batch: prompts=%d, prefix_groups=%d, cache_hit_rate=%s",
+            len(self._prompts),
+            self._prefix_groups,
+            f"{stats['cache_hit_rate']:.1%}" if "cache_hit_rate" in stats else "N/A",
+        )
+
+    async def collect(self) -> list[list["SampledCompletion"]]:
+        """Run the whole batch and return :attr:`groups`."""
+        async for _ in self:
+            pass
+        return self.groups
@@ -32,6 +32,7 @@ ERROR_KIND_HTTP_STATUS = "http_status"
 ERROR_KIND_SSE_TRUNCATION = "sse_truncation"
 ERROR_KIND_CONNECTION = "connection"
 ERROR_KIND_TIMEOUT = "timeout"
+ERROR_KIND_RETRY_BUDGET = "retry_budget_exhausted"
 
 
 def extract_request_id(headers: Mapping[str, str] | None) -> str | None:
@@ -90,6 +91,8 @@ class SamplingRequestError(RuntimeError):
             parts.append(f"HTTP {self.final_status}")
         elif self.final_error_kind:
             parts.append(self.final_error_kind)
+        if self.final_error_kind == ERROR_KIND_RETRY_BUDGET and self.final_status is not None:
+            parts.append("(retry budget exhausted)")
         if self.model:
             parts.append(f"model={self.model}")
         if self.request_id:
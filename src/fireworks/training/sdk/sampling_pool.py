@@ -0,0 +1,272 @@
+"""Load balancing across several deployments of the same policy snapshot.
+
+:class:`DeploymentSamplerPool` wraps one :class:`DeploymentSampler` per
+target deployment (replica or model/URL pair) and exposes the same
+``sample_with_prompt_tokens`` / ``sample_with_tokens`` API.  Each call goes
+to one target, chosen by the fewest outstanding requests or by the lowest
+EMA of the ``prefill-queue-duration`` the target reports.  Targets whose
+requests fail after the sampler's own retries are ejected for a while and
+the call fails over to another target.  Every target keeps its own
+concurrency controller, so one slow replica cannot shrink the others'
+windows.
+"""
+
+from __future__ import annotations
+
+import time
+import logging
+from typing import TYPE_CHECKING, Any, List, Callable, Sequence
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler, SampledCompletion
+from fireworks.training.sdk.concurrency import AdaptiveConcurrencyController, SamplingConcurrencyController
+from fireworks.training.sdk.sampling_observability import SamplingRequestError
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolTarget:
+    """Load and health state of one pool member."""
+
+    __slots__ = (
+        "sampler",
+        "outstanding",
+        "pq_ema",
+        "consecutive_failures",
+        "ejections",
+        "ejected_until",
+        "requests",
+        "failures",
+    )
+
+    def __init__(self, sampler: DeploymentSampler):
+        self.sampler = sampler
+        self.outstanding = 0
+        self.pq_ema: float | None = None
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+
+class DeploymentSamplerPool:
+    """Spreads sampling calls across several deployments serving the same policy.
+
+    Policies:
+
+    - ``"least_outstanding"``: the target with the fewest in-flight
+      requests (each of the ``n`` completions of a call counts).
+    - ``"queue_ema"``: the target with the lowest exponential moving
+      average (``ema_alpha``) of ``ServerMetrics.prefill_queue_duration``.
+      Targets without samples yet count as an empty queue, and ties go to
+      the fewest outstanding requests.
+
+    A target is ejected after ``eject_after`` consecutive calls fail with
+    :class:`SamplingRequestError`, i.e. after the sampler's own retries
+    are exhausted.  Errors such as a 400 are the caller's, not the
+    target's, and are raised without counting.  The ejection lasts
+    ``eject_s`` seconds, doubling on each repeated ejection up to
+    ``max_eject_s``, and is forgotten after the next success.  While every
+    target is ejected, the one whose ejection ends first is used rather
+    than failing outright.
+
+    A failed call is re-sent to up to ``max_failovers`` other targets
+    before the error is raised.  Each sampler keeps its own concurrency
+    controller; the pool refuses samplers that share one.
+
+    The pool owns its samplers: :meth:`close` closes all of them.
+    """
+
+    LEAST_OUTSTANDING = "least_outstanding"
+    QUEUE_EMA = "queue_ema"
+    POLICIES = (LEAST_OUTSTANDING, QUEUE_EMA)
+
+    _DEFAULT_EMA_ALPHA = 0.2
+    _DEFAULT_EJECT_AFTER = 2
+    _DEFAULT_EJECT_S = 30.0
+    _DEFAULT_MAX_EJECT_S = 300.0
+    _DEFAULT_MAX_FAILOVERS = 1
+
+    def __init__(
+        self,
+        samplers: Sequence[DeploymentSampler],
+        *,
+        policy: str = LEAST_OUTSTANDING,
+        ema_alpha: float = _DEFAULT_EMA_ALPHA,
+        eject_after: int = _DEFAULT_EJECT_AFTER,
+        eject_s: float = _DEFAULT_EJECT_S,
+        max_eject_s: float = _DEFAULT_MAX_EJECT_S,
+        max_failovers: int = _DEFAULT_MAX_FAILOVERS,
+    ):
+        if not samplers:
+            raise ValueError("DeploymentSamplerPool needs at least one sampler")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+        if not 0.0 < ema_alpha <= 1.0:
+            raise ValueError("ema_alpha must be in (0, 1]")
+        if eject_after < 1 or max_failovers < 0:
+            raise ValueError("eject_after must be at least 1 and max_failovers non-negative")
+        controllers = [id(s.concurrency_controller) for s in samplers if s.concurrency_controller is not None]
+        if len(controllers) != len(set(controllers)):
+            raise ValueError("each sampler in a pool needs its own concurrency controller")
+
+        self.policy = policy
+        self._ema_alpha = ema_alpha
+        self._eject_after = eject_after
+        self._eject_s = eject_s
+        self._max_eject_s = max_eject_s
+        self._max_failovers = max_failovers
+        self._targets = [_PoolTarget(s) for s in samplers]
+        # Rotating start index so ties do not always go to the first target.
+        self._cursor = 0
+        for target in self._targets:
+            target.sampler.on_server_metrics = self._metrics_hook(target, target.sampler.on_server_metrics)
+
+    @classmethod
+    def from_deployments(
+        cls,
+        deployments: Sequence[tuple[str, str]],
+        api_key: str,
+        *,
+        tokenizer: PreTrainedTokenizerBase | None = None,
+        concurrency_controller_factory: Callable[[], SamplingConcurrencyController] = AdaptiveConcurrencyController,
+        sampler_options: dict[str, Any] | None = None,
+        **pool_options: Any,
+    ) -> DeploymentSamplerPool:
+        """Build a pool from ``(inference_url, model)`` pairs.
+
+        Each target gets a fresh controller from
+        ``concurrency_controller_factory``.  ``sampler_options`` are passed
+        to every :class:`DeploymentSampler` and ``pool_options`` to the pool.
+        """
+        samplers = [
+            DeploymentSampler(
+                inference_url=url,
+                model=model,
+                api_key=api_key,
+                tokenizer=tokenizer,
+                concurrency_controller=concurrency_controller_factory(),
+                **(sampler_options or {}),
+            )
+            for url, model in deployments
+        ]
+        return cls(samplers, **pool_options)
+
+    @property
+    def samplers(self) -> list[DeploymentSampler]:
+        return [t.sampler for t in self._targets]
+
+    # -- Sampling --------------------------------------------------------------
+
+    async def sample_with_prompt_tokens(
+        self, prompt_token_ids: list[int], n: int = 1, **kwargs: Any
+    ) -> List[SampledCompletion]:
+        """Sample on one target; see :meth:`DeploymentSampler.sample_with_prompt_tokens`."""
+        return await self._dispatch("sample_with_prompt_tokens", prompt_token_ids, n, kwargs)
+
+    async def sample_with_tokens(
+        self, messages: list[dict[str, str]], n: int = 1, **kwargs: Any
+    ) -> List[SampledCompletion]:
+        """Sample on one target; see :meth:`DeploymentSampler.sample_with_tokens`."""
+        return await self._dispatch("sample_with_tokens", messages, n, kwargs)
+
+    async def _dispatch(self, method: str, prompt: Any, n: int, kwargs: dict[str, Any]) -> List[SampledCompletion]:
+        tried: set[int] = set()
+        while True:
+            index = self._pick(tried)
+            target = self._targets[index]
+            tried.add(index)
+            target.outstanding += n
+            target.requests += 1
+            try:
+                result = await getattr(target.sampler, method)(prompt, n, **kwargs)
+            except SamplingRequestError as exc:
+                self._record_failure(target, exc)
+                if len(tried) > self._max_failovers or len(tried) == len(self._targets):
+                    raise
+                logger.warning("Failing over from %s after: %s", target.sampler.model, exc)
+                continue
+            finally:
+                target.outstanding -= n
+            target.consecutive_failures = 0
+            target.ejections = 0
+            return result
+
+    def _pick(self, exclude: set[int]) -> int:
+        now = time.monotonic()
+        count = len(self._targets)
+        order = [(self._cursor + i) % count for i in range(count)]
+        self._cursor = (self._cursor + 1) % count
+        candidates = [i for i in order if i not in exclude] or order
+        healthy = [i for i in candidates if self._targets[i].ejected_until <= now]
+        if not healthy:
+            return min(candidates, key=lambda i: self._targets[i].ejected_until)
+        if self.policy == self.QUEUE_EMA:
+            return min(healthy, key=lambda i: (self._targets[i].pq_ema or 0.0, self._targets[i].outstanding))
+        return min(healthy, key=lambda i: self._targets[i].outstanding)
+
+    def _record_failure(self, target: _PoolTarget, exc: SamplingRequestError) -> None:
+        target.failures += 1
+        target.consecutive_failures += 1
+        if target.consecutive_failures < self._eject_after:
+            return
+        target.consecutive_failures = 0
+        target.ejections += 1
+        duration = min(self._max_eject_s, self._eject_s * 2 ** (target.ejections - 1))
+        target.ejected_until = time.monotonic() + duration
+        logger.warning(
+            "Ejecting %s from the sampler pool for %.0fs (%s)",
+            target.sampler.model,
+            duration,
+            exc.final_error_kind or exc.final_status,
+        )
+
+    def _metrics_hook(
+        self, target: _PoolTarget, previous: Callable[[ServerMetrics], None] | None
+    ) -> Callable[[ServerMetrics], None]:
+        alpha = self._ema_alpha
+
+        def _on_metrics(metrics: ServerMetrics) -> None:
+            pq = metrics.prefill_queue_duration
+            if pq is not None:
+                target.pq_ema = pq if target.pq_ema is None else alpha * pq + (1 - alpha) * target.pq_ema
+            if previous is not None:
+                previous(metrics)
+
+        return _on_metrics
+
+    # -- Metrics and lifecycle -------------------------------------------------
+
+    def target_stats(self) -> list[dict[str, Any]]:
+        """Per-target load and health, in pool order."""
+        now = time.monotonic()
+        return [
+            {
+                "model": t.sampler.model,
+                "inference_url": t.sampler.base_url,
+                "outstanding": t.outstanding,
+                "prefill_queue_ema": t.pq_ema,
+                "ejected": t.ejected_until > now,
+                "ejections": t.ejections,
+                "requests": t.requests,
+                "failures": t.failures,
+            }
+            for t in self._targets
+        ]
+
+    def drain_metrics(self) -> list[ServerMetrics]:
+        """Drain and concatenate every target's ServerMetrics."""
+        return [m for t in self._targets for m in t.sampler.drain_metrics()]
+
+    def close(self) -> None:
+        for target in self._targets:
+            target.sampler.close()
+
+    def __enter__(self) -> DeploymentSamplerPool:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
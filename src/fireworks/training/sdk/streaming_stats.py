@@ -0,0 +1,334 @@
+"""Constant-memory streaming statistics for sampler and controller metrics.
+
+:class:`QuantileSketch` is a DDSketch.  It keeps logarithmically spaced
+buckets, so any quantile is within ``relative_accuracy`` of the exact
+value, memory is bounded by ``max_buckets``, and two sketches merge by
+adding their buckets.  :class:`SlidingQuantiles` keeps a ring of
+per-time-slot sketches and forgets old samples slot by slot.
+:class:`ServerMetricsWindow` applies it to every ``ServerMetrics`` field
+the sampler reports on.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from fireworks.training.sdk.sampling import ServerMetrics
+
+
+# =============================================================================
+# QuantileSketch — mergeable relative-error quantiles (DDSketch)
+# =============================================================================
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch).
+
+    Values are counted in buckets ``(gamma**(k-1), gamma**k]`` with
+    ``gamma = (1 + a) / (1 - a)`` for ``a = relative_accuracy``.  Values at
+    or below ``min_value`` (including zero and negative values) share one
+    bucket.  Once there are more than ``max_buckets`` buckets, the lowest
+    ones are merged, which only affects accuracy for the smallest values.
+    Quantile estimates are clamped to the exact ``min`` / ``max`` seen.
+
+    ``add`` is O(1) and ``quantile`` is O(buckets).  There is no locking,
+    because the sampler records metrics from a single event loop.
+    """
+
+    __slots__ = (
+        "_relative_accuracy",
+        "_gamma",
+        "_log_gamma",
+        "_min_value",
+        "_max_buckets",
+        "_bins",
+        "_zero_count",
+        "_count",
+        "_sum",
+        "_min",
+        "_max",
+    )
+
+    _DEFAULT_RELATIVE_ACCURACY = 0.01
+    _DEFAULT_MAX_BUCKETS = 2048
+    _DEFAULT_MIN_VALUE = 1e-9
+
+    def __init__(
+        self,
+        relative_accuracy: float = _DEFAULT_RELATIVE_ACCURACY,
+        max_buckets: int = _DEFAULT_MAX_BUCKETS,
+        min_value: float = _DEFAULT_MIN_VALUE,
+    ):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        if max_buckets < 1:
+            raise ValueError("max_buckets must be at least 1")
+        self._relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._min_value = min_value
+        self._max_buckets = max_buckets
+        self._bins: dict[int, int] = {}
+        self._zero_count = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def mean(self) -> float | None:
+        return self._sum / self._count if self._count else None
+
+    @property
+    def min(self) -> float | None:
+        return self._min if self._count else None
+
+    @property
+    def max(self) -> float | None:
+        return self._max if self._count else None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Record ``value`` ``weight`` times."""
+        if weight <= 0:
+            return
+        value = float(value)
+        if value <= self._min_value:
+            self._zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._bins[key] = self._bins.get(key, 0) + weight
+            if len(self._bins) > self._max_buckets:
+                self._collapse()
+        self._count += weight
+        self._sum += value * weight
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add ``other``'s samples to this sketch."""
+        if other._relative_accuracy != self._relative_accuracy:
+            raise ValueError("cannot merge sketches with different relative_accuracy")
+        if not other._count:
+            return
+        for key, count in other._bins.items():
+            self._bins[key] = self._bins.get(key, 0) + count
+        while len(self._bins) > self._max_buckets:
+            self._collapse()
+        self._zero_count += other._zero_count
+        self._count += other._count
+        self._sum += other._sum
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimated ``q``-quantile (``0 <= q <= 1``), or ``None`` if empty."""
+        if not self._count:
+            return None
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("quantile must be in [0, 1]")
+        if q == 1.0:
+            return self._max
+        rank = q * (self._count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            estimate = 0.0
+        else:
+            estimate = self._max
+            for key in sorted(self._bins):
+                seen += self._bins[key]
+                if rank < seen:
+                    # Midpoint (in relative terms) of (gamma**(k-1), gamma**k].
+                    estimate = 2 * self._gamma**key / (self._gamma + 1)
+                    break
+        return min(self._max, max(self._min, estimate))
+
+    def clear(self) -> None:
+        self._bins.clear()
+        self._zero_count = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+
+    def _collapse(self) -> None:
+        lowest, second = sorted(self._bins)[:2]
+        self._bins[second] += self._bins.pop(lowest)
+
+
+# =============================================================================
+# SlidingQuantiles — ring of per-slot sketches
+# =============================================================================
+
+
+class SlidingQuantiles:
+    """Quantiles over roughly the last ``window_s`` seconds in constant memory.
+
+    The window is split into ``slots`` time slots, each with its own
+    :class:`QuantileSketch`, kept in a fixed ring.  A slot is reset when the
+    ring wraps around to it, so samples expire one slot at a time.  Queries
+    merge the live slots.
+    """
+
+    _DEFAULT_WINDOW_S = 60.0
+    _DEFAULT_SLOTS = 6
+
+    def __init__(
+        self,
+        window_s: float = _DEFAULT_WINDOW_S,
+        slots: int = _DEFAULT_SLOTS,
+        relative_accuracy: float = QuantileSketch._DEFAULT_RELATIVE_ACCURACY,
+    ):
+        if window_s <= 0 or slots < 1:
+            raise ValueError("window_s must be positive and slots at least 1")
+        self._slot_s = window_s / slots
+        self._relative_accuracy = relative_accuracy
+        self._sketches = [QuantileSketch(relative_accuracy) for _ in range(slots)]
+        self._epochs = [-1] * slots
+
+    def add(self, value: float, now: float | None = None) -> None:
+        self._slot(now).add(value)
+
+    def _slot(self, now: float | None) -> QuantileSketch:
+        epoch = int((time.monotonic() if now is None else now) / self._slot_s)
+        index = epoch % len(self._sketches)
+        sketch = self._sketches[index]
+        if self._epochs[index] != epoch:
+            sketch.clear()
+            self._epochs[index] = epoch
+        return sketch
+
+    def snapshot(self, now: float | None = None) -> QuantileSketch:
+        """Merged sketch of the samples still inside the window."""
+        epoch = int((time.monotonic() if now is None else now) / self._slot_s)
+        merged = QuantileSketch(self._relative_accuracy)
+        for slot_epoch, sketch in zip(self._epochs, self._sketches):
+            if epoch - len(self._sketches) < slot_epoch <= epoch:
+                merged.merge(sketch)
+        return merged
+
+    def quantile(self, q: float, now: float | None = None) -> float | None:
+        return self.snapshot(now).quantile(q)
+
+    def clear(self) -> None:
+        for sketch in self._sketches:
+            sketch.clear()
+        self._epochs = [-1] * len(self._sketches)
+
+
+# =============================================================================
+# ServerMetricsWindow — sliding statistics of sampler ServerMetrics
+# =============================================================================
+
+
+class ServerMetricsWindow:
+    """Sliding-window p50/p95/p99 of the latency and queue ``ServerMetrics`` fields.
+
+    The ``client_timing`` phases are tracked as ``timing_<phase>`` series.
+    Also tracks the prompt-cache hit rate over the same window.  Memory is
+    constant regardless of how many requests are recorded.
+    """
+
+    FIELDS = (
+        "prefill_queue_duration",
+        "generation_queue_duration",
+        "server_ttft",
+        "client_ttft",
+        "client_pool_wait",
+        "server_processing_time",
+        "num_concurrent_requests",
+    )
+    TIMING_FIELDS = (
+        "queue_wait",
+        "connection_wait",
+        "connect",
+        "tls",
+        "request_write",
+        "first_byte",
+        "first_token",
+        "last_token",
+        "total",
+        "parse",
+    )
+    _DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(
+        self,
+        window_s: float = SlidingQuantiles._DEFAULT_WINDOW_S,
+        slots: int = SlidingQuantiles._DEFAULT_SLOTS,
+        relative_accuracy: float = QuantileSketch._DEFAULT_RELATIVE_ACCURACY,
+    ):
+        names = (*self.FIELDS, *(f"timing_{name}" for name in self.TIMING_FIELDS))
+        self._series = {name: SlidingQuantiles(window_s, slots, relative_accuracy) for name in names}
+        self._cache = SlidingQuantiles(window_s, slots, relative_accuracy)
+        self._prompt = SlidingQuantiles(window_s, slots, relative_accuracy)
+
+    def add(self, metrics: ServerMetrics, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        for name in self.FIELDS:
+            value = getattr(metrics, name)
+            if value is not None:
+                self._series[name].add(value, now)
+        timing = metrics.client_timing
+        if timing is not None:
+            for name in self.TIMING_FIELDS:
+                value = getattr(timing, name)
+                if value is not None:
+                    self._series[f"timing_{name}"].add(value, now)
+        if metrics.prompt_tokens is not None:
+            self._prompt.add(metrics.prompt_tokens, now)
+            self._cache.add(metrics.cached_prompt_tokens or 0, now)
+
+    def sketch(self, name: str, now: float | None = None) -> QuantileSketch:
+        """Merged sketch of one ``ServerMetrics`` field (or ``timing_<phase>``) over the window."""
+        return self._series[name].snapshot(now)
+
+    def quantile(self, name: str, q: float, now: float | None = None) -> float | None:
+        return self._series[name].quantile(q, now)
+
+    def cache_hit_rate(self, now: float | None = None) -> float | None:
+        prompt = self._prompt.snapshot(now).sum
+        if prompt <= 0:
+            return None
+        return self._cache.snapshot(now).sum / prompt
+
+    def summary(
+        self, quantiles: Sequence[float] = _DEFAULT_QUANTILES, now: float | None = None
+    ) -> dict[str, float]:
+        """``<field>_p50``-style keys for every field with samples, plus ``cache_hit_rate``."""
+        out: dict[str, float] = {}
+        for name in self._series:
+            sketch = self.sketch(name, now)
+            if not sketch.count:
+                continue
+            for q in quantiles:
+                value = sketch.quantile(q)
+                if value is not None:
+                    out[f"{name}_p{q * 100:g}"] = value
+            if sketch.max is not None:
+                out[f"{name}_max"] = sketch.max
+        hit_rate = self.cache_hit_rate(now)
+        if hit_rate is not None:
+            out["cache_hit_rate"] = hit_rate
+        return out
+
+    def clear(self) -> None:
+        for series in self._series.values():
+            series.clear()
+        self._cache.clear()
+        self._prompt.clear()
@@ -0,0 +1 @@
+"""Client-side microbenchmarks for the training SDK (not collected by pytest)."""
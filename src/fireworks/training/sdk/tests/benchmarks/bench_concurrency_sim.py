@@ -0,0 +1,142 @@
+"""Simulated-server benchmark of the concurrency controllers.
+
+Drives each controller with a closed loop of ``--clients`` workers against
+an in-process model of a deployment: ``--slots`` requests are batched
+concurrently, each one pays a prefill and a per-token decode cost that
+grow with batch occupancy, and anything above the batch waits in a FIFO
+prefill queue.  The server reports ``prefill_queue_duration``,
+``server_ttft`` and ``server_processing_time`` the way response headers
+would.
+
+After ``--warmup`` seconds, reports steady-state completions per second,
+p50/p99 server latency (queue + processing), the average client-side
+wait for a slot, and the mean window, for example::
+
+    controller  req/s    p50 s    p99 s  wait s  window
+    aimd        ...
+
+Usage::
+
+    python -m fireworks.training.sdk.tests.benchmarks.bench_concurrency_sim \\
+        [--controllers aimd,gradient] [--slots 64] [--duration 15]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import asyncio
+import argparse
+from typing import Any
+
+from fireworks.training.sdk.sampling import ServerMetrics
+from fireworks.training.sdk.concurrency import (
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    GradientConcurrencyController,
+)
+
+
+class _SimServer:
+    def __init__(self, slots: int, prefill_s: float, decode_s: float, tokens: int):
+        self._batch = asyncio.Semaphore(slots)
+        self._slots = slots
+        self._prefill_s = prefill_s
+        self._decode_s = decode_s
+        self._tokens = tokens
+        self._active = 0
+
+    async def request(self) -> ServerMetrics:
+        t0 = time.perf_counter()
+        async with self._batch:
+            queued = time.perf_counter() - t0
+            self._active += 1
+            try:
+                occupancy = self._active / self._slots
+                prefill = self._prefill_s * (1 + occupancy)
+                await asyncio.sleep(prefill)
+                await asyncio.sleep(self._tokens * self._decode_s * (1 + 0.5 * occupancy))
+            finally:
+                self._active -= 1
+        return ServerMetrics(
+            prefill_queue_duration=queued,
+            server_ttft=queued + prefill,
+            server_processing_time=time.perf_counter() - t0,
+        )
+
+
+def _controller(name: str, window: int) -> Any:
+    if name == "fixed":
+        return FixedConcurrencyController(window)
+    if name == "gradient":
+        return GradientConcurrencyController(initial_window=window)
+    return AdaptiveConcurrencyController(initial_window=window, adjustment_interval=16)
+
+
+def _quantile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _bench(name: str, args: argparse.Namespace) -> str:
+    server = _SimServer(args.slots, args.prefill, args.decode, args.tokens)
+    ctrl = _controller(name, args.window)
+    latencies: list[float] = []
+    waits: list[float] = []
+    windows: list[int] = []
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    deadline = measure_from + args.duration
+
+    async def _worker() -> None:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await ctrl.acquire()
+            t1 = time.perf_counter()
+            metrics: ServerMetrics | None = None
+            try:
+                metrics = await server.request()
+            finally:
+                ctrl.release(metrics)
+            if t0 >= measure_from and time.perf_counter() <= deadline:
+                latencies.append(metrics.server_processing_time or 0.0)
+                waits.append(t1 - t0)
+
+    async def _steps() -> None:
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(args.step)
+            ctrl.step_completed()
+            if time.perf_counter() >= measure_from:
+                windows.append(ctrl.window_size)
+
+    await asyncio.gather(_steps(), *[_worker() for _ in range(args.clients)])
+    return (
+        f"{name:<10} {len(latencies) / args.duration:>7.1f} {_quantile(latencies, 0.5):>8.3f} "
+        f"{_quantile(latencies, 0.99):>8.3f} {sum(waits) / max(len(waits), 1):>7.3f} "
+        f"{sum(windows) / max(len(windows), 1):>7.1f}"
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--controllers", default="aimd,gradient", help="comma-separated: fixed, aimd, gradient")
+    parser.add_argument("--clients", type=int, default=512, help="closed-loop workers (offered load)")
+    parser.add_argument("--slots", type=int, default=64, help="server batch capacity")
+    parser.add_argument("--prefill", type=float, default=0.02, help="prefill seconds at an empty batch")
+    parser.add_argument("--decode", type=float, default=0.0005, help="decode seconds per token")
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--window", type=int, default=16, help="initial window")
+    parser.add_argument("--step", type=float, default=1.0, help="seconds between step_completed() calls")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'controller':<10} {'req/s':>7} {'p50 s':>8} {'p99 s':>8} {'wait s':>7} {'window':>7}")
+    for name in args.controllers.split(","):
+        print(asyncio.run(_bench(name.strip(), args)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
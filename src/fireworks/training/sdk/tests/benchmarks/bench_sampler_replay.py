@@ -0,0 +1,144 @@
+"""Offline DeploymentSampler benchmark on the record/replay harness.
+
+Runs ``--steps`` RL steps of ``sample_batch(prompts, n)`` against a
+:class:`~fireworks.training.sdk.replay.ReplayTransport` and reports, per
+step: rollout throughput, completion tokens per second, client CPU per
+token, peak traced memory per rollout, injected faults and the
+concurrency controller's ``step_completed()`` summary.
+
+Usage::
+
+    python -m fireworks.training.sdk.tests.benchmarks.bench_sampler_replay \\
+        [--recording rollouts.jsonl] [--controller adaptive] [--fault-503 0.02]
+
+Without ``--recording`` a synthetic stream is replayed.  ``--capacity``
+models a deployment that starts queueing prefill once more than that many
+requests are in flight, which is what the adaptive controllers react to.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+from typing import Any
+
+from fireworks.training.sdk.replay import (
+    ReplayFaults,
+    ReplayTransport,
+    RecordedExchange,
+    load_exchanges,
+    attach_transport,
+)
+from fireworks.training.sdk.sampling import DeploymentSampler
+from fireworks.training.sdk.concurrency import (
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+
+
+def _controller(name: str, window: int) -> Any:
+    if name == "fixed":
+        return FixedConcurrencyController(window)
+    if name == "token":
+        return TokenBudgetConcurrencyController(initial_budget=window * 4096, adjustment_interval=16)
+    return AdaptiveConcurrencyController(initial_window=window, adjustment_interval=16)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    if args.recording:
+        exchanges = load_exchanges(args.recording)
+    else:
+        exchanges = [
+            RecordedExchange.synthetic(
+                args.tokens,
+                n=n,
+                ttft_s=args.ttft,
+                inter_token_s=args.inter_token,
+                top_logprobs=args.top_logprobs,
+            )
+            for n in {1, args.n}
+        ]
+    replay = ReplayTransport(
+        exchanges,
+        time_scale=args.time_scale,
+        faults=ReplayFaults(
+            rate_429=args.fault_429,
+            rate_503=args.fault_503,
+            rate_truncate=args.fault_truncate,
+            retry_after_s=0.05,
+        ),
+        prefill_queue_fn=lambda in_flight: max(0, in_flight - args.capacity) * args.queue_per_request,
+        seed=0,
+    )
+    sampler = DeploymentSampler(
+        inference_url="http://replay.local",
+        model="replay",
+        api_key="replay",
+        tokenizer=None,
+        concurrency_controller=_controller(args.controller, args.window),
+        server_side_n=args.server_side_n,
+        compact_completions=args.compact,
+        chunk_decoder=args.decoder,
+    )
+    sampler._RETRY_BASE_BACKOFF_S = args.retry_backoff  # type: ignore[misc]
+    attach_transport(sampler, replay)
+    prompts = [[1000 + p] * 64 for p in range(args.prompts)]
+
+    if args.memory:
+        tracemalloc.start()
+    print(f"{'step':>4} {'rollouts/s':>10} {'tok/s':>9} {'cpu us/tok':>10} {'KiB/rollout':>11}  controller")
+    for step in range(args.steps):
+        if args.memory:
+            tracemalloc.reset_peak()
+        faults_before = replay.stats["faults_429"] + replay.stats["faults_503"] + replay.stats["truncations"]
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        batch = sampler.sample_batch(prompts, n=args.n, max_tokens=args.tokens, logprobs=True)
+        groups = await batch.collect()
+        wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+        rollouts = sum(len(g) for g in groups)
+        tokens = sum(c.completion_len for g in groups for c in g)
+        peak = tracemalloc.get_traced_memory()[1] if args.memory else 0
+        faults = replay.stats["faults_429"] + replay.stats["faults_503"] + replay.stats["truncations"] - faults_before
+        summary = batch.concurrency_summary or {}
+        print(
+            f"{step:>4} {rollouts / wall:>10.1f} {tokens / wall:>9.0f} {cpu / max(tokens, 1) * 1e6:>10.2f} "
+            f"{peak / max(rollouts, 1) / 1024:>11.1f}  window={summary.get('window', 0):.0f}"
+            f" avg_pq={summary.get('avg_pq', 0.0):.3f} faults={faults}"
+        )
+    print(f"replay: {replay.stats}")
+    sampler.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="JSON-lines file written by RecordingTransport")
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--prompts", type=int, default=64)
+    parser.add_argument("--n", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=256, help="synthetic completion length")
+    parser.add_argument("--top-logprobs", type=int, default=0)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--inter-token", type=float, default=0.002)
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--controller", choices=["fixed", "adaptive", "token"], default="adaptive")
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=128)
+    parser.add_argument("--queue-per-request", type=float, default=0.01)
+    parser.add_argument("--server-side-n", action="store_true")
+    parser.add_argument("--compact", action="store_true", help="compact_completions=True")
+    parser.add_argument("--decoder", choices=["json", "lean"], default="json")
+    parser.add_argument("--fault-429", type=float, default=0.0)
+    parser.add_argument("--fault-503", type=float, default=0.0)
+    parser.add_argument("--fault-truncate", type=float, default=0.0)
+    parser.add_argument("--retry-backoff", type=float, default=0.05)
+    parser.add_argument("--memory", action="store_true", help="trace memory (slows the run)")
+    asyncio.run(_run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,108 @@
+"""Microbenchmark: SSE chunk decoders used by ``DeploymentSampler``.
+
+Compares stdlib ``json.loads``, the default ``"json"`` decoder (orjson when
+installed) and the ``"lean"`` decoder on recorded completion streams, timing
+both the decode and the accumulation of per-token logprob entries.
+
+Usage::
+
+    python -m fireworks.training.sdk.tests.benchmarks.bench_sse_decoding [stream.sse ...]
+
+Each file is a raw ``text/event-stream`` response body.  Without files a
+synthetic logprob-heavy stream (``--tokens`` tokens, ``--top-logprobs``
+alternatives per token) is generated.
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import argparse
+from typing import Any, Callable
+from pathlib import Path
+
+from fireworks.training.sdk._sse import _SSEDecoder, _decode_chunk, _decode_chunk_lean
+
+
+def synthetic_stream(tokens: int, top_logprobs: int) -> bytes:
+    """A completions SSE body with one token (and its logprobs) per event."""
+    events = []
+    for i in range(tokens):
+        entry = {
+            "token": f" tok{i}",
+            "logprob": -0.125,
+            "sampling_logprob": -0.25,
+            "bytes": [32, 116, 111, 107],
+            "top_logprobs": [{"token": f" alt{k}", "logprob": -1.5 - k, "bytes": [97]} for k in range(top_logprobs)],
+        }
+        choice: dict[str, Any] = {"index": 0, "text": f" tok{i}", "token_ids": [1000 + i], "logprobs": {"content": [entry]}}
+        if i == tokens - 1:
+            choice["finish_reason"] = "length"
+            choice["raw_output"] = {"completion_token_ids": list(range(1000, 1000 + tokens))}
+        events.append(json.dumps({"id": "cmpl-1", "object": "text_completion", "choices": [choice]}))
+    events.append(json.dumps({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": tokens}}))
+    return b"".join(f"data: {e}\n\n".encode() for e in events) + b"data: [DONE]\n\n"
+
+
+def stream_payloads(body: bytes) -> list[str]:
+    """SSE ``data`` payloads of a recorded body, without the ``[DONE]`` sentinel."""
+    decoder = _SSEDecoder()
+    payloads = []
+    for raw_line in body.splitlines() + [b""]:
+        event = decoder._decode_line(raw_line.decode("utf-8"))
+        if event is not None and not event.data.startswith("[DONE]"):
+            payloads.append(event.data)
+    return payloads
+
+
+def _consume(payloads: list[str], decode: Callable[[str], Any]) -> int:
+    logprobs: list[dict[str, Any]] = []
+    for data in payloads:
+        chunk = decode(data)
+        for choice in chunk.get("choices", []):
+            lp = choice.get("logprobs")
+            if lp:
+                logprobs.extend(lp.get("content") or [])
+    return len(logprobs)
+
+
+def run(streams: list[list[str]], repeat: int) -> dict[str, float]:
+    """Best-of-``repeat`` microseconds per event for each decoder."""
+    decoders: dict[str, Callable[[str], Any]] = {
+        "stdlib json": json.loads,
+        "json (default)": _decode_chunk,
+        "lean": _decode_chunk_lean,
+    }
+    events = sum(len(p) for p in streams)
+    results: dict[str, float] = {}
+    for name, decode in decoders.items():
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for payloads in streams:
+                _consume(payloads, decode)
+            best = min(best, time.perf_counter() - t0)
+        results[name] = best / max(events, 1) * 1e6
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("streams", nargs="*", type=Path, help="recorded SSE response bodies")
+    parser.add_argument("--tokens", type=int, default=2048)
+    parser.add_argument("--top-logprobs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    bodies = [p.read_bytes() for p in args.streams] or [synthetic_stream(args.tokens, args.top_logprobs)]
+    streams = [stream_payloads(body) for body in bodies]
+    results = run(streams, args.repeat)
+    baseline = results["stdlib json"]
+    print(f"{sum(len(s) for s in streams)} events from {len(streams)} stream(s)")
+    for name, us in results.items():
+        print(f"  {name:<16} {us:8.2f} us/event  {baseline / us:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+"""Tests for the array-backed CompactSequence and compact SampledCompletions."""
+
+from __future__ import annotations
+
+import asyncio
+from array import array
+
+import pytest
+
+from fireworks.training.sdk.compact import CompactSequence
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+
+
+class TestCompactSequence:
+    def test_list_compatible_reads(self):
+        seq = CompactSequence.tokens([4, 5, 6], prompt=array("i", [1, 2, 3]))
+
+        assert len(seq) == 6
+        assert seq == [1, 2, 3, 4, 5, 6]
+        assert seq[0] == 1 and seq[3] == 4 and seq[-1] == 6
+        assert seq[3:] == [4, 5, 6] and isinstance(seq[3:], list)
+        assert seq[1:5] == [2, 3, 4, 5]
+        assert seq[::2] == [1, 3, 5]
+        assert seq[5:2] == []
+        assert list(seq) == seq.tolist() == [1, 2, 3, 4, 5, 6]
+        assert [0] + seq == [0, 1, 2, 3, 4, 5, 6]
+        assert seq + [7] == [1, 2, 3, 4, 5, 6, 7]
+        with pytest.raises(IndexError):
+            seq[6]
+
+    def test_prompt_buffer_is_shared(self):
+        prompt = array("i", [1, 2, 3])
+        a = CompactSequence.tokens([4], prompt)
+        b = CompactSequence.tokens([5, 6], prompt)
+
+        assert a._head is b._head is prompt
+        assert a.nbytes == 4 and b.nbytes == 8
+
+    def test_floats_are_float32(self):
+        seq = CompactSequence.floats([-0.1, -2.5])
+
+        assert seq.typecode == "f"
+        assert seq[1] == -2.5
+        assert seq[0] == pytest.approx(-0.1, rel=1e-6) and seq[0] != -0.1
+
+    def test_unhashable(self):
+        with pytest.raises(TypeError):
+            hash(CompactSequence.floats([1.0]))
+
+    def test_numpy(self):
+        np = pytest.importorskip("numpy")
+        seq = CompactSequence.tokens([4, 5], prompt=array("i", [1, 2, 3]))
+
+        out = seq.numpy()
+
+        assert out.dtype == np.int32 and out.tolist() == [1, 2, 3, 4, 5]
+        assert CompactSequence.floats([0.5]).numpy().dtype == np.float32
+
+
+class TestCompactSampler:
+    def _sampler(self, **kwargs) -> DeploymentSampler:
+        sampler = DeploymentSampler(
+            inference_url="https://api.example.com", model="m", api_key="k", tokenizer=None, **kwargs
+        )
+
+        async def _fake(*_args, n=1, **_kwargs):
+            choices = [
+                {
+                    "index": i,
+                    "text": "ok",
+                    "finish_reason": "stop",
+                    "raw_output": {"completion_token_ids": [10 + i, 20]},
+                    "logprobs": {
+                        "content": [
+                            {"logprob": -0.5, "sampling_logprob": -0.25},
+                            {"logprob": -1.0, "sampling_logprob": -0.75},
+                        ]
+                    },
+                }
+                for i in range(n)
+            ]
+            return {"choices": choices}, ServerMetrics()
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        return sampler
+
+    @pytest.mark.parametrize("server_side_n", [False, True])
+    def test_completions_share_prompt_buffer(self, server_side_n):
+        sampler = self._sampler(compact_completions=True, server_side_n=server_side_n)
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1, 2, 3], n=3, logprobs=True))
+
+        assert len(completions) == 3
+        heads = {id(c.full_tokens._head) for c in completions}  # type: ignore[attr-defined]
+        assert len(heads) == 1
+        first = completions[0]
+        assert first.full_tokens[first.prompt_len :] in ([10, 20], [11, 20], [12, 20])
+        assert first.sampling_logprobs == [-0.25, -0.75]
+        assert isinstance(first.inference_logprobs, CompactSequence)
+        sampler.close()
+
+    def test_default_returns_lists(self):
+        sampler = self._sampler()
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1, 2, 3], n=1, logprobs=True))
+
+        assert type(completions[0].full_tokens) is list
+        assert completions[0].full_tokens == [1, 2, 3, 10, 20]
+        sampler.close()
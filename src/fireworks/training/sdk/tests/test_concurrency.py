@@ -0,0 +1,336 @@
+"""Tests for the token-budget and other non-default concurrency controllers."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+from fireworks.training.sdk.concurrency import (
+    AdmissionClass,
+    AdmissionQueue,
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    GradientConcurrencyController,
+    SamplingConcurrencyController,
+    TokenAwareConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+
+
+class TestTokenBudgetConcurrencyController:
+    def test_implements_interfaces(self):
+        ctrl = TokenBudgetConcurrencyController()
+        assert isinstance(ctrl, SamplingConcurrencyController)
+        assert isinstance(ctrl, TokenAwareConcurrencyController)
+
+    def test_admits_by_tokens_not_requests(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=10_000, min_budget=1_000)
+
+        async def _run():
+            for _ in range(5):
+                await ctrl.acquire_tokens(2_000)
+            assert ctrl.in_flight_tokens == 10_000
+            blocked = asyncio.ensure_future(ctrl.acquire_tokens(200))
+            await asyncio.sleep(0)
+            assert not blocked.done()
+            ctrl.release_tokens(2_000)
+            await asyncio.sleep(0)
+            assert blocked.done()
+            assert ctrl.in_flight_tokens == 8_200
+
+        asyncio.run(_run())
+
+    def test_oversized_request_runs_alone(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=1_000, min_budget=1_000)
+
+        async def _run():
+            await ctrl.acquire_tokens(50_000)
+            second = asyncio.ensure_future(ctrl.acquire_tokens(10))
+            await asyncio.sleep(0)
+            assert not second.done()
+            ctrl.release_tokens(50_000)
+            await second
+
+        asyncio.run(_run())
+
+    def test_fifo_admission_does_not_starve_large_requests(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=10_000, min_budget=1_000)
+        order: list[str] = []
+
+        async def _take(name: str, cost: int):
+            await ctrl.acquire_tokens(cost)
+            order.append(name)
+
+        async def _run():
+            await ctrl.acquire_tokens(6_000)
+            large = asyncio.ensure_future(_take("large", 8_000))
+            small = asyncio.ensure_future(_take("small", 1_000))
+            await asyncio.sleep(0)
+            # "small" would fit, but waits behind "large".
+            assert order == []
+            ctrl.release_tokens(6_000)
+            await asyncio.gather(large, small)
+
+        asyncio.run(_run())
+        assert order == ["large", "small"]
+
+    def test_cancelled_waiter_is_skipped(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=1_000, min_budget=1_000)
+
+        async def _run():
+            await ctrl.acquire_tokens(1_000)
+            waiter = asyncio.ensure_future(ctrl.acquire_tokens(900))
+            behind = asyncio.ensure_future(ctrl.acquire_tokens(100))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            ctrl.release_tokens(1_000)
+            await behind
+            assert ctrl.in_flight_tokens == 100
+
+        asyncio.run(_run())
+
+    def test_budget_shrinks_on_generation_queue_pressure(self):
+        ctrl = TokenBudgetConcurrencyController(
+            initial_budget=100_000, ema_alpha=1.0, adjustment_interval=0, generation_queue_target=1.0
+        )
+        ctrl.release_tokens(0, ServerMetrics(prefill_queue_duration=0.1, generation_queue_duration=3.0))
+
+        summary = ctrl.step_completed()
+
+        assert summary["budget"] == 100_000
+        assert summary["budget_after"] == 50_000
+        assert summary["avg_gq"] == 3.0
+
+    def test_budget_grows_with_headroom(self):
+        ctrl = TokenBudgetConcurrencyController(
+            initial_budget=100_000, ema_alpha=1.0, adjustment_interval=2, additive_increase=1_000
+        )
+        for _ in range(2):
+            ctrl.release_tokens(0, ServerMetrics(prefill_queue_duration=0.05))
+        # Pressure 0.1 -> headroom capped at 4x additive increase.
+        assert ctrl.budget == 104_000
+
+    def test_window_size_reflects_average_cost(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=64_000, default_request_cost=1_000)
+        assert ctrl.window_size == 64
+
+    def test_sampler_charges_prompt_plus_max_tokens(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=100_000)
+        charged: list[int] = []
+        acquire = ctrl.acquire_tokens
+
+        async def _spy(cost: int) -> None:
+            charged.append(cost)
+            await acquire(cost)
+
+        ctrl.acquire_tokens = _spy  # type: ignore[method-assign]
+        sampler = DeploymentSampler(
+            inference_url="https://api.example.com",
+            model="m",
+            api_key="k",
+            tokenizer=None,
+            concurrency_controller=ctrl,
+            server_side_n=True,
+        )
+
+        async def _fake(*_args, n=1, **_kwargs):
+            choices = [{"index": i, "raw_output": {"completion_token_ids": [5]}} for i in range(n)]
+            return {"choices": choices}, ServerMetrics()
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        asyncio.run(sampler.sample_with_prompt_tokens([1] * 100, n=4, max_tokens=50))
+
+        assert charged == [600]
+        assert ctrl.in_flight_tokens == 0
+        sampler.close()
+
+
+class TestGradientConcurrencyController:
+    @staticmethod
+    def _fill(ctrl: GradientConcurrencyController, ttft: float, requests: int) -> None:
+        async def _run():
+            for _ in range(requests):
+                held = ctrl.window_size
+                for _ in range(held):
+                    await ctrl.acquire()
+                for _ in range(held):
+                    ctrl.release(ServerMetrics(server_ttft=ttft))
+
+        asyncio.run(_run())
+
+    def test_grows_while_latency_stays_at_baseline(self):
+        ctrl = GradientConcurrencyController(initial_window=16, adjustment_interval=16, smoothing=1.0)
+        self._fill(ctrl, 0.1, 4)
+        assert ctrl.window_size > 16
+        assert ctrl.gradient == 1.0
+
+    def test_shrinks_in_proportion_to_latency_inflation(self):
+        ctrl = GradientConcurrencyController(
+            initial_window=64, adjustment_interval=16, smoothing=1.0, long_window=1_000
+        )
+        self._fill(ctrl, 0.1, 1)
+        grown = ctrl.window_size
+        # 2.25x baseline with tolerance 1.5 -> gradient 2/3, not a halving.
+        ctrl.release(ServerMetrics(server_ttft=0.225))
+        summary = ctrl.step_completed()
+
+        assert summary["gradient"] == pytest.approx(1.5 * ctrl.long_latency / 0.225)
+        assert 0.5 * grown < summary["window_after"] < grown
+
+    def test_shrink_holds_back_new_requests(self):
+        ctrl = GradientConcurrencyController(initial_window=64, adjustment_interval=0, smoothing=1.0)
+
+        async def _run():
+            for _ in range(64):
+                await ctrl.acquire()
+            ctrl._update_window(0.1)
+            ctrl._update_window(1.0)  # gradient floored at 0.5
+            assert ctrl.window_size < 64
+            ctrl.release()
+            blocked = asyncio.ensure_future(ctrl.acquire())
+            await asyncio.sleep(0)
+            assert not blocked.done()
+            for _ in range(63):
+                ctrl.release()
+            await blocked
+
+        asyncio.run(_run())
+
+    def test_does_not_grow_when_underused(self):
+        ctrl = GradientConcurrencyController(initial_window=32, adjustment_interval=4, smoothing=1.0)
+
+        async def _run():
+            for _ in range(8):
+                await ctrl.acquire()
+                ctrl.release(ServerMetrics(server_ttft=0.1))
+
+        asyncio.run(_run())
+        assert ctrl.window_size == 32
+
+    def test_latency_metric_fallback(self):
+        ctrl = GradientConcurrencyController(latency_metrics=("server_processing_time", "client_ttft"))
+        ctrl.release(ServerMetrics(client_ttft=0.3))
+        assert ctrl.step_completed()["avg_latency"] == 0.3
+
+    def test_rejects_tolerance_below_one(self):
+        with pytest.raises(ValueError):
+            GradientConcurrencyController(tolerance=0.9)
+
+
+class TestAdmissionQueue:
+    @staticmethod
+    async def _drain(queue: AdmissionQueue, jobs: list[tuple[str, int]], order: list[str]) -> None:
+        async def _take(name: str, cost: int):
+            await queue.acquire(cost, name)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(_take(name, cost)) for name, cost in jobs]
+        await asyncio.sleep(0)
+        # Hand the held slot back one admission at a time.
+        while not all(t.done() for t in tasks):
+            name = order[-1] if order else "holder"
+            cost = dict(jobs).get(name, 1)
+            queue.release(cost, name)
+            await asyncio.sleep(0)
+
+    def test_strict_priority_overtakes_queued_requests(self):
+        queue = AdmissionQueue(1, [AdmissionClass("train"), AdmissionClass("eval", priority=1)])
+        order: list[str] = []
+
+        async def _run():
+            await queue.acquire(1, "holder")
+            await self._drain(queue, [("train", 1)] * 3 + [("eval", 1)] * 2, order)
+
+        asyncio.run(_run())
+        assert order == ["eval", "eval", "train", "train", "train"]
+
+    def test_weighted_fair_share_within_a_priority(self):
+        queue = AdmissionQueue(1, [AdmissionClass("a", weight=3.0), AdmissionClass("b", weight=1.0)])
+        order: list[str] = []
+
+        async def _run():
+            await queue.acquire(1, "holder")
+            await self._drain(queue, [("a", 1)] * 6 + [("b", 1)] * 6, order)
+
+        asyncio.run(_run())
+        # While both are backlogged "a" gets three slots for each of "b".
+        assert order[:8].count("a") == 6
+        assert order[:8].count("b") == 2
+
+    def test_class_limit_lets_other_classes_through(self):
+        queue = AdmissionQueue(4, [AdmissionClass("eval", priority=1, max_in_flight=1)])
+
+        async def _run():
+            await queue.acquire(1, "eval")
+            blocked = asyncio.ensure_future(queue.acquire(1, "eval"))
+            await queue.acquire(1, "train")
+            await asyncio.sleep(0)
+            assert not blocked.done()
+            assert queue.queued("eval") == 1
+            queue.release(1, "eval")
+            await blocked
+
+        asyncio.run(_run())
+
+    def test_wait_stats_reported_per_class(self):
+        ctrl = FixedConcurrencyController(1, admission_classes=[AdmissionClass("eval", priority=1)])
+
+        async def _run():
+            await ctrl.acquire(priority="train")
+            waiter = asyncio.ensure_future(ctrl.acquire(priority="eval"))
+            await asyncio.sleep(0.02)
+            ctrl.release(priority="train")
+            await waiter
+
+        asyncio.run(_run())
+        summary = ctrl.step_completed()
+
+        assert summary["admitted/eval"] == 1.0
+        assert summary["admitted/train"] == 1.0
+        assert summary["queue_wait_max/eval"] >= 0.015
+        assert summary["queue_wait_avg/train"] < 0.015
+        # Counters reset once reported.
+        assert ctrl.step_completed() == {"window": 1.0}
+
+    def test_default_class_adds_no_stats(self):
+        ctrl = AdaptiveConcurrencyController(initial_window=2)
+
+        async def _run():
+            await ctrl.acquire()
+            ctrl.release()
+
+        asyncio.run(_run())
+        assert not any(key.startswith("queue_wait") for key in ctrl.step_completed())
+
+    def test_sampler_forwards_priority(self):
+        ctrl = TokenBudgetConcurrencyController(initial_budget=100_000)
+        seen: list[str | None] = []
+        acquire = ctrl.acquire_tokens
+
+        async def _spy(cost: int, priority: str | None = None) -> None:
+            seen.append(priority)
+            await acquire(cost, priority)
+
+        ctrl.acquire_tokens = _spy  # type: ignore[method-assign]
+        sampler = DeploymentSampler(
+            inference_url="https://api.example.com",
+            model="m",
+            api_key="k",
+            tokenizer=None,
+            concurrency_controller=ctrl,
+        )
+
+        async def _fake(*_args, **kwargs):
+            assert "priority" not in kwargs
+            return {"choices": [{"index": 0, "raw_output": {"completion_token_ids": [5]}}]}, ServerMetrics()
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        asyncio.run(sampler.sample_with_prompt_tokens([1, 2], n=2, max_tokens=8, priority="eval"))
+
+        assert seen == ["eval", "eval"]
+        assert ctrl.step_completed()["admitted/eval"] == 2.0
+        sampler.close()
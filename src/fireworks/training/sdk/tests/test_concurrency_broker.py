@@ -0,0 +1,204 @@
+"""Tests for the host-wide shared concurrency broker."""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+import pytest
+
+from fireworks.training.sdk.sampling import RequestTiming, ServerMetrics
+from fireworks.training.sdk.concurrency import (
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+from fireworks.training.sdk.concurrency_broker import (
+    ConcurrencyBroker,
+    SharedConcurrencyController,
+    _metrics_payload,
+    default_socket_path,
+)
+
+
+@pytest.fixture
+def socket_path():
+    # AF_UNIX paths are limited to ~100 bytes; pytest's tmp_path can exceed it.
+    directory = tempfile.mkdtemp(prefix="fwcb-")
+    yield os.path.join(directory, "broker.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def broker(socket_path):
+    broker = ConcurrencyBroker(socket_path, FixedConcurrencyController(2))
+    broker.start()
+    yield broker
+    broker.close()
+
+
+def _client(socket_path: str) -> SharedConcurrencyController:
+    return SharedConcurrencyController("m", socket_path=socket_path, spawn=False)
+
+
+class TestSharedConcurrencyController:
+    def test_clients_share_one_window(self, broker, socket_path):
+        a, b = _client(socket_path), _client(socket_path)
+
+        async def _run():
+            await a.acquire()
+            await a.acquire()
+            assert a.window_size == 2
+            blocked = asyncio.ensure_future(b.acquire())
+            await asyncio.sleep(0.05)
+            assert not blocked.done()
+            a.release()
+            await asyncio.wait_for(blocked, timeout=2.0)
+
+        asyncio.run(_run())
+
+    def test_dropped_client_returns_its_slots(self, broker, socket_path):
+        a, b = _client(socket_path), _client(socket_path)
+
+        async def _run():
+            await a.acquire()
+            await a.acquire()
+            waiter = asyncio.ensure_future(b.acquire())
+            await asyncio.sleep(0.05)
+            a._drop_connection()
+            await asyncio.wait_for(waiter, timeout=2.0)
+            # Late releases from the dropped connection are ignored.
+            a.release()
+            await asyncio.sleep(0.05)
+            assert broker.controller._semaphore._value == 1
+
+        asyncio.run(_run())
+
+    def test_cancelled_acquire_does_not_leak(self, broker, socket_path):
+        a = _client(socket_path)
+
+        async def _run():
+            await a.acquire()
+            await a.acquire()
+            waiter = asyncio.ensure_future(a.acquire())
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            a.release()
+            await asyncio.wait_for(a.acquire(), timeout=2.0)
+
+        asyncio.run(_run())
+
+    def test_metrics_reach_the_shared_controller(self, socket_path):
+        broker = ConcurrencyBroker(socket_path, AdaptiveConcurrencyController(initial_window=4))
+        broker.start()
+        try:
+            a, b = _client(socket_path), _client(socket_path)
+
+            async def _run():
+                for client in (a, b):
+                    await client.acquire()
+                    client.release(ServerMetrics(prefill_queue_duration=0.1, prompt_tokens=10))
+                await asyncio.sleep(0.05)
+
+            asyncio.run(_run())
+            summary = a.step_completed()
+        finally:
+            broker.close()
+
+        assert summary["requests"] == 2.0
+        assert summary["avg_pq"] == pytest.approx(0.1)
+
+    def test_step_on_the_loop_does_not_block(self, socket_path):
+        broker = ConcurrencyBroker(socket_path, AdaptiveConcurrencyController(initial_window=4))
+        broker.start()
+        try:
+            a = _client(socket_path)
+
+            async def _run():
+                await a.acquire()
+                a.release(ServerMetrics(prefill_queue_duration=0.1, prompt_tokens=10))
+                first = a.step_completed()
+                assert first == {"window": 4.0}
+                await asyncio.sleep(0.05)
+                return a.step_completed()
+
+            summary = asyncio.run(_run())
+        finally:
+            broker.close()
+
+        assert summary["requests"] == 1.0
+        assert summary["shared_clients"] == 1.0
+
+    def test_client_timing_stays_local(self):
+        metrics = ServerMetrics(prompt_tokens=10, client_timing=RequestTiming(first_byte=0.2))
+        assert _metrics_payload(metrics) == {"prompt_tokens": 10}
+
+    def test_token_costs_are_forwarded(self, socket_path):
+        controller = TokenBudgetConcurrencyController(initial_budget=10_000, min_budget=1_000)
+        broker = ConcurrencyBroker(socket_path, controller)
+        broker.start()
+        try:
+            a = _client(socket_path)
+
+            async def _run():
+                await a.acquire_tokens(6_000, priority="eval")
+                await asyncio.sleep(0.05)
+                assert controller.in_flight_tokens == 6_000
+                a.release_tokens(6_000, priority="eval")
+                await asyncio.sleep(0.05)
+
+            asyncio.run(_run())
+        finally:
+            broker.close()
+
+        assert controller.in_flight_tokens == 0
+
+    def test_spawns_broker_on_demand(self, socket_path):
+        client = SharedConcurrencyController(
+            "m", socket_path=socket_path, controller="fixed", controller_options={"max_concurrency": 3}, idle_timeout=1
+        )
+
+        async def _run():
+            await client.acquire()
+            client.release()
+
+        asyncio.run(_run())
+        assert client.window_size == 3
+        client._drop_connection()
+        deadline = time.monotonic() + 10
+        while os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert not os.path.exists(socket_path)
+
+    def test_socket_path_is_per_model(self):
+        assert default_socket_path("a") != default_socket_path("b")
+        with pytest.raises(ValueError):
+            SharedConcurrencyController("m", controller="nope")
+
+    def test_socket_path_without_getuid(self, monkeypatch):
+        monkeypatch.delattr(os, "getuid")
+        monkeypatch.setattr("getpass.getuser", lambda: "alice")
+        assert "fireworks-concurrency-alice-" in default_socket_path("m")
+
+    def test_package_imports_without_fcntl(self):
+        code = "import sys; sys.modules['fcntl'] = None; import fireworks.training.sdk"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+    def test_max_window_follows_controller_options(self, socket_path):
+        fixed = SharedConcurrencyController(
+            "m", socket_path=socket_path, controller="fixed", controller_options={"max_concurrency": 12}
+        )
+        adaptive = SharedConcurrencyController("m", socket_path=socket_path, controller_options={"max_window": 40})
+        missing = SharedConcurrencyController("m", socket_path=socket_path, controller="fixed")
+
+        assert fixed.max_window == 12
+        assert adaptive.max_window == 40
+        assert missing.max_window is None
@@ -1981,19 +1981,10 @@ class TestStreamingCompletions:
             f"data: [DONE]\n\n"
         ).encode()
 
-        async def mock_post(*args, **kwargs):
-            resp = MagicMock()
-            resp.status_code = 200
-            resp.raise_for_status = MagicMock()
-            resp.headers = {}
+        def handler(request):
+            return httpx.Response(200, content=raw_bytes)
 
-            async def aiter_bytes():
-                yield raw_bytes
-            resp.aiter_bytes = aiter_bytes
-            return resp
-
-        sampler._get_async_client = MagicMock()
-        sampler._get_async_client.return_value.post = mock_post
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
 
         results = asyncio.run(sampler.sample_with_tokens(
             messages=[{"role": "user", "content": "hi"}],
@@ -2139,14 +2130,14 @@ class TestSamplerTimeoutDiagnostics:
             model="accounts/test-account/deployments/test-deployment",
             concurrency_controller=FixedConcurrencyController(16),
         )
-        sampler._recent_metrics = [
+        sampler._metrics_window.add(
             ServerMetrics(
                 prefill_queue_duration=590.0,
                 generation_queue_duration=591.0,
                 client_ttft=599.0,
                 num_concurrent_requests=16,
             )
-        ]
+        )
         attempts = {"n": 0}
 
         async def _fake(*args, **kwargs):
@@ -0,0 +1,133 @@
+"""Tests for the DeploymentSampler record/replay harness."""
+
+from __future__ import annotations
+
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from fireworks.training.sdk.replay import (
+    ReplayFaults,
+    ReplayTransport,
+    RecordedExchange,
+    RecordingTransport,
+    load_exchanges,
+    save_exchanges,
+    attach_transport,
+)
+from fireworks.training.sdk.sampling import DeploymentSampler
+
+_BODY = (
+    b'data: {"choices":[{"index":0,"text":"a","token_ids":[7]}]}\n\n'
+    b'data: {"choices":[{"index":0,"text":"b","finish_reason":"stop",'
+    b'"raw_output":{"completion_token_ids":[7,8]}}]}\n\n'
+    b"data: [DONE]\n\n"
+)
+
+
+def _make_sampler(**kwargs) -> DeploymentSampler:
+    sampler = DeploymentSampler(inference_url="https://api.example.com", model="m", api_key="k", tokenizer=None, **kwargs)
+    sampler._RETRY_BASE_BACKOFF_S = 0.0  # type: ignore[misc]
+    return sampler
+
+
+def _record(tmp_path) -> tuple[RecordingTransport, list[RecordedExchange]]:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"prompt-tokens": "3"}, content=_BODY)
+
+    path = tmp_path / "rec.jsonl"
+    recorder = RecordingTransport(httpx.MockTransport(_handler), path)
+    sampler = _make_sampler()
+    attach_transport(sampler, recorder)
+    completions = asyncio.run(sampler.sample_with_prompt_tokens([1, 2, 3], n=2, max_tokens=4))
+    assert [c.full_tokens for c in completions] == [[1, 2, 3, 7, 8]] * 2
+    sampler.close()
+    return recorder, load_exchanges(path)
+
+
+class TestRecording:
+    def test_records_body_headers_and_payload_free_request(self, tmp_path):
+        recorder, loaded = _record(tmp_path)
+
+        assert len(recorder.exchanges) == len(loaded) == 2
+        exchange = loaded[0]
+        assert exchange.status == 200
+        assert b"".join(chunk for _, chunk in exchange.chunks) == _BODY
+        assert ("prompt-tokens", "3") in exchange.headers
+        assert exchange.request == {"n": 1, "max_tokens": 4, "temperature": 1.0, "prompt_len": 3}
+
+    def test_json_round_trip(self, tmp_path):
+        exchange = RecordedExchange.synthetic(4, n=2, top_logprobs=2)
+        save_exchanges(tmp_path / "x.jsonl", [exchange])
+        assert load_exchanges(tmp_path / "x.jsonl") == [exchange]
+
+
+class TestReplay:
+    def test_replayed_rollouts_match_recording(self, tmp_path):
+        _, exchanges = _record(tmp_path)
+        sampler = _make_sampler()
+        attach_transport(sampler, ReplayTransport(exchanges, time_scale=0))
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1, 2, 3], n=3))
+
+        assert [c.full_tokens for c in completions] == [[1, 2, 3, 7, 8]] * 3
+        sampler.close()
+
+    def test_timing_is_replayed(self):
+        exchange = RecordedExchange.synthetic(5, ttft_s=0.1, inter_token_s=0.02)
+        sampler = _make_sampler()
+        attach_transport(sampler, ReplayTransport([exchange]))
+
+        t0 = time.perf_counter()
+        _, metrics = asyncio.run(sampler.async_completions_stream(prompt=[1], raw_output=True))
+        elapsed = time.perf_counter() - t0
+
+        assert metrics.client_ttft is not None and 0.08 <= metrics.client_ttft < 0.2
+        assert elapsed >= 0.18
+        sampler.close()
+
+    def test_server_side_n_uses_matching_recording(self):
+        replay = ReplayTransport(
+            [RecordedExchange.synthetic(3, n=1), RecordedExchange.synthetic(3, n=4)], time_scale=0
+        )
+        sampler = _make_sampler(server_side_n=True)
+        attach_transport(sampler, replay)
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=4))
+
+        assert len(completions) == 4 and replay.stats["requests"] == 1
+        sampler.close()
+
+    @pytest.mark.parametrize("fault", ["rate_429", "rate_503", "rate_truncate"])
+    def test_injected_faults_are_retried(self, fault):
+        replay = ReplayTransport(
+            [RecordedExchange.synthetic(3)], time_scale=0, faults=ReplayFaults(**{fault: 0.5}), seed=1
+        )
+        sampler = _make_sampler()
+        attach_transport(sampler, replay)
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=8))
+
+        assert len(completions) == 8
+        injected = replay.stats["faults_429"] + replay.stats["faults_503"] + replay.stats["truncations"]
+        assert injected > 0 and replay.stats["requests"] == 8 + injected
+        sampler.close()
+
+    def test_prefill_queue_header_tracks_load(self):
+        replay = ReplayTransport(
+            [RecordedExchange.synthetic(2, ttft_s=0.02)], prefill_queue_fn=lambda in_flight: in_flight * 0.5
+        )
+        sampler = _make_sampler()
+        attach_transport(sampler, replay)
+
+        asyncio.run(sampler.sample_with_prompt_tokens([1], n=4))
+
+        assert replay.stats["max_in_flight"] == 4
+        assert max(m.prefill_queue_duration or 0 for m in sampler.drain_metrics()) == 2.0
+        sampler.close()
+
+    def test_empty_recording_rejected(self):
+        with pytest.raises(ValueError):
+            ReplayTransport([])
@@ -0,0 +1,235 @@
+"""Tests for the sampler circuit breaker, hedged requests and retry budget."""
+
+from __future__ import annotations
+
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+from fireworks.training.sdk.resilience import HedgePolicy, RetryBudget, CircuitBreaker
+from fireworks.training.sdk.concurrency import FixedConcurrencyController
+from fireworks.training.sdk.sampling_observability import ERROR_KIND_RETRY_BUDGET, SamplingRequestError
+
+
+def _http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.example.com/inference/v1/completions")
+    return httpx.HTTPStatusError("err", request=request, response=httpx.Response(status, request=request))
+
+
+def _result(token: int) -> tuple[dict, ServerMetrics]:
+    return {"choices": [{"index": 0, "raw_output": {"completion_token_ids": [token]}}]}, ServerMetrics()
+
+
+def _make_sampler(**kwargs) -> DeploymentSampler:
+    sampler = DeploymentSampler(
+        inference_url="https://api.example.com",
+        model="m",
+        api_key="k",
+        concurrency_controller=FixedConcurrencyController(4),
+        **kwargs,
+    )
+    sampler._RETRY_BASE_BACKOFF_S = 0.0  # type: ignore[misc]
+    return sampler
+
+
+class TestCircuitBreaker:
+    def test_opens_on_error_rate_and_recovers_through_probes(self):
+        breaker = CircuitBreaker(failure_rate_threshold=0.5, min_requests=4, open_s=0.05, probes=2)
+        for ok in (True, False, True, False):
+            breaker.record(ok)
+        assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+
+        async def _run():
+            t0 = time.monotonic()
+            probes = [await breaker.admit(), await breaker.admit()]
+            assert time.monotonic() - t0 >= 0.04
+            assert probes == [True, True]
+            third = asyncio.ensure_future(breaker.admit())
+            await asyncio.sleep(0.01)
+            assert not third.done()  # only two probes at a time
+            breaker.record(True, probe=True)
+            breaker.record(True, probe=True)
+            assert await third is False
+
+        asyncio.run(_run())
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(min_requests=1, open_s=0.0)
+        breaker.record(False)
+
+        async def _run():
+            probe = await breaker.admit()
+            breaker.record(False, probe=probe)
+
+        asyncio.run(_run())
+        assert breaker.trips == 2
+
+    def test_below_min_requests_stays_closed(self):
+        breaker = CircuitBreaker(min_requests=10)
+        for _ in range(9):
+            breaker.record(False)
+        breaker.record(None)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.error_rate() == 1.0
+
+    def test_sampler_pauses_on_transient_errors_only(self):
+        breaker = CircuitBreaker(failure_rate_threshold=0.5, min_requests=3, open_s=0.05, probes=1)
+        sampler = _make_sampler(circuit_breaker=breaker)
+        calls = {"n": 0}
+
+        async def _fake(*_args, **_kwargs):
+            calls["n"] += 1
+            if calls["n"] <= 3:
+                raise _http_error(503)
+            return _result(5)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        assert [c.full_tokens for c in completions] == [[1, 5]]
+        assert breaker.trips == 1 and breaker.state == CircuitBreaker.CLOSED
+        assert sampler.metrics_summary()["circuit_breaker_trips"] == 1.0
+
+        async def _bad_request(*_args, **_kwargs):
+            raise _http_error(400)
+
+        sampler.async_completions_stream = _bad_request  # type: ignore[method-assign]
+        for _ in range(5):
+            with pytest.raises(httpx.HTTPStatusError):
+                asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+        assert breaker.trips == 1
+        sampler.close()
+
+
+class TestHedging:
+    def _seed(self, sampler: DeploymentSampler, latency: float, samples: int = 20) -> None:
+        assert sampler._hedge_latency is not None
+        for _ in range(samples):
+            sampler._hedge_latency.add(latency)
+
+    def test_slow_attempt_is_hedged_and_loser_cancelled(self):
+        sampler = _make_sampler(hedging=HedgePolicy(quantile=0.95, min_delay_s=0.01))
+        self._seed(sampler, 0.02)
+        calls: list[int] = []
+        cancelled: list[int] = []
+
+        async def _fake(*_args, **_kwargs):
+            call = len(calls)
+            calls.append(call)
+            try:
+                await asyncio.sleep(5.0 if call == 0 else 0.0)
+            except asyncio.CancelledError:
+                cancelled.append(call)
+                raise
+            return _result(10 + call)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        t0 = time.perf_counter()
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        assert time.perf_counter() - t0 < 1.0
+        assert [c.full_tokens for c in completions] == [[1, 11]]
+        assert cancelled == [0]
+        assert sampler.concurrency_controller._semaphore._value == 4  # type: ignore[union-attr]
+        summary = sampler.metrics_summary()
+        assert summary["hedges_issued"] == 1.0 and summary["hedge_wins"] == 1.0
+        sampler.close()
+
+    def test_no_hedge_before_enough_samples(self):
+        sampler = _make_sampler(hedging=HedgePolicy(min_delay_s=0.0, min_samples=20))
+        self._seed(sampler, 0.001, samples=5)
+
+        async def _fake(*_args, **_kwargs):
+            await asyncio.sleep(0.05)
+            return _result(1)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        assert sampler.metrics_summary()["hedges_issued"] == 0.0
+        sampler.close()
+
+    def test_hedge_survives_primary_failure(self):
+        sampler = _make_sampler(hedging=HedgePolicy(min_delay_s=0.01))
+        self._seed(sampler, 0.01)
+        calls: list[int] = []
+
+        async def _fake(*_args, **_kwargs):
+            call = len(calls)
+            calls.append(call)
+            if call == 0:
+                await asyncio.sleep(0.05)
+                raise _http_error(503)
+            await asyncio.sleep(0.1)
+            return _result(7)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        assert [c.full_tokens for c in completions] == [[1, 7]]
+        assert len(calls) == 2  # the hedge won; no retry was needed
+        sampler.close()
+
+
+class TestRetryBudget:
+    def test_caps_retries_to_ratio_of_successes(self):
+        budget = RetryBudget(retry_ratio=0.5, min_retries_per_s=0.0, max_tokens=2.0)
+        assert budget.try_withdraw() and budget.try_withdraw()
+        assert not budget.try_withdraw()
+        for _ in range(4):
+            budget.deposit()
+
+        assert budget.balance == pytest.approx(2.0)
+        stats = budget.drain_stats()
+        assert stats == {"retry_budget_balance": 2.0, "retries": 2.0, "retries_denied": 1.0, "successes": 4.0}
+        assert budget.drain_stats()["retries"] == 0.0
+
+    def test_refills_over_time(self):
+        budget = RetryBudget(retry_ratio=0.0, min_retries_per_s=100.0, max_tokens=1.0)
+        assert budget.try_withdraw()
+        time.sleep(0.02)
+        assert budget.try_withdraw()
+
+    def test_sampler_fails_fast_when_exhausted(self):
+        budget = RetryBudget(retry_ratio=0.0, min_retries_per_s=0.0, max_tokens=1.0)
+        sampler = _make_sampler(retry_budget=budget)
+        calls = {"n": 0}
+
+        async def _fake(*_args, **_kwargs):
+            calls["n"] += 1
+            raise _http_error(503)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        with pytest.raises(SamplingRequestError) as exc_info:
+            asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        assert calls["n"] == 2  # the first attempt plus one budgeted retry
+        assert exc_info.value.final_error_kind == ERROR_KIND_RETRY_BUDGET
+        assert exc_info.value.final_status == 503
+        assert sampler.drain_retry_metrics()["retries_denied"] == 1.0
+        sampler.close()
+
+    def test_successes_refill_the_budget(self):
+        budget = RetryBudget(retry_ratio=1.0, min_retries_per_s=0.0, max_tokens=1.0)
+        sampler = _make_sampler(retry_budget=budget)
+        calls = {"n": 0}
+
+        async def _fake(*_args, **_kwargs):
+            calls["n"] += 1
+            if calls["n"] % 2:
+                raise _http_error(503)
+            return _result(3)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        for _ in range(3):
+            completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+            assert [c.full_tokens for c in completions] == [[1, 3]]
+
+        stats = sampler.drain_retry_metrics()
+        assert stats["retries"] == 3.0 and stats["successes"] == 3.0
+        assert sampler.metrics_summary()["retry_budget_balance"] == pytest.approx(1.0)
+        sampler.close()
@@ -8,6 +8,8 @@ recorded attempt or exception.
 
 from __future__ import annotations
 
+import ssl
+import json
 import uuid
 import asyncio
 
@@ -20,6 +22,12 @@ from fireworks.training.sdk.sampling import (
     SamplingRequestError,
     DeploymentSamplerTimeoutError,
 )
+from fireworks.training.sdk.concurrency import (
+    FixedConcurrencyController,
+    AdaptiveConcurrencyController,
+    TokenBudgetConcurrencyController,
+)
+from fireworks.training.sdk._rest_client import _POOL_HEADROOM
 
 # NOTE: conftest.py's autouse fixture disables errors.py layer-1 backoff
 # (_backoff_delay -> None) for every module except test_errors. The sampler's
@@ -295,3 +303,420 @@ class TestTransportLevel:
         # errors.py opt-out means the transport is hit exactly once per stream call.
         assert posts["n"] == 1
         sampler.close()
+
+    def test_incremental_stream_measures_first_token_not_last_byte(self):
+        class _SlowTail(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b'data: {"choices":[{"text":"hi"}]}\n\n'
+                await asyncio.sleep(0.2)
+                yield (
+                    b'data: {"choices":[{"text":"!","finish_reason":"stop",'
+                    b'"raw_output":{"completion_token_ids":[40,50]}}]}\n\ndata: [DONE]\n\n'
+                )
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, stream=_SlowTail())
+
+        sampler = _make_sampler()
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        result, metrics = asyncio.run(sampler.async_completions_stream(prompt=[1, 2, 3], raw_output=True))
+        assert result["choices"][0]["text"] == "hi!"
+        assert metrics.client_ttft is not None and metrics.client_ttft < 0.2
+        sampler.close()
+
+    def test_buffered_opt_out_still_decodes(self):
+        def _handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=_sse_success_bytes())
+
+        sampler = _make_sampler(incremental_stream=False)
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        result, _ = asyncio.run(sampler.async_completions_stream(prompt=[1, 2, 3], raw_output=True))
+        assert result["choices"][0]["raw_output"]["completion_token_ids"] == [40, 50]
+        sampler.close()
+
+    def test_streamed_error_body_is_readable(self):
+        def _handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(400, json={"error": {"message": "bad prompt"}})
+
+        sampler = _make_sampler()
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            asyncio.run(sampler.async_completions_stream(prompt=[1, 2, 3], raw_output=True))
+        assert "bad prompt" in excinfo.value.response.text
+        sampler.close()
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Yields scripted SSE chunks and records how far the client read."""
+
+    def __init__(self, chunks: list[bytes]) -> None:
+        self._chunks = chunks
+        self.yielded = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            self.yielded += 1
+            yield chunk
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def _token_chunk(text: str, token_ids: list[int], finish_reason: str | None = None) -> bytes:
+    choice: dict = {"index": 0, "text": text, "token_ids": token_ids}
+    if finish_reason:
+        choice["finish_reason"] = finish_reason
+        choice["raw_output"] = {"completion_token_ids": [10, 11, 12, 13]}
+    return f"data: {json.dumps({'choices': [choice]})}\n\n".encode("utf-8")
+
+
+class TestShouldAbort:
+    def _sampler_with_stream(self, stream: _TrackedStream, seen: dict | None = None, **kwargs):
+        def _handler(request: httpx.Request) -> httpx.Response:
+            if seen is not None:
+                seen.update(json.loads(request.content))
+            return httpx.Response(200, stream=stream)
+
+        controller = _CountingController()
+        sampler = _make_sampler(concurrency_controller=controller, **kwargs)
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        return sampler, controller
+
+    def test_abort_returns_partial_completion_and_closes_stream(self):
+        stream = _TrackedStream(
+            [
+                _token_chunk("a", [10]),
+                _token_chunk("b", [11]),
+                _token_chunk("c", [12]),
+                _token_chunk("d", [13], finish_reason="stop"),
+                b"data: [DONE]\n\n",
+            ]
+        )
+        seen: dict = {}
+        sampler, controller = self._sampler_with_stream(stream, seen)
+        calls: list[tuple[str, list[int]]] = []
+
+        def _should_abort(text: str, tokens: list[int]) -> bool:
+            calls.append((text, list(tokens)))
+            return len(tokens) >= 2
+
+        results = asyncio.run(sampler.sample_with_prompt_tokens([1, 2, 3], should_abort=_should_abort))
+
+        assert len(results) == 1
+        completion = results[0]
+        assert completion.finish_reason == "aborted"
+        assert completion.text == "ab"
+        assert completion.full_tokens == [1, 2, 3, 10, 11]
+        assert completion.completion_len == 2
+        assert calls == [("a", [10]), ("ab", [10, 11])]
+        assert seen["return_token_ids"] is True
+        assert "should_abort" not in seen
+        assert stream.yielded == 2 and stream.closed
+        assert controller.acquired == controller.released == 1
+        sampler.close()
+
+    def test_never_aborting_matches_normal_completion(self):
+        stream = _TrackedStream([_token_chunk("abcd", [10, 11, 12, 13], finish_reason="stop"), b"data: [DONE]\n\n"])
+        sampler, _ = self._sampler_with_stream(stream)
+
+        results = asyncio.run(sampler.sample_with_prompt_tokens([1], should_abort=lambda _t, _ids: False))
+
+        assert results[0].finish_reason == "stop"
+        assert results[0].full_tokens == [1, 10, 11, 12, 13]
+        sampler.close()
+
+    def test_echo_is_rejected(self):
+        sampler = _make_sampler()
+        with pytest.raises(ValueError, match="echo"):
+            asyncio.run(sampler.sample_with_prompt_tokens([1], echo=True, should_abort=lambda _t, _ids: True))
+        sampler.close()
+
+
+def _indexed_chunk(index: int, text: str, completion_ids: list[int] | None = None) -> str:
+    choice: dict = {"index": index, "text": text}
+    if completion_ids is not None:
+        choice["finish_reason"] = "stop"
+        choice["raw_output"] = {"completion_token_ids": completion_ids}
+    return f"data: {json.dumps({'choices': [choice]})}\n\n"
+
+
+class TestServerSideFanOut:
+    def _sampler(self, bodies: list[str], requests: list[dict], **kwargs):
+        def _handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            body = bodies[min(len(requests) - 1, len(bodies) - 1)]
+            return httpx.Response(200, content=body.encode("utf-8"))
+
+        controller = _CountingController()
+        sampler = _make_sampler(concurrency_controller=controller, **kwargs)
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        return sampler, controller
+
+    def test_single_request_demultiplexed_by_index(self):
+        body = (
+            _indexed_chunk(1, "b")
+            + _indexed_chunk(0, "a")
+            + _indexed_chunk(2, "c", [30])
+            + _indexed_chunk(0, "a", [10, 11])
+            + _indexed_chunk(1, "b", [20, 21, 22])
+            + "data: [DONE]\n\n"
+        )
+        requests: list[dict] = []
+        sampler, controller = self._sampler([body], requests)
+
+        results = asyncio.run(sampler.sample_with_prompt_tokens([1, 2], n=3, server_side_n=True))
+
+        assert len(requests) == 1 and requests[0]["n"] == 3
+        assert controller.acquired == 1
+        assert [c.text for c in results] == ["aa", "bb", "c"]
+        assert [c.full_tokens for c in results] == [[1, 2, 10, 11], [1, 2, 20, 21, 22], [1, 2, 30]]
+        sampler.close()
+
+    def test_default_fan_out_uses_independent_requests(self):
+        body = _indexed_chunk(0, "a", [10]) + "data: [DONE]\n\n"
+        requests: list[dict] = []
+        sampler, controller = self._sampler([body], requests)
+
+        results = asyncio.run(sampler.sample_with_prompt_tokens([1], n=3))
+
+        assert len(results) == 3
+        assert [r["n"] for r in requests] == [1, 1, 1]
+        assert controller.acquired == 3
+        sampler.close()
+
+    def test_truncation_retries_only_missing_choices(self, no_sleep, no_jitter):
+        truncated = _indexed_chunk(0, "a", [10]) + _indexed_chunk(1, "par") + _indexed_chunk(2, "c", [30])
+        retry = _indexed_chunk(0, "b", [20]) + "data: [DONE]\n\n"
+        requests: list[dict] = []
+        sampler, _ = self._sampler([truncated, retry], requests, server_side_n=True)
+
+        results = asyncio.run(sampler.sample_with_prompt_tokens([1], n=3))
+
+        assert [r["n"] for r in requests] == [3, 1]
+        assert sorted(c.full_tokens[1] for c in results) == [10, 20, 30]
+        sampler.close()
+
+    def test_truncation_after_abort_retries_unfinished_choices(self, no_sleep, no_jitter):
+        aborted = {"index": 0, "text": "stop", "token_ids": [10]}
+        truncated = f"data: {json.dumps({'choices': [aborted]})}\n\n" + _indexed_chunk(1, "par")
+        retry = _indexed_chunk(0, "b", [20]) + "data: [DONE]\n\n"
+        requests: list[dict] = []
+        sampler, _ = self._sampler([truncated, retry], requests, server_side_n=True)
+
+        results = asyncio.run(
+            sampler.sample_with_prompt_tokens([1], n=2, should_abort=lambda text, _ids: text == "stop")
+        )
+
+        assert [r["n"] for r in requests] == [2, 1]
+        assert sorted((c.finish_reason, c.full_tokens) for c in results) == [("aborted", [1, 10]), ("stop", [1, 20])]
+        sampler.close()
+
+
+def _logprob_chunk(text: str, token_id: int, finish: bool = False) -> str:
+    choice: dict = {
+        "index": 0,
+        "text": text,
+        "logprobs": {
+            "content": [
+                {
+                    "token": text,
+                    "logprob": -0.5,
+                    "sampling_logprob": -0.25,
+                    "bytes": [1],
+                    "top_logprobs": [{"token": "x", "logprob": -2.0}],
+                }
+            ]
+        },
+    }
+    if finish:
+        choice["finish_reason"] = "stop"
+        choice["raw_output"] = {"completion_token_ids": [token_id]}
+    return f"data: {json.dumps({'choices': [choice]})}\n\n"
+
+
+class TestChunkDecoder:
+    def _sampler(self, **kwargs):
+        body = _logprob_chunk("a", 7) + _logprob_chunk("b", 8, finish=True) + "data: [DONE]\n\n"
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=body.encode("utf-8"))
+
+        sampler = _make_sampler(**kwargs)
+        sampler._async_client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        return sampler
+
+    def test_lean_decoder_keeps_only_sampler_fields(self):
+        sampler = self._sampler(chunk_decoder="lean")
+        result, _ = asyncio.run(sampler.async_completions_stream(prompt=[1], raw_output=True))
+
+        content = result["choices"][0]["logprobs"]["content"]
+        assert content == [{"logprob": -0.5, "sampling_logprob": -0.25}] * 2
+        assert result["choices"][0]["text"] == "ab"
+        sampler.close()
+
+    @pytest.mark.parametrize("decoder", ["json", "lean"])
+    def test_decoders_produce_same_completions(self, decoder):
+        sampler = self._sampler(chunk_decoder=decoder)
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], logprobs=True))
+
+        assert completions[0].full_tokens == [1, 8]
+        assert completions[0].sampling_logprobs == [-0.25, -0.25]
+        assert completions[0].inference_logprobs == [-0.5, -0.5]
+        sampler.close()
+
+    def test_custom_decoder_and_unknown_name(self):
+        calls: list[str] = []
+
+        def _decode(data: str):
+            calls.append(data)
+            return json.loads(data)
+
+        sampler = self._sampler(chunk_decoder=_decode)
+        asyncio.run(sampler.async_completions_stream(prompt=[1], raw_output=True))
+        assert len(calls) == 2
+        sampler.close()
+
+        with pytest.raises(ValueError, match="chunk_decoder"):
+            _make_sampler(chunk_decoder="yaml")
+
+
+class _PoolWaitTransport(httpx.AsyncBaseTransport):
+    """Reports its first connection event after ``wait`` seconds, like a busy pool."""
+
+    def __init__(self, wait: float):
+        self._wait = wait
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self._wait)
+        trace = request.extensions.get("trace")
+        if trace is not None:
+            await trace("http11.send_request_headers.started", {"request": request})
+        return httpx.Response(200, content=_sse_success_bytes())
+
+
+class TestConnectionPool:
+    def test_pool_is_sized_from_controller_max_window(self):
+        fixed = _make_sampler(concurrency_controller=FixedConcurrencyController(300))
+        adaptive = _make_sampler(concurrency_controller=AdaptiveConcurrencyController(max_window=512))
+        explicit = _make_sampler(concurrency_controller=FixedConcurrencyController(300), connection_pool_size=8)
+        tokens = _make_sampler(
+            concurrency_controller=TokenBudgetConcurrencyController(max_budget=2048 * 4096, default_request_cost=4096)
+        )
+
+        assert fixed._async_client_options()[0].max_connections == 300 + _POOL_HEADROOM
+        assert adaptive._async_client_options()[0].max_keepalive_connections == 512 + _POOL_HEADROOM
+        assert explicit._async_client_options()[0].max_connections == 8 + _POOL_HEADROOM
+        # A token budget bounds requests at max_budget / default_request_cost.
+        assert tokens._async_client_options()[0].max_connections == 2048 + _POOL_HEADROOM
+        for sampler in (fixed, adaptive, explicit, tokens):
+            sampler.close()
+
+    def test_proxy_mounts_keep_client_settings(self, monkeypatch):
+        monkeypatch.setenv("HTTPS_PROXY", "http://proxy.example.com:8080")
+        # An IP-address endpoint turns certificate verification off.
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(4), inference_url="https://10.0.0.1")
+        client = sampler._get_async_client()
+
+        mounts = [transport for transport in client._mounts.values() if transport is not None]
+        assert mounts
+        for transport in mounts:
+            pool = transport._pool  # type: ignore[attr-defined]
+            assert pool._ssl_context.verify_mode == ssl.CERT_NONE
+            assert pool._max_connections == 4 + _POOL_HEADROOM
+        sampler.close()
+
+    def test_http2_opt_in(self):
+        pytest.importorskip("h2")
+        sampler = _make_sampler(http2=True)
+        assert sampler._async_client_options()[1] is True
+        assert sampler._get_async_client() is not None
+        sampler.close()
+
+    def test_pool_wait_is_reported_separately(self):
+        sampler = _make_sampler()
+        sampler._async_client = httpx.AsyncClient(transport=_PoolWaitTransport(0.05))
+        _, metrics = asyncio.run(sampler.async_completions_stream(prompt=[1], raw_output=True))
+
+        assert metrics.client_pool_wait is not None and metrics.client_pool_wait >= 0.04
+        sampler._release_concurrency(metrics)
+        assert "client_pool_wait_p95" in sampler.metrics_summary()
+        sampler.close()
+
+    def test_pool_wait_unset_without_connection_events(self):
+        sampler = _make_sampler()
+        sampler._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda _request: httpx.Response(200, content=_sse_success_bytes()))
+        )
+        _, metrics = asyncio.run(sampler.async_completions_stream(prompt=[1], raw_output=True))
+
+        assert metrics.client_pool_wait is None
+        sampler.close()
+
+
+class _TracingTransport(httpx.AsyncBaseTransport):
+    """Emits httpcore's trace events for a new HTTP/1.1 connection."""
+
+    _EVENTS = (
+        "connection.connect_tcp.started",
+        "connection.connect_tcp.complete",
+        "connection.start_tls.started",
+        "connection.start_tls.complete",
+        "http11.send_request_headers.started",
+        "http11.send_request_body.complete",
+        "http11.receive_response_headers.started",
+        "http11.receive_response_headers.complete",
+    )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = request.extensions["trace"]
+        for event in self._EVENTS:
+            await asyncio.sleep(0.005)
+            await trace(event, {})
+        chunk = '{"choices":[{"text":"%s","token_ids":[%d]%s}]}'
+        body = "".join(
+            f"data: {chunk % (text, token, extra)}\n\n"
+            for text, token, extra in (
+                ("a", 40, ""),
+                ("b", 50, ',"finish_reason":"stop","raw_output":{"completion_token_ids":[40,50]}'),
+            )
+        )
+        return httpx.Response(200, content=f"{body}data: [DONE]\n\n".encode())
+
+
+class TestRequestTiming:
+    def test_timeline_is_attached_to_completions_and_metrics(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(2))
+        sampler._async_client = httpx.AsyncClient(transport=_TracingTransport())
+
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        timing = completions[0].timing
+        assert timing is not None
+        assert timing.queue_wait is not None and timing.queue_wait >= 0.0
+        assert timing.connection_wait is not None and timing.connection_wait >= 0.0
+        for phase in (timing.connect, timing.tls, timing.request_write):
+            assert phase is not None and phase >= 0.004
+        assert timing.first_byte is not None and timing.first_token is not None
+        assert timing.first_byte <= timing.first_token <= timing.last_token <= timing.total  # type: ignore[operator]
+        assert timing.parse is not None and timing.parse > 0.0
+
+        (metrics,) = sampler.drain_metrics()
+        assert metrics.client_timing is timing
+        assert metrics.client_pool_wait == timing.connection_wait
+        summary = sampler.metrics_summary()
+        assert "timing_queue_wait_p50" in summary and "timing_tls_p99" in summary
+        sampler.close()
+
+    def test_untraced_transport_leaves_connection_phases_unset(self):
+        sampler = _make_sampler()
+        sampler._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda _request: httpx.Response(200, content=_sse_success_bytes()))
+        )
+        completions = asyncio.run(sampler.sample_with_prompt_tokens([1], n=1))
+
+        timing = completions[0].timing
+        assert timing is not None
+        assert timing.connect is None and timing.connection_wait is None
+        assert timing.total is not None and timing.queue_wait is not None
+        sampler.close()
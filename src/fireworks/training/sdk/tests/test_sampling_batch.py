@@ -0,0 +1,217 @@
+"""Tests for DeploymentSampler.sample_batch (whole-step batch rollouts)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler, SamplingRequestError
+from fireworks.training.sdk.concurrency import FixedConcurrencyController
+from fireworks.training.sdk.sampling_batch import prefix_cache_key, group_by_shared_prefix
+
+
+def _make_sampler(**kwargs) -> DeploymentSampler:
+    defaults = dict(inference_url="https://api.example.com", model="m", api_key="k", tokenizer=None)
+    defaults.update(kwargs)
+    return DeploymentSampler(**defaults)
+
+
+class _Script:
+    """Fake ``async_completions_stream`` with per-prompt delays and in-flight tracking."""
+
+    def __init__(self, delays: dict[int, float] | None = None, fail: set[int] | None = None) -> None:
+        self.delays = delays or {}
+        self.fail = fail or set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def __call__(self, *_args, prompt, n=1, **_kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(prompt[0], 0.0))
+            if prompt[0] in self.fail:
+                raise ValueError(f"bad prompt {prompt[0]}")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        choices = [
+            {"index": i, "text": f"p{prompt[0]}", "raw_output": {"completion_token_ids": [100 + i]}}
+            for i in range(n)
+        ]
+        return {"choices": choices}, ServerMetrics(prefill_queue_duration=0.1)
+
+
+class TestSampleBatch:
+    def test_yields_in_completion_order_and_groups_by_prompt(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(8))
+        sampler.async_completions_stream = _Script(delays={0: 0.05, 1: 0.0, 2: 0.02})  # type: ignore[method-assign]
+        batch = sampler.sample_batch([[0], [1], [2]], n=2)
+
+        async def _run():
+            return [result.index async for result in batch]
+
+        order = asyncio.run(_run())
+
+        assert order == [1, 2, 0]
+        assert [[c.text for c in group] for group in batch.groups] == [["p0"] * 2, ["p1"] * 2, ["p2"] * 2]
+        assert batch.concurrency_summary == {"window": 8.0}
+        sampler.close()
+
+    def test_in_flight_requests_are_bounded(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(64))
+        script = _Script(delays={i: 0.001 for i in range(40)})
+        sampler.async_completions_stream = script  # type: ignore[method-assign]
+
+        groups = asyncio.run(sampler.sample_batch([[i] for i in range(40)], n=4, max_in_flight=8).collect())
+
+        assert len(groups) == 40 and all(len(g) == 4 for g in groups)
+        assert script.max_in_flight <= 8
+
+    def test_server_side_n_counts_one_request_per_prompt(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(64), server_side_n=True)
+        script = _Script(delays={i: 0.001 for i in range(20)})
+        sampler.async_completions_stream = script  # type: ignore[method-assign]
+
+        groups = asyncio.run(sampler.sample_batch([[i] for i in range(20)], n=4, max_in_flight=8).collect())
+
+        assert all(len(g) == 4 for g in groups)
+        assert script.max_in_flight == 8
+
+    def test_default_bound_tracks_controller_window(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(3))
+        script = _Script(delays={i: 0.001 for i in range(30)})
+        sampler.async_completions_stream = script  # type: ignore[method-assign]
+
+        asyncio.run(sampler.sample_batch([[i] for i in range(30)]).collect())
+
+        # Window 3 -> at most 6 prompts scheduled; the semaphore admits 3.
+        assert script.max_in_flight <= 3
+
+    def test_return_exceptions_keeps_batch_running(self):
+        sampler = _make_sampler()
+        sampler.async_completions_stream = _Script(fail={1})  # type: ignore[method-assign]
+        batch = sampler.sample_batch([[0], [1], [2]], return_exceptions=True)
+
+        groups = asyncio.run(batch.collect())
+
+        assert [len(g) for g in groups] == [1, 0, 1]
+        assert list(batch.errors) == [1] and isinstance(batch.errors[1], ValueError)
+        assert batch.concurrency_summary is not None
+
+    def test_failure_cancels_outstanding_prompts(self):
+        sampler = _make_sampler()
+        script = _Script(delays={0: 10.0}, fail={1})
+        sampler.async_completions_stream = script  # type: ignore[method-assign]
+
+        with pytest.raises(ValueError, match="bad prompt 1"):
+            asyncio.run(sampler.sample_batch([[0], [1]]).collect())
+        assert script.cancelled == 1
+
+    def test_step_completed_after_failure(self):
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(4))
+        sampler.async_completions_stream = _Script(fail={0})  # type: ignore[method-assign]
+        batch = sampler.sample_batch([[0], [1]])
+
+        with pytest.raises(ValueError, match="bad prompt 0"):
+            asyncio.run(batch.collect())
+        assert batch.concurrency_summary == {"window": 4.0}
+        assert batch.cache_stats is not None
+
+    def test_early_close_cancels_outstanding_prompts(self):
+        sampler = _make_sampler()
+        script = _Script(delays={0: 10.0, 1: 0.0})
+        sampler.async_completions_stream = script  # type: ignore[method-assign]
+        batch = sampler.sample_batch([[0], [1]])
+
+        async def _run():
+            iterator = batch.__aiter__()
+            first = await iterator.__anext__()
+            await iterator.aclose()  # type: ignore[attr-defined]
+            return first
+
+        assert asyncio.run(_run()).index == 1
+        assert script.cancelled == 1
+        assert batch.concurrency_summary is not None
+
+    def test_iterating_twice_is_rejected(self):
+        batch = _make_sampler().sample_batch([[0]])
+        batch.__aiter__()
+        with pytest.raises(RuntimeError):
+            batch.__aiter__()
+
+    def test_terminal_sampling_error_type_preserved(self):
+        sampler = _make_sampler()
+
+        async def _fail(*_args, **_kwargs):
+            raise SamplingRequestError("boom")
+
+        sampler.async_completions_stream = _fail  # type: ignore[method-assign]
+        with pytest.raises(SamplingRequestError):
+            asyncio.run(sampler.sample_batch([[0]]).collect())
+
+
+_SYS_A = list(range(1000, 1040))
+_SYS_B = list(range(2000, 2040))
+
+
+class TestPrefixAwareOrdering:
+    def test_groups_prompts_by_shared_prefix(self):
+        prompts = [_SYS_A + [1], _SYS_B + [1], _SYS_A + [2], [5, 6], _SYS_B + [2, 3], _SYS_A + [3]]
+
+        groups = group_by_shared_prefix(prompts, min_shared_prefix=32)
+
+        assert sorted((sorted(members), shared) for members, shared in groups) == [
+            ([0, 2, 5], 40),
+            ([1, 4], 40),
+            ([3], 0),
+        ]
+
+    def test_short_shared_prefix_is_not_a_group(self):
+        groups = group_by_shared_prefix([[1, 2, 3], [1, 2, 4]], min_shared_prefix=3)
+        assert [members for members, _ in groups] == [[0], [1]]
+
+    def test_siblings_dispatched_back_to_back_with_cache_key(self):
+        prompts = [_SYS_A + [1], _SYS_B + [1], _SYS_A + [2], _SYS_B + [2]]
+        sampler = _make_sampler(concurrency_controller=FixedConcurrencyController(1))
+        dispatched: list[tuple[int, str | None]] = []
+
+        async def _fake(*_args, prompt, n=1, prompt_cache_key=None, **_kwargs):
+            dispatched.append((prompts.index(list(prompt)), prompt_cache_key))
+            choice = {"index": 0, "text": "", "raw_output": {"completion_token_ids": [1]}}
+            return {"choices": [choice]}, ServerMetrics(prompt_tokens=41, cached_prompt_tokens=40)
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        batch = sampler.sample_batch(prompts, max_in_flight=1, prefix_aware=True, attach_prompt_cache_key=True)
+
+        asyncio.run(batch.collect())
+
+        assert [i for i, _ in dispatched] == [0, 2, 1, 3]
+        assert [key for _, key in dispatched] == [prefix_cache_key(_SYS_A)] * 2 + [prefix_cache_key(_SYS_B)] * 2
+        assert batch.cache_stats == {
+            "cached_prompt_tokens": 160.0,
+            "prompt_tokens": 164.0,
+            "prefix_groups": 2.0,
+            "cache_hit_rate": pytest.approx(160 / 164),
+        }
+
+    def test_caller_prompt_cache_key_wins(self):
+        prompts = [_SYS_A + [1], _SYS_A + [2]]
+        sampler = _make_sampler()
+        keys: list[str | None] = []
+
+        async def _fake(*_args, prompt_cache_key=None, **_kwargs):
+            keys.append(prompt_cache_key)
+            return {"choices": [{"raw_output": {"completion_token_ids": [1]}}]}, ServerMetrics()
+
+        sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+        batch = sampler.sample_batch(prompts, attach_prompt_cache_key=True, prompt_cache_key="mine")
+
+        asyncio.run(batch.collect())
+
+        assert keys == ["mine", "mine"]
+        assert "cache_hit_rate" not in batch.cache_stats  # type: ignore[operator]
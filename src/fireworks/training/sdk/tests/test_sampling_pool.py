@@ -0,0 +1,127 @@
+"""Tests for load balancing across deployments with DeploymentSamplerPool."""
+
+from __future__ import annotations
+
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+from fireworks.training.sdk.concurrency import FixedConcurrencyController
+from fireworks.training.sdk.sampling_pool import DeploymentSamplerPool
+from fireworks.training.sdk.sampling_observability import SamplingRequestError
+
+
+def _http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.example.com/inference/v1/completions")
+    return httpx.HTTPStatusError("err", request=request, response=httpx.Response(status, request=request))
+
+
+def _make_sampler(model: str, token: int, *, delay: float = 0.0, pq: float | None = None, status: int | None = None):
+    sampler = DeploymentSampler(
+        inference_url="https://api.example.com",
+        model=model,
+        api_key="k",
+        concurrency_controller=FixedConcurrencyController(8),
+    )
+    sampler._RETRY_BASE_BACKOFF_S = 0.0  # type: ignore[misc]
+    sampler._RETRY_MAX_ATTEMPTS = 1  # type: ignore[misc]
+    calls: list[int] = []
+
+    async def _fake(*_args, **_kwargs):
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if status is not None:
+            raise _http_error(status)
+        body = {"choices": [{"index": 0, "raw_output": {"completion_token_ids": [token]}}]}
+        return body, ServerMetrics(prefill_queue_duration=pq)
+
+    sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+    return sampler, calls
+
+
+class TestDeploymentSamplerPool:
+    def test_least_outstanding_spreads_concurrent_calls(self):
+        (a, a_calls), (b, b_calls) = _make_sampler("a", 1, delay=0.02), _make_sampler("b", 2, delay=0.02)
+        pool = DeploymentSamplerPool([a, b])
+
+        async def _run():
+            return await asyncio.gather(*(pool.sample_with_prompt_tokens([0]) for _ in range(10)))
+
+        asyncio.run(_run())
+        assert len(a_calls) == len(b_calls) == 5
+        assert [s["outstanding"] for s in pool.target_stats()] == [0, 0]
+        pool.close()
+
+    def test_queue_ema_prefers_short_prefill_queue(self):
+        (a, a_calls), (b, b_calls) = _make_sampler("a", 1, pq=2.0), _make_sampler("b", 2, pq=0.1)
+        pool = DeploymentSamplerPool([a, b], policy="queue_ema", ema_alpha=0.5)
+
+        async def _run():
+            for _ in range(10):
+                await pool.sample_with_prompt_tokens([0])
+
+        asyncio.run(_run())
+        # One exploratory call each, then everything goes to the short queue.
+        assert len(a_calls) == 1 and len(b_calls) == 9
+        assert pool.target_stats()[1]["prefill_queue_ema"] == pytest.approx(0.1)
+        assert len(pool.drain_metrics()) == 10
+        pool.close()
+
+    def test_failing_target_is_ejected_and_calls_fail_over(self):
+        (bad, bad_calls), (good, good_calls) = _make_sampler("bad", 1, status=503), _make_sampler("good", 2)
+        pool = DeploymentSamplerPool([bad, good], eject_after=1, eject_s=60.0)
+
+        async def _run():
+            return [await pool.sample_with_prompt_tokens([0]) for _ in range(4)]
+
+        results = asyncio.run(_run())
+        assert all(r[0].full_tokens == [0, 2] for r in results)
+        assert len(bad_calls) == 1 and len(good_calls) == 4
+        stats = pool.target_stats()
+        assert stats[0]["ejected"] and stats[0]["failures"] == 1
+        pool.close()
+
+    def test_error_raised_when_every_target_fails(self):
+        (a, _), (b, _) = _make_sampler("a", 1, status=503), _make_sampler("b", 2, status=503)
+        pool = DeploymentSamplerPool([a, b], eject_after=1, eject_s=0.05)
+
+        with pytest.raises(SamplingRequestError):
+            asyncio.run(pool.sample_with_prompt_tokens([0]))
+        assert all(s["ejected"] for s in pool.target_stats())
+        time.sleep(0.06)
+        assert not any(s["ejected"] for s in pool.target_stats())
+        pool.close()
+
+    def test_client_errors_do_not_eject(self):
+        (a, a_calls), (b, _) = _make_sampler("a", 1, status=400), _make_sampler("b", 2, status=400)
+        pool = DeploymentSamplerPool([a, b], eject_after=1)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(pool.sample_with_prompt_tokens([0]))
+        assert len(a_calls) == 1
+        assert not any(s["ejected"] for s in pool.target_stats())
+        pool.close()
+
+    def test_rejects_shared_controller(self):
+        controller = FixedConcurrencyController(4)
+        samplers = [
+            DeploymentSampler(inference_url="https://x", model=m, api_key="k", concurrency_controller=controller)
+            for m in ("a", "b")
+        ]
+        with pytest.raises(ValueError, match="own concurrency controller"):
+            DeploymentSamplerPool(samplers)
+
+    def test_from_deployments_builds_one_controller_per_target(self):
+        pool = DeploymentSamplerPool.from_deployments(
+            [("https://a.example.com", "m"), ("https://b.example.com", "m")],
+            api_key="k",
+            concurrency_controller_factory=lambda: FixedConcurrencyController(2),
+            policy="queue_ema",
+        )
+        controllers = [s.concurrency_controller for s in pool.samplers]
+        assert controllers[0] is not controllers[1]
+        assert [s["inference_url"] for s in pool.target_stats()] == ["https://a.example.com", "https://b.example.com"]
+        pool.close()
@@ -0,0 +1,117 @@
+"""Tests for constant-memory streaming statistics."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+from fireworks.training.sdk.concurrency import AdaptiveConcurrencyController
+from fireworks.training.sdk.streaming_stats import QuantileSketch, SlidingQuantiles, ServerMetricsWindow
+
+
+def _exact(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestQuantileSketch:
+    @pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+    def test_relative_accuracy(self, q):
+        rng = random.Random(0)
+        values = [rng.lognormvariate(-1.0, 1.5) for _ in range(20_000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for v in values:
+            sketch.add(v)
+
+        assert sketch.quantile(q) == pytest.approx(_exact(values, q), rel=0.011)
+        assert sketch.count == len(values)
+        assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+    def test_merge_matches_single_sketch(self):
+        rng = random.Random(1)
+        values = [rng.expovariate(2.0) for _ in range(5_000)]
+        whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i, v in enumerate(values):
+            whole.add(v)
+            (left if i % 2 else right).add(v)
+        left.merge(right)
+
+        assert left.count == whole.count
+        assert left.quantile(0.95) == whole.quantile(0.95)
+
+    def test_zeros_and_exact_extremes(self):
+        sketch = QuantileSketch()
+        for v in (0.0, 0.0, 0.0, 590.0):
+            sketch.add(v)
+
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1.0) == 590.0
+        assert sketch.min == 0.0 and sketch.max == 590.0
+
+    def test_memory_is_bounded(self):
+        sketch = QuantileSketch(max_buckets=64)
+        for i in range(1, 100_000, 7):
+            sketch.add(i * 1e-6)
+
+        assert len(sketch._bins) <= 64
+        # Collapsing only touches the low end; the tail stays accurate.
+        assert sketch.quantile(0.99) == pytest.approx(0.099, rel=0.02)
+
+    def test_empty(self):
+        sketch = QuantileSketch()
+        assert sketch.quantile(0.5) is None and sketch.mean is None
+
+
+class TestSlidingQuantiles:
+    def test_old_slots_expire(self):
+        window = SlidingQuantiles(window_s=10.0, slots=5)
+        window.add(100.0, now=0.0)
+        window.add(1.0, now=9.0)
+
+        assert window.quantile(1.0, now=9.0) == 100.0
+        assert window.quantile(1.0, now=11.0) == 1.0
+        assert window.quantile(1.0, now=30.0) is None
+
+
+class TestServerMetricsWindow:
+    def test_summary_and_cache_hit_rate(self):
+        window = ServerMetricsWindow(window_s=60.0)
+        for i in range(100):
+            window.add(
+                ServerMetrics(server_ttft=0.1 + i / 1000, prompt_tokens=100, cached_prompt_tokens=25),
+                now=1.0,
+            )
+
+        summary = window.summary(now=1.0)
+
+        assert summary["server_ttft_p50"] == pytest.approx(0.149, rel=0.02)
+        assert summary["server_ttft_max"] == pytest.approx(0.199)
+        assert summary["cache_hit_rate"] == 0.25
+        assert "prefill_queue_duration_p95" not in summary
+
+
+class TestSamplerMetrics:
+    def test_recent_metrics_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(DeploymentSampler, "_MAX_RECENT_METRICS", 8)
+        sampler = DeploymentSampler(inference_url="https://api.example.com", model="m", api_key="k")
+        for i in range(20):
+            sampler._release_concurrency(ServerMetrics(client_ttft=float(i)))
+
+        assert [m.client_ttft for m in sampler.drain_metrics()] == [float(i) for i in range(12, 20)]
+        # The sliding window saw every sample and survives the drain.
+        assert sampler.metrics_summary()["client_ttft_max"] == 19.0
+        sampler.close()
+
+    def test_adaptive_step_reports_queue_quantiles(self):
+        ctrl = AdaptiveConcurrencyController(adjustment_interval=0)
+        for i in range(100):
+            ctrl.release(ServerMetrics(prefill_queue_duration=4.0 if i >= 98 else 0.1))
+
+        summary = ctrl.step_completed()
+
+        assert summary["avg_pq"] == pytest.approx(0.178)
+        assert summary["pq_p50"] == pytest.approx(0.1, rel=0.01)
+        assert summary["pq_p99"] == pytest.approx(4.0, rel=0.01)
+        assert "pq_p50" not in ctrl.step_completed()
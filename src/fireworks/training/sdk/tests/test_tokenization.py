@@ -0,0 +1,233 @@
+"""Tests for client-side tokenization helpers (chat-template cache, worker pool)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from fireworks.training.sdk.sampling import ServerMetrics, DeploymentSampler
+from fireworks.training.sdk.tokenization import ChatTemplateCache, TokenizerWorkerPool
+
+_MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hi"}]
+_TEMPLATE_KWARGS = {"tokenize": True, "add_generation_prompt": True}
+
+
+class _CountingTokenizer:
+    name_or_path = "test/tokenizer"
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.threads: set[str] = set()
+
+    def apply_chat_template(self, messages, **_kwargs):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        return [100 + len(m["content"]) for m in messages]
+
+
+class TestChatTemplateCache:
+    def test_key_is_stable_and_order_insensitive_for_dict_fields(self):
+        reordered = [{"content": "be brief", "role": "system"}, {"content": "hi", "role": "user"}]
+        assert ChatTemplateCache.make_key(_MESSAGES, _TEMPLATE_KWARGS) == ChatTemplateCache.make_key(
+            reordered, _TEMPLATE_KWARGS
+        )
+
+    def test_key_depends_on_template_kwargs_and_messages(self):
+        base = ChatTemplateCache.make_key(_MESSAGES, _TEMPLATE_KWARGS)
+        assert base != ChatTemplateCache.make_key(_MESSAGES, {**_TEMPLATE_KWARGS, "add_generation_prompt": False})
+        assert base != ChatTemplateCache.make_key(_MESSAGES[:1], _TEMPLATE_KWARGS)
+
+    def test_lru_eviction_and_counters(self):
+        cache = ChatTemplateCache(max_size=2)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        assert cache.get("a") == [1]  # "a" becomes most recent
+        cache.put("c", [3])  # evicts "b"
+        assert cache.get("b") is None
+        assert cache.get("c") == [3]
+        assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2, "max_size": 2}
+
+    def test_returned_lists_do_not_alias_cache(self):
+        cache = ChatTemplateCache()
+        cache.put("a", [1, 2])
+        cache.get("a").append(3)  # type: ignore[union-attr]
+        assert cache.get("a") == [1, 2]
+
+    def test_zero_size_stores_nothing(self):
+        cache = ChatTemplateCache(max_size=0)
+        cache.put("a", [1])
+        assert len(cache) == 0
+
+    def test_negative_size_rejected(self):
+        with pytest.raises(ValueError):
+            ChatTemplateCache(max_size=-1)
+
+
+def _sampler(tokenizer, **kwargs) -> tuple[DeploymentSampler, list[list[int]]]:
+    sampler = DeploymentSampler(
+        inference_url="https://api.example.com",
+        model="m",
+        api_key="k",
+        tokenizer=tokenizer,
+        **kwargs,
+    )
+    prompts: list[list[int]] = []
+
+    async def _fake(*_args, prompt, **_kwargs):
+        prompts.append(list(prompt))
+        choice = {"text": "ok", "finish_reason": "stop", "raw_output": {"completion_token_ids": [7]}}
+        return {"choices": [choice]}, ServerMetrics()
+
+    sampler.async_completions_stream = _fake  # type: ignore[method-assign]
+    return sampler, prompts
+
+
+class TestSamplerChatTemplateCache:
+    def test_repeated_messages_tokenized_once(self):
+        tokenizer = _CountingTokenizer()
+        sampler, prompts = _sampler(tokenizer)
+
+        async def _run():
+            for _ in range(3):
+                await sampler.sample_with_tokens(messages=_MESSAGES, n=2)
+
+        asyncio.run(_run())
+
+        assert tokenizer.calls == 1
+        assert prompts == [[108, 102]] * 6
+        stats = sampler.chat_template_cache_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1
+        sampler.close()
+
+    def test_cache_disabled(self):
+        tokenizer = _CountingTokenizer()
+        sampler, _ = _sampler(tokenizer, chat_template_cache_size=0)
+
+        async def _run():
+            for _ in range(3):
+                await sampler.sample_with_tokens(messages=_MESSAGES)
+
+        asyncio.run(_run())
+
+        assert tokenizer.calls == 3
+        sampler.close()
+
+    def test_off_loop_miss_runs_in_worker_thread(self):
+        tokenizer = _CountingTokenizer()
+        sampler, _ = _sampler(tokenizer, tokenize_off_loop=True)
+
+        asyncio.run(sampler.sample_with_tokens(messages=_MESSAGES))
+
+        assert tokenizer.calls == 1
+        assert threading.main_thread().name not in tokenizer.threads
+        sampler.close()
+
+
+class _BatchingTokenizer:
+    """Mimics HF batched ``apply_chat_template`` / ``batch_decode``."""
+
+    def __init__(self) -> None:
+        self.chat_batches: list[int] = []
+        self.decode_batches: list[int] = []
+
+    def apply_chat_template(self, conversations, *, tokenize, return_dict, add_generation_prompt):
+        assert tokenize and not return_dict and add_generation_prompt
+        self.chat_batches.append(len(conversations))
+        return [[len(m["content"]) for m in conv] for conv in conversations]
+
+    def batch_decode(self, sequences, skip_special_tokens):
+        assert skip_special_tokens is False
+        self.decode_batches.append(len(sequences))
+        return [f"<{seq[0]}>" for seq in sequences]
+
+
+class TestTokenizerWorkerPool:
+    def test_concurrent_prompts_share_one_batch(self):
+        tokenizer = _BatchingTokenizer()
+        conversations = [[{"role": "user", "content": "x" * i}] for i in range(1, 6)]
+
+        async def _run():
+            with TokenizerWorkerPool(tokenizer) as pool:
+                return await asyncio.gather(
+                    *[pool.apply_chat_template(conv, add_generation_prompt=True) for conv in conversations]
+                ), pool.stats()
+
+        results, stats = asyncio.run(_run())
+
+        assert results == [[1], [2], [3], [4], [5]]
+        assert tokenizer.chat_batches == [5]
+        assert stats == {"batches": 1, "items": 5, "largest_batch": 5}
+
+    def test_batches_are_capped(self):
+        tokenizer = _BatchingTokenizer()
+        conversations = [[{"role": "user", "content": "x"}]] * 5
+
+        async def _run():
+            with TokenizerWorkerPool(tokenizer, max_batch_size=2) as pool:
+                await asyncio.gather(
+                    *[pool.apply_chat_template(conv, add_generation_prompt=True) for conv in conversations]
+                )
+
+        asyncio.run(_run())
+
+        assert tokenizer.chat_batches == [2, 2, 1]
+
+    def test_decode_each_is_batched_and_memoized(self):
+        tokenizer = _BatchingTokenizer()
+
+        async def _run():
+            with TokenizerWorkerPool(tokenizer) as pool:
+                first = await pool.decode_each([7, 8, 9])
+                second = await pool.decode_each([7, 8, 9])
+                return first, second
+
+        first, second = asyncio.run(_run())
+
+        assert first == second == ["<7>", "<8>", "<9>"]
+        assert tokenizer.decode_batches == [3]
+
+    def test_errors_propagate_to_every_waiter(self):
+        class _Broken:
+            def apply_chat_template(self, *_args, **_kwargs):
+                raise RuntimeError("template error")
+
+        async def _run():
+            with TokenizerWorkerPool(_Broken()) as pool:
+                return await asyncio.gather(
+                    pool.apply_chat_template([], add_generation_prompt=True),
+                    pool.apply_chat_template([], add_generation_prompt=True),
+                    return_exceptions=True,
+                )
+
+        results = asyncio.run(_run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_sampler_uses_pool_for_templates_and_int_stops(self):
+        tokenizer = _BatchingTokenizer()
+        pool = TokenizerWorkerPool(tokenizer)
+        sampler, prompts = _sampler(tokenizer, tokenizer_pool=pool, chat_template_cache_size=0)
+        stops: list = []
+        inner = sampler.async_completions_stream
+
+        async def _record(*args, **kwargs):
+            stops.append(kwargs.get("stop"))
+            return await inner(*args, **kwargs)
+
+        sampler.async_completions_stream = _record  # type: ignore[method-assign]
+
+        async def _run():
+            await asyncio.gather(
+                sampler.sample_with_tokens(messages=[{"role": "user", "content": "ab"}]),
+                sampler.sample_with_tokens(messages=[{"role": "user", "content": "abc"}]),
+            )
+            await sampler.sample_with_prompt_tokens([1], stop=[5, 6])
+
+        asyncio.run(_run())
+
+        assert sorted(prompts[:2]) == [[2], [3]]
+        assert tokenizer.chat_batches == [2]
+        assert stops[-1] == ["<5>", "<6>"]
+        pool.close()
+        sampler.close()
@@ -0,0 +1,314 @@
+"""Client-side tokenization helpers for DeploymentSampler (cache + worker pool)."""
+
+from __future__ import annotations
+
+import json
+import asyncio
+import hashlib
+from typing import Any, Callable
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+# =============================================================================
+# ChatTemplateCache — bounded LRU of tokenized chat-template prompts
+# =============================================================================
+
+
+class ChatTemplateCache:
+    """Bounded LRU cache of ``apply_chat_template`` token ids.
+
+    Keys are a stable digest of the messages, the template arguments and the
+    tokenizer identity, so the same prompt re-sampled across RL epochs is
+    tokenized once.  Values are stored as tuples so callers can never mutate
+    a cached prompt.
+
+    ``max_size=0`` disables caching (every lookup is a miss and nothing is
+    stored).
+    """
+
+    _DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, max_size: int = _DEFAULT_MAX_SIZE):
+        if max_size < 0:
+            raise ValueError("max_size must be non-negative")
+        self._max_size = max_size
+        self._entries: OrderedDict[str, tuple[int, ...]] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(messages: Any, template_kwargs: dict[str, Any], tokenizer: Any = None) -> str:
+        """Stable digest of ``messages`` + template arguments + tokenizer."""
+        payload = json.dumps(
+            [messages, template_kwargs, getattr(tokenizer, "name_or_path", None), id(tokenizer)],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> list[int] | None:
+        """Return a fresh list of cached token ids, or ``None`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return list(entry)
+
+    def put(self, key: str, token_ids: list[int]) -> None:
+        if self._max_size == 0:
+            return
+        self._entries[key] = tuple(token_ids)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Any]) -> list[int]:
+        """Return cached token ids, awaiting ``compute()`` on a miss."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        token_ids = list(await compute())
+        self.put(key, token_ids)
+        return token_ids
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Cumulative hit/miss/eviction counters and the current size."""
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "size": len(self._entries),
+            "max_size": self._max_size,
+        }
+
+
+# =============================================================================
+# TokenizerWorkerPool — batched, off-loop tokenization and decoding
+# =============================================================================
+
+# Tokenizer installed in each process-pool worker by ``_init_worker``, so it
+# is pickled once per worker instead of once per batch.
+_WORKER_TOKENIZER: Any = None
+
+
+def _init_worker(tokenizer: Any) -> None:
+    global _WORKER_TOKENIZER
+    _WORKER_TOKENIZER = tokenizer
+
+
+def _batch_apply_chat_template(
+    tokenizer: Any,
+    conversations: list[Any],
+    template_kwargs: dict[str, Any],
+) -> list[list[int]]:
+    tok = tokenizer if tokenizer is not None else _WORKER_TOKENIZER
+    # A list of conversations renders each template and then tokenizes all of
+    # them in one ``tokenizer(...)`` call, which fast tokenizers parallelize.
+    out = tok.apply_chat_template(conversations, tokenize=True, return_dict=False, **template_kwargs)
+    return [list(ids) for ids in out]
+
+
+def _batch_decode(tokenizer: Any, sequences: list[list[int]]) -> list[str]:
+    tok = tokenizer if tokenizer is not None else _WORKER_TOKENIZER
+    return list(tok.batch_decode(sequences, skip_special_tokens=False))
+
+
+class _Batcher:
+    """Coalesces requests submitted in the same loop iteration into one call."""
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[Any]], Any],
+        max_batch_size: int,
+        batch_window_s: float,
+    ):
+        self._run_batch = run_batch
+        self._max_batch_size = max_batch_size
+        self._batch_window_s = batch_window_s
+        self._pending: list[tuple[Any, asyncio.Future[Any]]] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        self.batches: int = 0
+        self.items: int = 0
+        self.largest_batch: int = 0
+
+    def submit(self, item: Any) -> asyncio.Future[Any]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self._batch_window_s > 0:
+                self._flush_handle = loop.call_later(self._batch_window_s, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Any, asyncio.Future[Any]]]) -> None:
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class TokenizerWorkerPool:
+    """Executor-backed tokenizer service awaited by :class:`DeploymentSampler`.
+
+    Moves ``apply_chat_template`` and token decoding off the event loop so
+    hundreds of concurrent rollouts do not stall SSE reads.  Requests that
+    arrive within ``batch_window_s`` (by default, the same loop iteration) are
+    coalesced into a single batched tokenizer call of at most
+    ``max_batch_size`` items, which is much faster than one call per prompt
+    with HF fast tokenizers.
+
+    ``use_processes=True`` runs a ``ProcessPoolExecutor`` whose workers each
+    receive the tokenizer once at start-up (the tokenizer must be picklable).
+    Otherwise a ``ThreadPoolExecutor`` is used; fast tokenizers release the
+    GIL while encoding.  An existing ``executor`` may be passed instead; it is
+    not shut down by :meth:`close`.
+
+    Example::
+
+        pool = TokenizerWorkerPool(tokenizer, max_workers=2)
+        sampler = DeploymentSampler(..., tokenizer=tokenizer, tokenizer_pool=pool)
+    """
+
+    _DEFAULT_MAX_WORKERS = 1
+    _DEFAULT_MAX_BATCH_SIZE = 64
+    _DEFAULT_BATCH_WINDOW_S = 0.0
+    _DECODE_CACHE_MAX_SIZE = 4096
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        *,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+        max_batch_size: int = _DEFAULT_MAX_BATCH_SIZE,
+        batch_window_s: float = _DEFAULT_BATCH_WINDOW_S,
+        use_processes: bool = False,
+        executor: Executor | None = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if batch_window_s < 0:
+            raise ValueError("batch_window_s must be non-negative")
+
+        self._owns_executor = executor is None
+        if executor is not None:
+            self._executor = executor
+            # Caller-owned executor: ship the tokenizer with every batch.
+            self._worker_tokenizer: Any = tokenizer
+        elif use_processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(tokenizer,),
+            )
+            self._worker_tokenizer = None
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="fireworks-tokenizer",
+            )
+            self._worker_tokenizer = tokenizer
+
+        self._max_batch_size = max_batch_size
+        self._batch_window_s = batch_window_s
+        self._chat_batchers: dict[str, _Batcher] = {}
+        self._decode_batcher = _Batcher(self._run_decode, max_batch_size, batch_window_s)
+        # Single-token decodes (integer stop ids) repeat on every call.
+        self._decoded: dict[tuple[int, ...], str] = {}
+
+    async def _in_executor(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, self._worker_tokenizer, *args)
+
+    async def apply_chat_template(self, messages: Any, **template_kwargs: Any) -> list[int]:
+        """Tokenize one conversation; concurrent calls are batched together."""
+        key = json.dumps(template_kwargs, sort_keys=True, default=str)
+        batcher = self._chat_batchers.get(key)
+        if batcher is None:
+
+            async def _run(conversations: list[Any]) -> list[list[int]]:
+                return await self._in_executor(_batch_apply_chat_template, conversations, template_kwargs)
+
+            batcher = _Batcher(_run, self._max_batch_size, self._batch_window_s)
+            self._chat_batchers[key] = batcher
+        return await batcher.submit(messages)
+
+    async def _run_decode(self, sequences: list[tuple[int, ...]]) -> list[str]:
+        return await self._in_executor(_batch_decode, [list(seq) for seq in sequences])
+
+    async def decode(self, token_ids: list[int]) -> str:
+        """Decode one token sequence (special tokens kept); batched and memoized."""
+        key = tuple(token_ids)
+        cached = self._decoded.get(key)
+        if cached is not None:
+            return cached
+        text = await self._decode_batcher.submit(key)
+        if len(self._decoded) < self._DECODE_CACHE_MAX_SIZE:
+            self._decoded[key] = text
+        return text
+
+    async def decode_each(self, token_ids: list[int]) -> list[str]:
+        """Decode every token id on its own (e.g. integer stop ids)."""
+        return list(await asyncio.gather(*[self.decode([token_id]) for token_id in token_ids]))
+
+    def stats(self) -> dict[str, int]:
+        """Cumulative batch counters across chat-template and decode calls."""
+        batchers = [*self._chat_batchers.values(), self._decode_batcher]
+        return {
+            "batches": sum(b.batches for b in batchers),
+            "items": sum(b.items for b in batchers),
+            "largest_batch": max(b.largest_batch for b in batchers),
+        }
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> "TokenizerWorkerPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
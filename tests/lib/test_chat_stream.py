@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import json
+from typing import Any, Dict, List, Tuple, Optional
+
+import httpx
+import pytest
+from respx import MockRouter
+
+from fireworks import Fireworks, AsyncFireworks
+from fireworks.types.chat import ChatCompletionChunk
+from fireworks.types.shared import NewLogProbs, ChatCompletionMessageToolCallFunction
+from fireworks.lib.streaming import ChatChunk, ChatCompletionAggregator, iter_chat_chunks, aiter_chat_chunks
+
+base_url = os.environ.get("TEST_API_BASE_URL", "http://127.0.0.1:4010")
+
+
+def _logprob(token: str, offset: int, logprob: float) -> Dict[str, Any]:
+    return {"token": token, "bytes": list(token.encode()), "logprob": logprob, "text_offset": offset, "token_id": 1}
+
+
+CHUNKS: List[Dict[str, Any]] = [
+    {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "m",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"role": "assistant", "content": "Hel"},
+                "logprobs": {"content": [_logprob("Hel", 0, -0.1)]},
+            }
+        ],
+    },
+    {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "m",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {
+                    "content": "lo",
+                    "tool_calls": [
+                        {
+                            "index": 0,
+                            "id": "call_a",
+                            "type": "function",
+                            "function": {"name": "get", "arguments": '{"a'},
+                        },
+                        {"index": 1, "id": "call_b", "type": "function", "function": {"name": "put", "arguments": ""}},
+                    ],
+                },
+                "logprobs": {"content": [_logprob("lo", 3, -0.2)]},
+            }
+        ],
+    },
+    {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "m",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {
+                    "tool_calls": [
+                        {"index": 1, "function": {"arguments": "{}"}},
+                        {"index": 0, "function": {"arguments": '": 1}'}},
+                    ]
+                },
+                "finish_reason": "tool_calls",
+            }
+        ],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+    },
+]
+
+
+def _sse_body() -> bytes:
+    events = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in CHUNKS)
+    return (events + "data: [DONE]\n\n").encode()
+
+
+def _mock_stream(respx_mock: MockRouter) -> None:
+    respx_mock.post("/v1/chat/completions").mock(
+        return_value=httpx.Response(200, content=_sse_body(), headers={"content-type": "text/event-stream"})
+    )
+
+
+def _assert_completion(aggregator: ChatCompletionAggregator) -> None:
+    completion = aggregator.completion()
+    assert completion.id == "chatcmpl-1"
+    assert completion.object == "chat.completion"
+    assert completion.usage is not None and completion.usage.total_tokens == 8
+
+    choice = completion.choices[0]
+    assert choice.finish_reason == "tool_calls"
+    assert choice.message.content == "Hello"
+    assert choice.message.tool_calls is not None
+    calls: List[Tuple[Optional[str], Optional[str], object]] = []
+    for call in choice.message.tool_calls:
+        assert isinstance(call.function, ChatCompletionMessageToolCallFunction)
+        calls.append((call.id, call.function.name, call.function.arguments))
+    assert calls == [("call_a", "get", '{"a": 1}'), ("call_b", "put", "{}")]
+    assert isinstance(choice.logprobs, NewLogProbs) and choice.logprobs.content is not None
+    assert [lp.token for lp in choice.logprobs.content] == ["Hel", "lo"]
+
+
+@pytest.mark.respx(base_url=base_url)
+def test_iter_chat_chunks(client: Fireworks, respx_mock: MockRouter) -> None:
+    _mock_stream(respx_mock)
+    stream = client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m", stream=True)
+
+    aggregator = ChatCompletionAggregator()
+    chunks: List[ChatChunk] = []
+    for chunk in iter_chat_chunks(stream):
+        chunks.append(chunk)
+        aggregator.add(chunk)
+
+    assert [c.content for c in chunks] == ["Hel", "lo", None]
+    assert chunks[2].choices[0].finish_reason == "tool_calls"
+    assert chunks[2].usage == {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+    assert stream.response.is_closed
+
+    model = chunks[0].to_model()
+    assert isinstance(model, ChatCompletionChunk)
+    assert model.choices[0].delta.content == "Hel"
+    assert chunks[0].to_model() is model
+
+    _assert_completion(aggregator)
+
+
+@pytest.mark.respx(base_url=base_url)
+async def test_aiter_chat_chunks(async_client: AsyncFireworks, respx_mock: MockRouter) -> None:
+    _mock_stream(respx_mock)
+    stream = await async_client.chat.completions.create(
+        messages=[{"role": "user", "content": "hi"}], model="m", stream=True
+    )
+
+    aggregator = ChatCompletionAggregator()
+    async for chunk in aiter_chat_chunks(stream):
+        aggregator.add(chunk)
+
+    assert stream.response.is_closed
+    _assert_completion(aggregator)
+
+
+@pytest.mark.respx(base_url=base_url)
+def test_aggregator_accepts_models(client: Fireworks, respx_mock: MockRouter) -> None:
+    _mock_stream(respx_mock)
+    stream = client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m", stream=True)
+
+    aggregator = ChatCompletionAggregator()
+    for chunk in stream:
+        aggregator.add(chunk)
+
+    _assert_completion(aggregator)
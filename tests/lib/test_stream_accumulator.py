@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from respx import MockRouter
+
+from fireworks import Fireworks, AsyncFireworks
+from fireworks.types import MessageCreateResponse, CompletionCreateResponse
+from fireworks.types.chat import CompletionCreateResponse as ChatCompletionResponse
+from fireworks.types.shared import NewLogProbs, ChatCompletionMessageToolCallFunction
+from fireworks.lib.streaming import StreamAccumulator
+
+base_url = os.environ.get("TEST_API_BASE_URL", "http://127.0.0.1:4010")
+
+
+def _chat_chunk(delta: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    choice = {"index": 0, "delta": delta, "finish_reason": extra.pop("finish_reason", None)}
+    return {"id": "c1", "object": "chat.completion.chunk", "created": 1, "model": "m", "choices": [choice], **extra}
+
+
+CHAT_CHUNKS: List[Dict[str, Any]] = [
+    _chat_chunk({"role": "assistant"}),
+    _chat_chunk({"content": "Hel"}),
+    _chat_chunk(
+        {"content": "lo", "tool_calls": [{"index": 0, "id": "call_a", "function": {"name": "f", "arguments": "{"}}]}
+    ),
+    _chat_chunk({"tool_calls": [{"index": 0, "function": {"arguments": "}"}}]}, finish_reason="tool_calls"),
+    {**_chat_chunk({}), "choices": [], "usage": {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7}},
+]
+
+COMPLETION_CHUNKS: List[Dict[str, Any]] = [
+    {
+        "id": "t1",
+        "object": "text_completion",
+        "created": 1,
+        "model": "m",
+        "choices": [{"index": 0, "text": text, "logprobs": {"tokens": [text], "token_logprobs": [lp]}}],
+    }
+    for text, lp in (("Hel", -0.5), ("lo", -0.25))
+] + [
+    {
+        "id": "t1",
+        "object": "text_completion",
+        "created": 1,
+        "model": "m",
+        "choices": [{"index": 0, "text": "", "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 2, "completion_tokens": 2, "total_tokens": 4},
+    }
+]
+
+
+def _sse(chunks: List[Dict[str, Any]]) -> httpx.Response:
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+
+@pytest.mark.respx(base_url=base_url)
+def test_chat_stream_final(client: Fireworks, respx_mock: MockRouter) -> None:
+    respx_mock.post("/v1/chat/completions").mock(return_value=_sse(CHAT_CHUNKS))
+    stream = client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m", stream=True)
+
+    accumulator = stream.accumulator
+    first = [next(stream), next(stream)]
+    assert first[1].choices[0].delta.content == "Hel"
+    assert accumulator.text == "Hel"
+    assert accumulator.time_to_first_token is not None
+
+    completion = stream.final()
+    assert isinstance(completion, ChatCompletionResponse)
+    assert stream.response.is_closed
+    message = completion.choices[0].message
+    assert message.content == "Hello"
+    assert message.tool_calls is not None
+    function = message.tool_calls[0].function
+    assert isinstance(function, ChatCompletionMessageToolCallFunction) and function.arguments == "{}"
+    assert completion.choices[0].finish_reason == "tool_calls"
+    assert completion.usage is not None and completion.usage.total_tokens == 7
+    assert list(stream) == []
+
+
+@pytest.mark.respx(base_url=base_url)
+def test_plain_iteration_does_not_accumulate(client: Fireworks, respx_mock: MockRouter) -> None:
+    respx_mock.post("/v1/chat/completions").mock(return_value=_sse(CHAT_CHUNKS))
+    stream = client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], model="m", stream=True)
+
+    assert len(list(stream)) == len(CHAT_CHUNKS)
+    assert stream._accumulator is None
+    with pytest.raises(RuntimeError, match="already been iterated"):
+        stream.final()
+
+
+@pytest.mark.respx(base_url=base_url)
+def test_completions_stream_until_done(client: Fireworks, respx_mock: MockRouter) -> None:
+    respx_mock.post("/v1/completions").mock(return_value=_sse(COMPLETION_CHUNKS))
+    stream = client.completions.create(prompt="hi", model="m", stream=True)
+
+    accumulator = stream.until_done().accumulator
+    assert accumulator.kind == "completion"
+    assert accumulator.usage == {"prompt_tokens": 2, "completion_tokens": 2, "total_tokens": 4}
+
+    completion = accumulator.final()
+    assert isinstance(completion, CompletionCreateResponse)
+    choice = completion.choices[0]
+    assert choice.text == "Hello"
+    assert choice.finish_reason == "stop"
+    assert choice.logprobs is not None
+    assert choice.logprobs.to_dict() == {"tokens": ["Hel", "lo"], "token_logprobs": [-0.5, -0.25]}
+
+
+@pytest.mark.respx(base_url=base_url)
+async def test_async_chat_stream_final(async_client: AsyncFireworks, respx_mock: MockRouter) -> None:
+    respx_mock.post("/v1/chat/completions").mock(return_value=_sse(CHAT_CHUNKS))
+    stream = await async_client.chat.completions.create(
+        messages=[{"role": "user", "content": "hi"}], model="m", stream=True
+    )
+
+    completion = await stream.final()
+    assert isinstance(completion, ChatCompletionResponse)
+    assert completion.choices[0].message.content == "Hello"
+    assert stream.response.is_closed
+
+
+def test_logprobs_are_kept_in_columns() -> None:
+    entries: List[Dict[str, Any]] = [
+        {"token": "Hel", "bytes": [72, 101, 108], "logprob": -0.5, "text_offset": 0, "token_id": 1, "top_logprobs": []},
+        {"token": "lo", "bytes": [108, 111], "logprob": -0.25, "text_offset": 3, "token_id": 2},
+    ]
+    accumulator = StreamAccumulator()
+    for entry in entries:
+        chunk = _chat_chunk({"content": entry["token"]})
+        chunk["choices"][0]["logprobs"] = {"content": [dict(entry)]}
+        accumulator.add(chunk)
+
+    columns = accumulator._choices[0].logprobs
+    assert columns.logprob.typecode == "d" and list(columns.logprob) == [-0.5, -0.25]
+    completion = accumulator.final()
+    assert isinstance(completion, ChatCompletionResponse)
+    assert isinstance(completion.choices[0].logprobs, NewLogProbs)
+    assert completion.choices[0].logprobs.to_dict()["content"] == entries
+
+
+def test_messages_events() -> None:
+    events: List[Dict[str, Any]] = [
+        {
+            "type": "message_start",
+            "message": {"id": "msg_1", "model": "m", "role": "assistant", "content": [], "usage": {"input_tokens": 5}},
+        },
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hi "}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "there"}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "id": "t", "name": "f"}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"x"'}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": ": 1}"}},
+        {"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": 9}},
+    ]
+    accumulator = StreamAccumulator()
+    for event in events:
+        accumulator.add(event)
+
+    assert accumulator.kind == "message"
+    assert accumulator.text == "Hi there"
+    assert accumulator.usage == {"input_tokens": 5, "output_tokens": 9}
+
+    message = accumulator.final()
+    assert isinstance(message, MessageCreateResponse)
+    assert message.stop_reason == "tool_use"
+    assert [block.to_dict() for block in message.content] == [
+        {"type": "text", "text": "Hi there"},
+        {"type": "tool_use", "id": "t", "name": "f", "input": {"x": 1}},
+    ]
@@ -6,6 +6,7 @@ import gc
 import os
 import sys
 import json
+import time
 import asyncio
 import inspect
 import dataclasses
@@ -19,7 +20,7 @@ import pytest
 from respx import MockRouter
 from pydantic import ValidationError
 
-from fireworks import Fireworks, AsyncFireworks, APIResponseValidationError
+from fireworks import Fireworks, RateLimiter, AsyncFireworks, APIResponseValidationError
 from fireworks._types import Omit
 from fireworks._utils import asyncify
 from fireworks._models import BaseModel, FinalRequestOptions
@@ -33,7 +34,9 @@ from fireworks._base_client import (
     DefaultHttpxClient,
     DefaultAsyncHttpxClient,
     get_platform,
+    _RetryCoordinator,
     make_request_options,
+    _parse_rate_limit_reset,
 )
 
 from .utils import update_env
@@ -1045,6 +1048,70 @@ class TestFireworks:
         assert exc_info.value.response.status_code == 302
         assert exc_info.value.response.headers["Location"] == f"{base_url}/redirected"
 
+    def test_rate_limiter_estimates_inference_requests(self) -> None:
+        limiter = RateLimiter(default_max_tokens=100)
+
+        def estimate(body: object) -> int | None:
+            return limiter.estimate_tokens(FinalRequestOptions(method="post", url="/foo", json_data=body))
+
+        assert estimate({"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}) == 150
+        assert estimate({"messages": [{"role": "user", "content": [{"type": "text", "text": "x" * 40}]}]}) == 110
+        assert estimate({"prompt": "x" * 40, "max_tokens": 10, "n": 3}) == 40
+        assert estimate({"prompt": [1, 2, 3], "max_tokens": 10}) == 13
+        assert estimate({"prompt": [1, 2], "max_tokens": "10", "n": None}) == 102
+        assert estimate({"name": "deployment"}) is None
+        assert estimate(None) is None
+
+    def test_rate_limiter_paces_past_the_burst(self) -> None:
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000, utilization=1.0)
+
+        assert limiter.reserve(50) == 0
+        assert limiter.reserve(50) == pytest.approx(1.0, abs=0.05)
+        assert limiter.reserve(0) == pytest.approx(2.0, abs=0.05)
+        assert limiter.reserve(400) == pytest.approx(4.0, abs=0.05)
+
+    def test_rate_limiter_learns_limits_from_headers(self) -> None:
+        def handler(_request: httpx.Request) -> httpx.Response:
+            headers = {"x-ratelimit-limit-requests": "600", "x-ratelimit-remaining-requests": "0"}
+            return httpx.Response(200, headers=headers, json={})
+
+        limiter = RateLimiter(tokens_per_minute=1000)
+        with Fireworks(
+            base_url=base_url,
+            api_key=api_key,
+            rate_limiter=limiter,
+            http_client=httpx.Client(transport=MockTransport(handler=handler)),
+        ) as client:
+            client.post("/foo", cast_to=httpx.Response, body={"name": "deployment"})
+            assert limiter.requests_per_minute is None
+
+            client.post("/foo", cast_to=httpx.Response, body={"prompt": "hi", "max_tokens": 1})
+            assert limiter.requests_per_minute == 600
+            assert limiter.tokens_per_minute == 1000
+            assert limiter.reserve(1) == pytest.approx(1 / 9.5, abs=0.02)
+            assert client.with_options(timeout=5)._rate_limiter is limiter
+
+    def test_rate_limiter_lowers_balance_after_latency(self) -> None:
+        limiter = RateLimiter(requests_per_minute=600, utilization=1.0, burst_s=1.0)
+        for _ in range(10):
+            limiter.reserve(1)
+
+        time.sleep(1.2)
+        limiter.observe(httpx.Response(200, headers={"x-ratelimit-remaining-requests": "0"}))
+        assert limiter.reserve(1) == pytest.approx(0.1, abs=0.02)
+
+    def test_rate_limiter_keeps_deficit_when_limit_changes(self) -> None:
+        limiter = RateLimiter(utilization=1.0)
+        limiter.observe(httpx.Response(200, headers={"x-ratelimit-limit-requests": "60"}))
+
+        assert limiter.reserve(0) == 0
+        assert limiter.reserve(0) == pytest.approx(1.0, abs=0.05)
+        assert limiter.reserve(0) == pytest.approx(2.0, abs=0.05)
+
+        limiter.observe(httpx.Response(200, headers={"x-ratelimit-limit-requests": "120"}))
+        assert limiter.requests_per_minute == 120
+        assert limiter.reserve(0) == pytest.approx(1.5, abs=0.05)
+
 
 class TestAsyncFireworks:
     @pytest.mark.respx(base_url=base_url)
@@ -1951,6 +2018,77 @@ class TestAsyncFireworks:
 
         assert response.http_request.headers.get("x-stainless-retry-count") == "42"
 
+    async def test_throttle_holds_other_requests(self) -> None:
+        hits: list[tuple[float, int]] = []
+
+        async def handler(_request: httpx.Request) -> httpx.Response:
+            status = 429 if not hits else 200
+            hits.append((time.monotonic(), status))
+            return httpx.Response(status, headers={"retry-after-ms": "200"}, json={})
+
+        async with AsyncFireworks(
+            base_url=base_url, api_key=api_key, http_client=httpx.AsyncClient(transport=MockTransport(handler=handler))
+        ) as client:
+
+            async def late_request() -> None:
+                await asyncio.sleep(0.05)
+                await client.post("/foo", cast_to=httpx.Response)
+
+            await asyncio.gather(client.post("/foo", cast_to=httpx.Response), *(late_request() for _ in range(4)))
+
+            throttled_at = hits[0][0]
+            assert [status for _, status in hits] == [429, 200, 200, 200, 200, 200]
+            assert all(at - throttled_at >= 0.2 for at, _ in hits[1:])
+            assert client._retry_coordinator.throttles == 1
+            assert client.with_options(timeout=5)._retry_coordinator is client._retry_coordinator
+
+    async def test_exhausted_rate_limit_pauses_client(self) -> None:
+        async def handler(_request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200, headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"}
+            )
+
+        async with AsyncFireworks(
+            base_url=base_url, api_key=api_key, http_client=httpx.AsyncClient(transport=MockTransport(handler=handler))
+        ) as client:
+            await client.post("/foo", cast_to=httpx.Response)
+            assert 1.5 < client._retry_coordinator.paused_for() <= 2.0
+
+    @pytest.mark.parametrize(
+        "value,seconds",
+        [["12", 12.0], ["0.5", 0.5], ["250ms", 0.25], ["1m30s", 90.0], ["6m0s", 360.0], ["soon", None], [None, None]],
+    )
+    def test_parse_rate_limit_reset(self, value: str | None, seconds: float | None) -> None:
+        assert _parse_rate_limit_reset(value) == seconds
+
+    def test_retry_delay_is_decorrelated(self) -> None:
+        coordinator = _RetryCoordinator()
+        delays = [coordinator.retry_delay(1.0, None) for _ in range(200)]
+        assert all(0.5 <= delay <= 1.5 for delay in delays)
+        assert max(delays) - min(delays) > 0.5
+        assert all(0.5 <= coordinator.retry_delay(1.0, 0.2) <= 0.6 for _ in range(50))
+
+    async def test_rate_limiter_paces_requests(self) -> None:
+        sent: list[float] = []
+
+        async def handler(_request: httpx.Request) -> httpx.Response:
+            sent.append(time.monotonic())
+            return httpx.Response(200, json={})
+
+        async with AsyncFireworks(
+            base_url=base_url,
+            api_key=api_key,
+            rate_limiter=RateLimiter(requests_per_minute=600, utilization=1.0, burst_s=0.1),
+            http_client=httpx.AsyncClient(transport=MockTransport(handler=handler)),
+        ) as client:
+            body = {"messages": [{"role": "user", "content": "hi"}], "model": "model"}
+            await asyncio.gather(*(client.post("/foo", cast_to=httpx.Response, body=body) for _ in range(4)))
+            await client.post("/foo", cast_to=httpx.Response, body={"name": "deployment"})
+
+            assert len(sent) == 5
+            assert sent[3] - sent[0] >= 0.28
+            assert sent[4] - sent[3] < 0.05
+
     async def test_get_platform(self) -> None:
         platform = await asyncify(get_platform)()
         assert isinstance(platform, (str, OtherPlatform))
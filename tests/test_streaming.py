@@ -6,7 +6,7 @@ import httpx
 import pytest
 
 from fireworks import Fireworks, AsyncFireworks
-from fireworks._streaming import Stream, AsyncStream, ServerSentEvent
+from fireworks._streaming import Stream, AsyncStream, SSELineDecoder, ServerSentEvent
 
 
 @pytest.mark.asyncio
@@ -216,6 +216,60 @@ async def test_multi_byte_character_multiple_chunks(
     assert sse.json() == {"content": "известни"}
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sync", [True, False], ids=["sync", "async"])
+async def test_line_endings_split_across_chunks(sync: bool, client: Fireworks, async_client: AsyncFireworks) -> None:
+    def body() -> Iterator[bytes]:
+        yield b"event: ping\r"
+        yield b""
+        yield b"\ndata: 1\r\n\r"
+        yield b"\n"
+        yield b"data: 2\r\r"
+        yield b"data: 3\n\n"
+
+    iterator = make_event_iterator(content=body(), sync=sync, client=client, async_client=async_client)
+
+    sse = await iter_next(iterator)
+    assert sse.event == "ping"
+    assert sse.data == "1"
+
+    sse = await iter_next(iterator)
+    assert sse.data == "2"
+
+    sse = await iter_next(iterator)
+    assert sse.data == "3"
+
+    await assert_empty_iter(iterator)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sync", [True, False], ids=["sync", "async"])
+async def test_large_event_in_small_chunks(sync: bool, client: Fireworks, async_client: AsyncFireworks) -> None:
+    payload = b'data: {"arguments":"' + b"x" * 200_000 + b'"}\n\n'
+
+    def body() -> Iterator[bytes]:
+        for i in range(0, len(payload), 7):
+            yield payload[i : i + 7]
+
+    iterator = make_event_iterator(content=body(), sync=sync, client=client, async_client=async_client)
+
+    sse = await iter_next(iterator)
+    assert sse.json() == {"arguments": "x" * 200_000}
+
+    await assert_empty_iter(iterator)
+
+
+def test_line_decoder_keeps_unterminated_tail() -> None:
+    decoder = SSELineDecoder()
+
+    assert decoder.decode(b"data: a\ndata: b") == ["data: a"]
+    assert decoder.decode(b"c\r") == ["data: bc"]
+    assert decoder.decode(b"\n") == []
+    assert decoder.decode(b"data: d") == []
+    assert decoder.flush() == ["data: d"]
+    assert decoder.flush() == []
+
+
 async def to_aiter(iter: Iterator[bytes]) -> AsyncIterator[bytes]:
     for chunk in iter:
         yield chunk